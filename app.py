@@ -7,12 +7,21 @@ from hypercorn.asyncio import serve
 
 # Import our modules
 from services.database_service import create_database_pool
+from services.queries import prepare_statements, warm_up
+from services.schema_service import ensure_schema
 from blueprints.auth_blueprint import init_auth_routes
 from blueprints.feed_blueprint import init_feed_routes
 from blueprints.user_blueprint import init_user_routes
 from blueprints.media_blueprint import init_media_routes
 from blueprints.like_blueprint import init_like_routes
 from blueprints.tag_blueprint import init_tag_routes
+from blueprints.meme_blueprint import init_meme_routes
+from blueprints.asset_blueprint import init_asset_routes
+from blueprints.job_blueprint import init_job_routes
+from blueprints.pool_blueprint import init_pool_routes
+from services.job_handlers import register_default_jobs
+from services.job_runner import JobRunner
+from services.job_service import JobService
 from utils.helpers import format_number
 
 
@@ -35,14 +44,20 @@ async def create_app():
         return format_number(value)
 
     try:
-        pool = await create_database_pool()
+        # Every new connection prepares the registered hot statements
+        pool = await create_database_pool(init=prepare_statements)
         logger.info("Successfully connected to database")
+        await ensure_schema(pool)
+        await warm_up(pool)
     except Exception as e:
         logger.error(f"Error connecting to database: {str(e)}")
         raise
 
     app.db_pool = pool
 
+    # Fingerprint and precompress static files before any page can link them
+    init_asset_routes(app)
+
     # Initialize all blueprint routes
     init_auth_routes(app, pool)
     init_feed_routes(app, pool)
@@ -50,6 +65,23 @@ async def create_app():
     init_media_routes(app, pool)
     init_like_routes(app, pool)
     init_tag_routes(app, pool)
+    init_meme_routes(app, pool)
+    init_pool_routes(app, pool)
+
+    # Background jobs run in this process unless JOB_WORKERS=0 (e.g. for extra web replicas)
+    job_runner = JobRunner(JobService(pool))
+    register_default_jobs(job_runner, pool)
+    app.job_runner = job_runner
+    init_job_routes(app, pool, job_runner)
+
+    if os.getenv('JOB_WORKERS', '1') != '0':
+        @app.before_serving
+        async def start_job_runner():
+            await job_runner.start()
+
+        @app.after_serving
+        async def stop_job_runner():
+            await job_runner.stop()
 
     # Debug route to list all registered routes (only in debug mode)
     if app.debug:
@@ -0,0 +1,149 @@
+"""
+Local aiohttp stand-in for the Discord messages API and CDN.
+
+Serves a deterministic message history per channel with configurable
+latency, rate limiting (429 with Retry-After) and attachment sizes.
+Attachment urls are served by the same app under /cdn.discordapp.com/...,
+so they pass extract_media_urls unchanged.
+"""
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+FIRST_MESSAGE_ID = 1100000000000000000
+CDN_CHUNK_SIZE = 64 * 1024
+
+
+class FakeDiscordConfig:
+    def __init__(self, messages_per_channel: int = 1000, media_per_message: float = 1.0,
+                 file_size: int = 256 * 1024, api_latency: float = 0.0, cdn_latency: float = 0.0,
+                 rate_limit_every: int = 0, retry_after: float = 0.05):
+        self.messages_per_channel = messages_per_channel
+        self.media_per_message = media_per_message
+        self.file_size = file_size
+        self.api_latency = api_latency
+        self.cdn_latency = cdn_latency
+        # Answer every Nth API request with 429 (0 disables)
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+
+
+class FakeDiscord:
+    def __init__(self, config: FakeDiscordConfig = None):
+        self.config = config or FakeDiscordConfig()
+        self.base_url = None
+        self.api_requests = 0
+        self.rate_limited = 0
+        self.cdn_requests = 0
+        self.cdn_bytes = 0
+        self._runner = None
+
+    @property
+    def api_base(self) -> str:
+        return f"{self.base_url}/api/v9"
+
+    def media_count(self, message_index: int) -> int:
+        # Spread fractional ratios evenly over the history
+        ratio = self.config.media_per_message
+        return int((message_index + 1) * ratio) - int(message_index * ratio)
+
+    def build_message(self, channel_id: str, message_id: int) -> dict:
+        index = message_id - FIRST_MESSAGE_ID
+        attachments = [
+            {
+                'id': f"{message_id}{n}",
+                'filename': f"{message_id}_{n}.png",
+                'url': f"{self.base_url}/cdn.discordapp.com/attachments/{channel_id}/{message_id}/{message_id}_{n}.png"
+            }
+            for n in range(self.media_count(index))
+        ]
+        timestamp = datetime(2024, 1, 1) + timedelta(minutes=index)
+        return {
+            'id': str(message_id),
+            'channel_id': channel_id,
+            'timestamp': timestamp.strftime('%Y-%m-%dT%H:%M:%S.000000+00:00'),
+            'author': {'id': str(200000000000000000 + index % 50)},
+            'content': '',
+            'attachments': attachments,
+            'embeds': []
+        }
+
+    async def messages(self, request):
+        self.api_requests += 1
+        if self.config.api_latency:
+            await asyncio.sleep(self.config.api_latency)
+
+        if self.config.rate_limit_every and self.api_requests % self.config.rate_limit_every == 0:
+            self.rate_limited += 1
+            return web.json_response(
+                {'message': 'You are being rate limited.', 'retry_after': self.config.retry_after},
+                status=429,
+                headers={'Retry-After': str(self.config.retry_after)}
+            )
+
+        channel_id = request.match_info['channel_id']
+        limit = min(int(request.query.get('limit', 50)), 100)
+        first = FIRST_MESSAGE_ID
+        last = FIRST_MESSAGE_ID + self.config.messages_per_channel - 1
+
+        if 'after' in request.query:
+            start = max(int(request.query['after']) + 1, first)
+            ids = range(start, min(start + limit, last + 1))
+        else:
+            end = min(int(request.query['before']) - 1, last) if 'before' in request.query else last
+            ids = range(max(end - limit + 1, first), end + 1)
+
+        # Discord returns newest first
+        return web.json_response([self.build_message(channel_id, message_id) for message_id in reversed(ids)])
+
+    async def cdn(self, request):
+        self.cdn_requests += 1
+        if self.config.cdn_latency:
+            await asyncio.sleep(self.config.cdn_latency)
+
+        # Unique, deterministic content per file so every file gets its own hash
+        seed = hashlib.sha256(request.path.encode()).digest()
+        size = self.config.file_size
+        response = web.StreamResponse(headers={
+            'Content-Type': 'image/png',
+            'Content-Length': str(size)
+        })
+        await response.prepare(request)
+
+        block = (b'\x89PNG\r\n\x1a\n' + seed * (CDN_CHUNK_SIZE // len(seed) + 1))[:CDN_CHUNK_SIZE]
+        sent = 0
+        while sent < size:
+            chunk = block[:min(CDN_CHUNK_SIZE, size - sent)]
+            await response.write(chunk)
+            sent += len(chunk)
+        self.cdn_bytes += sent
+        await response.write_eof()
+        return response
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/api/v9/channels/{channel_id}/messages', self.messages)
+        app.router.add_get('/cdn.discordapp.com/{path:.*}', self.cdn)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0):
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *args):
+        await self.stop()
@@ -0,0 +1,290 @@
+"""
+Ingest benchmark against a local stand-in for Discord (benchmarks/fake_discord.py).
+
+Runs the same components as download_meme.py (DiscordClient, IngestPipeline,
+sync_channel, MemeWriterService, CheckpointService) and reports messages/s,
+media/s, MB/s and the number of database round trips, so ingest changes can
+be compared run to run without Discord credentials.
+
+The database run uses a throwaway schema (ingest_benchmark by default) in
+the database given by --dsn or BENCHMARK_DSN, and drops it afterwards:
+
+    python -m benchmarks.ingest_benchmark --dsn postgresql://localhost/memedb_bench
+    python -m benchmarks.ingest_benchmark --dry-run --messages 500 --rate-limit-every 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import aiohttp
+import asyncpg
+
+from benchmarks.fake_discord import FakeDiscord, FakeDiscordConfig
+from ingest.discord_client import DiscordClient
+from ingest.pipeline import DryRunWriter, IngestPipeline, sync_channel
+from services.checkpoint_service import CheckpointService
+from services.meme_writer_service import MemeWriterService
+from services.schema_service import ensure_schema
+
+BENCHMARK_SCHEMA = 'ingest_benchmark'
+
+# Columns of the app's own tables that the pipeline and ensure_schema rely on;
+# the rest comes from ensure_schema, which also adds indexes to users and tags
+BENCHMARK_TABLES = {
+    'memes': '''
+    CREATE TABLE IF NOT EXISTS memes (
+        id SERIAL PRIMARY KEY,
+        url TEXT NOT NULL,
+        author_id TEXT,
+        timestamp TIMESTAMPTZ,
+        media_type TEXT,
+        file_data BYTEA,
+        description TEXT
+    )
+    ''',
+    'users': '''
+    CREATE TABLE IF NOT EXISTS users (
+        id SERIAL PRIMARY KEY,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT,
+        liked_memes JSONB NOT NULL DEFAULT '[]',
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    ''',
+    'tags': '''
+    CREATE TABLE IF NOT EXISTS tags (
+        id SERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        name TEXT NOT NULL
+    )
+    ''',
+    'meme_tags': '''
+    CREATE TABLE IF NOT EXISTS meme_tags (
+        meme_id INTEGER NOT NULL REFERENCES memes (id) ON DELETE CASCADE,
+        tag_id INTEGER NOT NULL REFERENCES tags (id) ON DELETE CASCADE,
+        user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        PRIMARY KEY (meme_id, tag_id, user_id)
+    )
+    ''',
+}
+
+
+class CountingConnection:
+    """
+    Proxy around an asyncpg connection that counts round trips to the server
+    """
+
+    QUERY_METHODS = {'execute', 'executemany', 'fetch', 'fetchrow', 'fetchval',
+                     'copy_records_to_table', 'copy_to_table', 'copy_from_query'}
+
+    def __init__(self, conn, counter):
+        self._conn = conn
+        self._counter = counter
+
+    def transaction(self, *args, **kwargs):
+        # BEGIN and COMMIT/ROLLBACK
+        self._counter.round_trips += 2
+        return self._conn.transaction(*args, **kwargs)
+
+    def __getattr__(self, name):
+        attr = getattr(self._conn, name)
+        if name not in self.QUERY_METHODS:
+            return attr
+
+        async def counted(*args, **kwargs):
+            self._counter.round_trips += 1
+            return await attr(*args, **kwargs)
+
+        return counted
+
+
+class CountingPool:
+    def __init__(self, pool):
+        self._pool = pool
+        self.round_trips = 0
+
+    def acquire(self):
+        return _CountingAcquire(self._pool.acquire(), self)
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+
+class _CountingAcquire:
+    def __init__(self, acquire, counter):
+        self._acquire = acquire
+        self._counter = counter
+
+    async def __aenter__(self):
+        return CountingConnection(await self._acquire.__aenter__(), self._counter)
+
+    async def __aexit__(self, *args):
+        return await self._acquire.__aexit__(*args)
+
+
+class MemoryCheckpoints:
+    """
+    In-memory CheckpointService for dry runs
+    """
+
+    def __init__(self):
+        self.checkpoints = {}
+
+    async def get_checkpoint(self, channel_id):
+        return dict(self.checkpoints.get(channel_id, {
+            'newest_message_id': None,
+            'oldest_message_id': None,
+            'backfill_complete': False
+        }))
+
+    async def record_page(self, channel_id, oldest_id, newest_id):
+        checkpoint = self.checkpoints.setdefault(channel_id, {
+            'newest_message_id': newest_id,
+            'oldest_message_id': oldest_id,
+            'backfill_complete': False
+        })
+        checkpoint['newest_message_id'] = max(checkpoint['newest_message_id'], newest_id)
+        checkpoint['oldest_message_id'] = min(checkpoint['oldest_message_id'], oldest_id)
+
+    async def mark_backfill_complete(self, channel_id):
+        self.checkpoints.setdefault(channel_id, {
+            'newest_message_id': None,
+            'oldest_message_id': None
+        })['backfill_complete'] = True
+
+
+async def create_benchmark_pool(dsn: str, schema: str = BENCHMARK_SCHEMA):
+    """
+    Create a pool whose connections resolve tables in the benchmark schema
+    """
+    admin = await asyncpg.connect(dsn)
+    try:
+        await admin.execute(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+        await admin.execute(f'CREATE SCHEMA {schema}')
+    finally:
+        await admin.close()
+
+    # public stays on the path after the benchmark schema for extensions
+    # installed there (pg_trgm); every table ensure_schema touches exists in
+    # the benchmark schema, so none of them resolves to public
+    pool = await asyncpg.create_pool(dsn, min_size=2, max_size=10,
+                                     server_settings={'search_path': f'{schema}, public'})
+    async with pool.acquire() as conn:
+        for statement in BENCHMARK_TABLES.values():
+            await conn.execute(statement)
+    await ensure_schema(pool)
+    return pool
+
+
+async def drop_benchmark_schema(pool, schema: str = BENCHMARK_SCHEMA):
+    async with pool.acquire() as conn:
+        await conn.execute(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+
+
+async def run_benchmark(config: FakeDiscordConfig, channels: int = 1, dsn: str = None,
+                        dry_run: bool = False, download_workers: int = 4, cpu_workers: int = None,
+                        batch_size: int = 100, keep: bool = False, spool_dir: str = None) -> dict:
+    """
+    Ingest the fake channels once and return the measured rates
+    """
+    pool = None
+    counter = None
+    if dry_run:
+        writer = DryRunWriter()
+        checkpoints = MemoryCheckpoints()
+    else:
+        pool = await create_benchmark_pool(dsn)
+        counter = CountingPool(pool)
+        writer = MemeWriterService(counter, batch_size=batch_size)
+        checkpoints = CheckpointService(counter)
+
+    try:
+        async with FakeDiscord(config) as fake, aiohttp.ClientSession() as session, writer:
+            client = DiscordClient(session, api_base=fake.api_base, page_delay=0, spool_dir=spool_dir)
+            started = time.monotonic()
+            async with IngestPipeline(writer, client.download_media, checkpoints=checkpoints,
+                                      download_workers=download_workers,
+                                      cpu_workers=cpu_workers) as pipeline:
+                for n in range(channels):
+                    await sync_channel(str(900000000000000000 + n), client, pipeline, checkpoints)
+                stages = pipeline.report()
+            elapsed = max(time.monotonic() - started, 1e-9)
+
+            messages = config.messages_per_channel * channels
+            media = sum(fake.media_count(i) for i in range(config.messages_per_channel)) * channels
+            return {
+                'elapsed': round(elapsed, 3),
+                'messages': messages,
+                'media': media,
+                'messages_per_sec': round(messages / elapsed, 1),
+                'media_per_sec': round(media / elapsed, 1),
+                'mb_per_sec': round(fake.cdn_bytes / elapsed / (1024 * 1024), 2),
+                'api_requests': fake.api_requests,
+                'rate_limited': fake.rate_limited,
+                'db_round_trips': counter.round_trips if counter else 0,
+                'rows_written': len(writer.rows) if dry_run else writer.rows_written,
+                'stages': stages
+            }
+    finally:
+        if pool:
+            if not keep:
+                await drop_benchmark_schema(pool)
+            await pool.close()
+
+
+def print_results(results: dict):
+    print(f"\n{results['messages']} messages, {results['media']} media in {results['elapsed']}s")
+    print(f"  {results['messages_per_sec']} messages/s")
+    print(f"  {results['media_per_sec']} media/s")
+    print(f"  {results['mb_per_sec']} MB/s")
+    print(f"  {results['db_round_trips']} DB round trips, {results['rows_written']} rows written")
+    print(f"  {results['api_requests']} API requests, {results['rate_limited']} rate limited")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the ingest pipeline against a fake Discord')
+    parser.add_argument('--dsn', default=os.getenv('BENCHMARK_DSN'),
+                        help='Postgres DSN for the benchmark schema (default: BENCHMARK_DSN)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Skip the database and count rows in memory')
+    parser.add_argument('--keep', action='store_true',
+                        help=f'Keep the {BENCHMARK_SCHEMA} schema after the run')
+    parser.add_argument('--channels', type=int, default=1)
+    parser.add_argument('--messages', type=int, default=1000, help='Messages per channel')
+    parser.add_argument('--media-per-message', type=float, default=1.0)
+    parser.add_argument('--file-size', type=int, default=256, help='Media file size in KB')
+    parser.add_argument('--api-latency', type=float, default=0.0, help='Seconds per API request')
+    parser.add_argument('--cdn-latency', type=float, default=0.0, help='Seconds per CDN request')
+    parser.add_argument('--rate-limit-every', type=int, default=0,
+                        help='Answer every Nth API request with 429 (default: never)')
+    parser.add_argument('--retry-after', type=float, default=0.05)
+    parser.add_argument('--download-workers', type=int, default=4)
+    parser.add_argument('--cpu-workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=100, help='Rows per writer flush')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    if not args.dry_run and not args.dsn:
+        parser.error('--dsn (or BENCHMARK_DSN) is required unless --dry-run is given')
+
+    config = FakeDiscordConfig(
+        messages_per_channel=args.messages,
+        media_per_message=args.media_per_message,
+        file_size=args.file_size * 1024,
+        api_latency=args.api_latency,
+        cdn_latency=args.cdn_latency,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after
+    )
+    results = asyncio.run(run_benchmark(
+        config, channels=args.channels, dsn=args.dsn, dry_run=args.dry_run,
+        download_workers=args.download_workers, cpu_workers=args.cpu_workers,
+        batch_size=args.batch_size, keep=args.keep
+    ))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
@@ -0,0 +1,208 @@
+"""
+Login storm benchmark: feed request latency while many logins are checked.
+
+Serves a minimal Quart app with the real /login code path (UserService and
+the bcrypt hasher) over an in-memory users table, and a cheap /api/feed
+route standing in for feed and media requests. A prober requests /api/feed
+at a fixed interval while a burst of logins runs, and the probe latencies
+are compared with an idle baseline.
+
+Runs once with the bounded hasher and once with bcrypt called directly on
+the event loop (the old behaviour), unless --mode picks one:
+
+    python -m benchmarks.login_storm
+    python -m benchmarks.login_storm --logins 200 --concurrency 50 --workers 4 --queue-limit 64
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import bcrypt
+from quart import Quart, jsonify, request
+
+from services.password_hasher import HasherBusyError, PasswordHasher
+from services.user_service import UserService
+
+
+BENCHMARK_USER = 'storm'
+BENCHMARK_PASSWORD = 'correct horse battery staple'
+
+
+class InlineHasher:
+    """
+    bcrypt on the event loop, as UserService did before PasswordHasher
+    """
+
+    async def hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+    async def check(self, password: str, password_hash: str) -> bool:
+        return bcrypt.checkpw(password.encode(), password_hash.encode())
+
+    def shutdown(self):
+        pass
+
+
+class MemoryUsers:
+    """
+    Just enough of an asyncpg pool for UserService.authenticate_user
+    """
+
+    def __init__(self, password_hash: str):
+        self.row = {'id': 1, 'password_hash': password_hash}
+
+    def acquire(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def fetchrow(self, query, username):
+        return self.row if username == BENCHMARK_USER else None
+
+
+def create_storm_app(hasher, password_hash: str) -> Quart:
+    app = Quart(__name__)
+    app.secret_key = 'login-storm'
+    user_service = UserService(MemoryUsers(password_hash), hasher=hasher)
+
+    @app.route('/login', methods=['POST'])
+    async def login():
+        data = await request.get_json()
+        try:
+            ok = await user_service.authenticate_user(data['username'], data['password'])
+        except HasherBusyError:
+            return jsonify({'success': False}), 503
+        return jsonify({'success': ok}), 200 if ok else 401
+
+    @app.route('/api/feed')
+    async def feed():
+        return jsonify({'memes': [{'id': i, 'media_type': 'image'} for i in range(10)]})
+
+    return app
+
+
+def percentiles(samples: list) -> dict:
+    if not samples:
+        return {'count': 0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    ordered = sorted(samples)
+
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 2)
+
+    return {
+        'count': len(ordered),
+        'p50_ms': round(statistics.median(ordered) * 1000, 2),
+        'p95_ms': at(0.95),
+        'p99_ms': at(0.99),
+        'max_ms': round(ordered[-1] * 1000, 2)
+    }
+
+
+async def probe_feed(client, stop: asyncio.Event, interval: float) -> list:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get('/api/feed')
+        await response.get_data()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run_storm(mode: str, logins: int = 100, concurrency: int = 25, workers: int = 2,
+                    queue_limit: int = 32, rounds: int = 12, probe_interval: float = 0.01,
+                    baseline_seconds: float = 1.0) -> dict:
+    """
+    Measure feed latency idle and during a burst of logins
+    mode is 'executor' (PasswordHasher) or 'inline' (bcrypt on the event loop)
+    """
+    password_hash = bcrypt.hashpw(BENCHMARK_PASSWORD.encode(), bcrypt.gensalt(rounds)).decode()
+    hasher = PasswordHasher(workers=workers, queue_limit=queue_limit) if mode == 'executor' else InlineHasher()
+    app = create_storm_app(hasher, password_hash)
+    statuses = {'ok': 0, 'rejected': 0, 'failed': 0}
+
+    try:
+        async with app.test_app() as test_app:
+            client = test_app.test_client()
+
+            stop = asyncio.Event()
+            prober = asyncio.create_task(probe_feed(client, stop, probe_interval))
+            await asyncio.sleep(baseline_seconds)
+            stop.set()
+            baseline = await prober
+
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def login():
+                async with semaphore:
+                    response = await client.post('/login', json={
+                        'username': BENCHMARK_USER, 'password': BENCHMARK_PASSWORD
+                    })
+                key = {200: 'ok', 503: 'rejected'}.get(response.status_code, 'failed')
+                statuses[key] += 1
+
+            stop = asyncio.Event()
+            prober = asyncio.create_task(probe_feed(client, stop, probe_interval))
+            started = time.perf_counter()
+            await asyncio.gather(*(login() for _ in range(logins)))
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            stop.set()
+            storm = await prober
+    finally:
+        hasher.shutdown()
+
+    return {
+        'mode': mode,
+        'logins': logins,
+        'elapsed': round(elapsed, 3),
+        'logins_per_sec': round(statuses['ok'] / elapsed, 1),
+        'rejected': statuses['rejected'],
+        'failed': statuses['failed'],
+        'feed_idle': percentiles(baseline),
+        'feed_during_logins': percentiles(storm)
+    }
+
+
+def print_results(results: dict):
+    idle, storm = results['feed_idle'], results['feed_during_logins']
+    print(f"\n{results['mode']}: {results['logins']} logins in {results['elapsed']}s "
+          f"({results['logins_per_sec']} logins/s, {results['rejected']} rejected, {results['failed']} failed)")
+    print(f"  feed idle:          p50 {idle['p50_ms']} ms, p95 {idle['p95_ms']} ms, max {idle['max_ms']} ms")
+    print(f"  feed during logins: p50 {storm['p50_ms']} ms, p95 {storm['p95_ms']} ms, "
+          f"max {storm['max_ms']} ms ({storm['count']} requests)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure feed latency during a burst of logins')
+    parser.add_argument('--mode', choices=['executor', 'inline', 'both'], default='both',
+                        help='Hash in the bounded executor, on the event loop, or compare both')
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=25, help='Logins in flight at once')
+    parser.add_argument('--workers', type=int, default=2, help='Hasher threads')
+    parser.add_argument('--queue-limit', type=int, default=32, help='Hashes allowed to wait for a thread')
+    parser.add_argument('--rounds', type=int, default=12, help='bcrypt cost factor of the stored hash')
+    parser.add_argument('--probe-interval', type=float, default=0.01,
+                        help='Seconds between feed requests')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    modes = ['executor', 'inline'] if args.mode == 'both' else [args.mode]
+    results = [
+        asyncio.run(run_storm(
+            mode, logins=args.logins, concurrency=args.concurrency, workers=args.workers,
+            queue_limit=args.queue_limit, rounds=args.rounds, probe_interval=args.probe_interval
+        ))
+        for mode in modes
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print_results(result)
@@ -0,0 +1,49 @@
+from quart import Blueprint, Response, request, url_for
+from services.asset_service import assets, etag_matches
+
+
+asset_bp = Blueprint('assets', __name__)
+
+
+def init_asset_routes(app):
+    assets.build(app.static_folder)
+    print(f"Built {len(assets.assets)} static assets")
+
+    @app.template_global()
+    def asset_url(filename: str) -> str:
+        """
+        URL of a static file under its content-hashed name
+        """
+        hashed_path = assets.hashed_path(filename)
+        if app.debug or not hashed_path:
+            # Edits show up without a restart while debugging
+            return url_for('static', filename=filename)
+        return url_for('assets.serve_asset', filename=hashed_path)
+
+    @app.template_global()
+    def inline_asset(filename: str, default: str = '') -> str:
+        return assets.inline(filename, default)
+
+    @asset_bp.route('/assets/<path:filename>')
+    async def serve_asset(filename):
+        asset, immutable = assets.get(filename)
+        if not asset:
+            return Response('Asset not found', status=404)
+
+        encoding, body = asset.select(request.headers.get('Accept-Encoding'))
+        headers = {
+            # Every encoding is its own representation with its own validator
+            'ETag': asset.etag_for(encoding),
+            'Vary': 'Accept-Encoding',
+            # Hashed names never change content, so browsers need not revalidate them
+            'Cache-Control': 'public, max-age=31536000, immutable' if immutable else 'no-cache'
+        }
+        if etag_matches(request.headers.get('If-None-Match'), headers['ETag']):
+            return Response(status=304, headers=headers)
+
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        headers['Content-Length'] = str(len(body))
+        return Response(body, content_type=asset.content_type, headers=headers)
+
+    app.register_blueprint(asset_bp)
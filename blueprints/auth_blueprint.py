@@ -1,5 +1,6 @@
 from quart import Blueprint, render_template, request, redirect, url_for, session
 from services.user_service import UserService
+from services.password_hasher import HasherBusyError
 
 
 auth_bp = Blueprint('auth', __name__)
@@ -29,6 +30,11 @@ def init_auth_routes(app, pool):
                                                navbar_position='nav-bottom',
                                                next=next_url)
 
+            except HasherBusyError:
+                return await render_template('login.html',
+                                           error='Too many logins right now, please try again',
+                                           navbar_position='nav-bottom',
+                                           next=next_url), 503
             except Exception as e:
                 print(f"Login error: {str(e)}")
                 return await render_template('login.html',
@@ -1,5 +1,6 @@
 from quart import Blueprint, render_template, jsonify, request, session
 from services.feed_service import FeedService
+from services import queries
 import json
 
 
@@ -12,30 +13,11 @@ def init_feed_routes(app, pool):
     @feed_bp.route('/')
     async def index():
         try:
-            # Get navbar position for current user
-            navbar_position = 'bottom'  # Default position
-            if 'username' in session:
-                async with pool.acquire() as conn:
-                    user = await conn.fetchrow(
-                        'SELECT ui_settings FROM users WHERE username = $1',
-                        session['username']
-                    )
-                    if user and user['ui_settings']:
-                        try:
-                            ui_settings = json.loads(user['ui_settings']) if isinstance(user['ui_settings'], str) else user['ui_settings']
-                            if 'navbar' in ui_settings:
-                                navbar_settings = ui_settings['navbar']
-                                # Use PC position if available, otherwise use any position
-                                navbar_position = navbar_settings.get('pc', navbar_settings.get('PC', 'bottom'))
-                        except (json.JSONDecodeError, TypeError):
-                            pass
-            
             # Load the initial page with an empty feed
             # The first batch of memes will be loaded via /api/feed by JS
             return await render_template('index.html',
                                          feed_items=[], # Start empty
-                                         has_more=True, # Assume more available initially
-                                         navbar_position=f"nav-{navbar_position}" # Pass navbar position
+                                         has_more=True # Assume more available initially
                                         )
         except Exception as e:
             print(f"Error in index route: {str(e)}")
@@ -58,10 +40,7 @@ def init_feed_routes(app, pool):
             liked_memes = []
             if 'username' in session:
                 async with pool.acquire() as conn:
-                    user = await conn.fetchrow(
-                        'SELECT liked_memes FROM users WHERE username = $1',
-                        session['username']
-                    )
+                    user = await queries.fetchrow(conn, 'user_likes', session['username'])
                     if user and user['liked_memes']:
                         try:
                             liked_memes = json.loads(user['liked_memes'])
@@ -0,0 +1,31 @@
+from quart import Blueprint, jsonify, session
+from services.job_service import JobService
+
+
+job_bp = Blueprint('jobs', __name__)
+
+
+def init_job_routes(app, pool, job_runner):
+    job_service = JobService(pool)
+
+    @job_bp.route('/api/jobs/status', methods=['GET'])
+    async def job_status():
+        if 'username' not in session:
+            return jsonify({'status': 'error', 'message': 'Not logged in'}), 401
+
+        try:
+            queues = await job_service.get_stats()
+        except Exception as e:
+            print(f"Error fetching job stats: {str(e)}")
+            return jsonify({'status': 'error', 'message': str(e)})
+
+        return jsonify({
+            'status': 'success',
+            'queues': queues,
+            'worker': {
+                'id': job_runner.worker_id,
+                'job_types': job_runner.get_status()
+            }
+        })
+
+    app.register_blueprint(job_bp)
@@ -0,0 +1,17 @@
+from quart import Blueprint, jsonify, request
+from services.meme_service import MemeService
+
+
+meme_bp = Blueprint('meme', __name__)
+
+
+def init_meme_routes(app, pool):
+    meme_service = MemeService(pool)
+
+    @meme_bp.route('/api/memes/hydrate', methods=['GET'])
+    async def hydrate_memes():
+        meme_ids = [meme_id for meme_id in request.args.get('ids', '').split(',') if meme_id]
+        result = await meme_service.hydrate_memes(meme_ids)
+        return jsonify(result)
+
+    app.register_blueprint(meme_bp)
@@ -0,0 +1,23 @@
+from quart import Blueprint, jsonify, session
+
+
+pool_bp = Blueprint('pool', __name__)
+
+
+def init_pool_routes(app, pool):
+
+    @pool_bp.route('/api/db/pool', methods=['GET'])
+    async def pool_status():
+        """
+        Connection pool usage, e.g. to see whether /media requests hold the
+        connections the feed is waiting for
+        """
+        if 'username' not in session:
+            return jsonify({'status': 'error', 'message': 'Not logged in'}), 401
+
+        if not hasattr(pool, 'get_stats'):
+            return jsonify({'status': 'error', 'message': 'Pool is not instrumented'})
+
+        return jsonify({'status': 'success', 'pool': pool.get_stats()})
+
+    app.register_blueprint(pool_bp)
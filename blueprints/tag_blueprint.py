@@ -10,11 +10,21 @@ def init_tag_routes(app, pool):
     
     @tag_bp.route('/api/tags', methods=['GET'])
     async def get_user_tags():
-        result = await tag_service.get_user_tags(session.get('username'))
+        result = await tag_service.get_user_tags(session.get('username'), request.args.get('sort', 'recent'))
         if result['status'] == 'error' and result['message'] == 'Not logged in':
             return jsonify(result), 401
         return jsonify(result)
         
+    @tag_bp.route('/api/tags/suggest', methods=['GET'])
+    async def suggest_tags():
+        result = await tag_service.suggest_tags(
+            request.args.get('prefix', ''),
+            request.args.get('limit', 10)
+        )
+        if result['status'] == 'error' and result['message'] == 'Not logged in':
+            return jsonify(result), 401
+        return jsonify(result)
+
     @tag_bp.route('/api/tags', methods=['POST'])
     async def create_tag():
         try:
@@ -69,4 +79,35 @@ def init_tag_routes(app, pool):
             return jsonify(result), 404
         return jsonify(result)
         
+    @tag_bp.route('/api/memes/tags/bulk', methods=['POST'])
+    async def bulk_update_meme_tags():
+        try:
+            data = await request.get_json()
+            if not data:
+                return jsonify({'status': 'error', 'message': 'Request body is required'}), 400
+
+            result = await tag_service.bulk_update_meme_tags(
+                data.get('meme_ids', []),
+                data.get('tag_ids', []),
+                data.get('action', 'add')
+            )
+            if result['status'] == 'error' and result['message'] == 'Not logged in':
+                return jsonify(result), 401
+            return jsonify(result)
+        except Exception as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 500
+
+    @tag_bp.route('/api/liked-memes/filter', methods=['GET'])
+    async def filter_liked_memes():
+        tag_ids = [tag_id for tag_id in request.args.get('tags', '').split(',') if tag_id]
+        result = await tag_service.get_liked_memes_by_tags(
+            tag_ids,
+            request.args.get('mode', 'all'),
+            request.args.get('before') or None,
+            request.args.get('limit', 24)
+        )
+        if result['status'] == 'error' and result['message'] == 'Not logged in':
+            return jsonify(result), 401
+        return jsonify(result)
+
     app.register_blueprint(tag_bp)
@@ -1,8 +1,11 @@
 from quart import Blueprint, render_template, request, redirect, url_for, session, jsonify
 from services.user_service import UserService
 from services.tag_service import TagService
-import asyncio
-import json
+from services.user_context import invalidate_user
+from services.settings_service import SettingsService
+from services.search_service import SearchService
+from services.job_service import JobService
+from services import queries
 
 
 user_bp = Blueprint('user', __name__)
@@ -11,6 +14,18 @@ user_bp = Blueprint('user', __name__)
 def init_user_routes(app, pool):
     user_service = UserService(pool)
     tag_service = TagService(pool)
+    settings_service = SettingsService(pool)
+    search_service = SearchService(pool)
+    job_service = JobService(pool)
+
+    @user_bp.app_context_processor
+    async def inject_ui_settings():
+        # Every page renders the navbar, so its position comes from the cached settings
+        navbar_settings = await settings_service.get_navbar_settings(session.get('username'))
+        return {
+            'navbar_settings': navbar_settings,
+            'navbar_position': f"nav-{navbar_settings['pc']}"
+        }
     
     @user_bp.before_request
     async def require_login():
@@ -20,32 +35,22 @@ def init_user_routes(app, pool):
     @user_bp.route('/users')
     async def users():
         try:
-            # Get navbar position for current user
-            navbar_position = 'bottom'  # Default position
-            if 'username' in session:
-                async with pool.acquire() as conn:
-                    user = await conn.fetchrow(
-                        'SELECT ui_settings FROM users WHERE username = $1',
-                        session['username']
-                    )
-                    if user and user['ui_settings']:
-                        try:
-                            ui_settings = json.loads(user['ui_settings'])
-                            if 'navbar' in ui_settings:
-                                navbar_settings = ui_settings['navbar']
-                                # Use PC position if available, otherwise use any position
-                                navbar_position = navbar_settings.get('pc', navbar_settings.get('PC', 'bottom'))
-                        except (json.JSONDecodeError, TypeError):
-                            pass
-            
-            user_list = await user_service.get_all_users()
+            page = await user_service.get_users_page()
             return await render_template('users.html', 
-                                        users=user_list,
-                                        navbar_position=f"nav-{navbar_position}")
+                                        users=page.get('users', []),
+                                        next_cursor=page.get('next_cursor'))
         except Exception as e:
             print(f"Error fetching users: {str(e)}")
             return redirect(url_for('feed.index'))
 
+    @user_bp.route('/api/users')
+    async def users_page():
+        result = await user_service.get_users_page(
+            before=request.args.get('before'),
+            limit=request.args.get('limit', 30)
+        )
+        return jsonify(result)
+
     @user_bp.route('/user/<username>')
     async def user_profile(username):
         try:
@@ -53,33 +58,24 @@ def init_user_routes(app, pool):
             if not profile_data:
                 return redirect(url_for('feed.index'))
             
-            # Get navbar position for current user
-            navbar_position = 'bottom'  # Default position
-            if 'username' in session:
-                async with pool.acquire() as conn:
-                    user = await conn.fetchrow(
-                        'SELECT ui_settings FROM users WHERE username = $1',
-                        session['username']
-                    )
-                    if user and user['ui_settings']:
-                        try:
-                            ui_settings = json.loads(user['ui_settings'])
-                            if 'navbar' in ui_settings:
-                                navbar_settings = ui_settings['navbar']
-                                # Use PC position if available, otherwise use any position
-                                navbar_position = navbar_settings.get('pc', navbar_settings.get('PC', 'bottom'))
-                        except (json.JSONDecodeError, TypeError):
-                            pass
-            
             return await render_template('user_profile.html', 
                 user=profile_data['user'],
                 liked_memes=profile_data['liked_memes'],
-                navbar_position=f"nav-{navbar_position}"
+                next_cursor=profile_data['next_cursor']
             )
         except Exception as e:
             print(f"Error fetching user profile: {str(e)}")
             return redirect(url_for('feed.index'))
 
+    @user_bp.route('/api/users/<username>/liked-memes')
+    async def user_liked_memes(username):
+        result = await user_service.get_liked_memes_page(
+            username,
+            before=request.args.get('before'),
+            limit=request.args.get('limit', 24)
+        )
+        return jsonify(result)
+
     @user_bp.route('/profile')
     async def profile():
         try:
@@ -87,26 +83,10 @@ def init_user_routes(app, pool):
             if not profile_data:
                 return redirect(url_for('auth.login'))
 
-            # Get navbar position for current user
-            navbar_position = 'bottom'  # Default position
-            if profile_data and profile_data.get('navbar_settings'):
-                navbar_settings_data = profile_data['navbar_settings']
-                # Get the position for the navbar
-                navbar_position = navbar_settings_data.get('pc', navbar_settings_data.get('PC', 'bottom'))
-            
-            # Read the loading animation SVG from static file
-            try:
-                loading_svg = await asyncio.to_thread(lambda: open('static/loading-animation.svg', 'r').read())
-            except Exception as e:
-                print(f"Error reading loading animation SVG: {str(e)}")
-                loading_svg = '<div>Loading...</div>'
-
             return await render_template('profile.html', 
                 username=profile_data['username'],
                 member_since=profile_data['member_since'],
-                bio=profile_data['bio'],
-                loading_svg=loading_svg,
-                navbar_position=f"nav-{navbar_position}"
+                bio=profile_data['bio']
             )
         except Exception as e:
             print(f"Error fetching profile: {str(e)}")
@@ -126,29 +106,11 @@ def init_user_routes(app, pool):
             
             # GET request - show settings page
             async with pool.acquire() as conn:
-                user = await conn.fetchrow(
-                    'SELECT username, bio FROM users WHERE username = $1',
-                    session['username']
-                )
-            # Get navbar settings
-            navbar_settings = await user_service.get_current_user_profile()
-            navbar_settings_dict = {"PC": "left", "Mobile": "bottom"}  # Default navbar settings
-            navbar_position = 'bottom'  # Default position
-
-            if navbar_settings and navbar_settings.get('navbar_settings'):
-                navbar_settings_data = navbar_settings['navbar_settings']
-                # Extract just the navbar positioning from ui_settings.navbar
-                if 'navbar' in navbar_settings_data:
-                    navbar_settings_dict = navbar_settings_data['navbar']
-                    navbar_position = navbar_settings_data['navbar'].get('pc', navbar_settings_data['navbar'].get('PC', 'bottom'))
-                else:
-                    navbar_settings_dict = navbar_settings_data
-                    navbar_position = navbar_settings_data.get('pc', navbar_settings_data.get('PC', 'bottom'))
+                user = await queries.fetchrow(conn, 'user_profile', session['username'])
 
+            # navbar_settings comes from the context processor
             return await render_template('settings.html',
-                                        bio=user['bio'],
-                                        navbar_settings=navbar_settings_dict,
-                                        navbar_position=f"nav-{navbar_position}")
+                                        bio=user['bio'])
         except Exception as e:
             print(f"Error loading settings: {str(e)}")
             return redirect(url_for('feed.index'))
@@ -160,11 +122,16 @@ def init_user_routes(app, pool):
                 return jsonify({'success': False, 'error': 'Not logged in'}), 401
 
             async with pool.acquire() as conn:
-                await conn.execute(
-                    'DELETE FROM users WHERE username = $1',
-                    session['username']
-                )
+                user_id = await queries.fetchval(conn, 'delete_user', session['username'])
+
+            if user_id:
+                # Tags and taggings of the account are removed in the background
+                await job_service.enqueue('account_cleanup', {'user_id': user_id}, priority=10)
+                if getattr(app, 'job_runner', None):
+                    app.job_runner.wake('account_cleanup')
 
+            invalidate_user(session['username'])
+            SettingsService.invalidate(session['username'])
             session.clear()
             return jsonify({'success': True})
         except Exception as e:
@@ -177,34 +144,7 @@ def init_user_routes(app, pool):
             data = await request.get_json()
             navbar_settings = data.get('navbarSettings', {})
             
-            async with pool.acquire() as conn:
-                # Get current ui_settings
-                user = await conn.fetchrow(
-                    'SELECT ui_settings FROM users WHERE username = $1',
-                    session['username']
-                )
-                
-                # Update navbar settings within ui_settings
-                current_ui_settings = {}
-                if user['ui_settings']:
-                    try:
-                        # Parse the JSON string if it's a string, otherwise use as-is
-                        if isinstance(user['ui_settings'], str):
-                            current_ui_settings = json.loads(user['ui_settings'])
-                        else:
-                            current_ui_settings = user['ui_settings']
-                    except (json.JSONDecodeError, TypeError):
-                        # If parsing fails, start with an empty dict
-                        current_ui_settings = {}
-                
-                current_ui_settings['navbar'] = navbar_settings
-                
-                await conn.execute(
-                    'UPDATE users SET ui_settings = $1 WHERE username = $2',
-                    json.dumps(current_ui_settings),
-                    session['username']
-                )
-            
+            await settings_service.update_navbar_settings(session['username'], navbar_settings)
             return jsonify({'success': True})
         except Exception as e:
             print(f"Error updating navbar settings: {str(e)}")
@@ -215,49 +155,20 @@ def init_user_routes(app, pool):
     async def search():
         try:
             query = request.args.get('q', '')
-            results = []
-            
-            # Get navbar position for current user
-            navbar_position = 'bottom'  # Default position
-            if 'username' in session:
-                async with pool.acquire() as conn:
-                    user = await conn.fetchrow(
-                        'SELECT ui_settings FROM users WHERE username = $1',
-                        session['username']
-                    )
-                    if user and user['ui_settings']:
-                        try:
-                            ui_settings = json.loads(user['ui_settings'])
-                            if 'navbar' in ui_settings:
-                                navbar_settings = ui_settings['navbar']
-                                # Use PC position if available, otherwise use any position
-                                navbar_position = navbar_settings.get('pc', navbar_settings.get('PC', 'bottom'))
-                        except (json.JSONDecodeError, TypeError):
-                            pass
-            
-            if query:
-                async with pool.acquire() as conn:
-                    # Search users
-                    users = await conn.fetch(
-                        'SELECT username FROM users WHERE username ILIKE $1 LIMIT 10',
-                        f'%{query}%'
-                    )
-                    
-                    # Search memes
-                    memes = await conn.fetch(
-                        'SELECT id, media_type FROM memes WHERE description ILIKE $1 LIMIT 10',
-                        f'%{query}%'
-                    )
-                    
-                    results = [
-                        *[{'type': 'user', 'data': u} for u in users],
-                        *[{'type': 'meme', 'data': m} for m in memes]
-                    ]
+            search_result = await search_service.search(query, page=request.args.get('page', 1))
+            if search_result['status'] != 'success':
+                search_result = {'page': 1, 'users': [], 'memes': [], 'has_more': False}
+
+            results = [
+                *[{'type': 'user', 'data': u} for u in search_result['users']],
+                *[{'type': 'meme', 'data': m} for m in search_result['memes']]
+            ]
             
             return await render_template('search.html', 
                 query=query,
                 results=results,
-                navbar_position=f"nav-{navbar_position}"
+                page=search_result['page'],
+                has_more=search_result['has_more']
             )
         except Exception as e:
             print(f"Error during search: {str(e)}")
@@ -266,30 +177,10 @@ def init_user_routes(app, pool):
     @user_bp.route('/tags')
     async def tags():
         try:
-            # Get navbar position for current user
-            navbar_position = 'bottom'  # Default position
-            if 'username' in session:
-                async with pool.acquire() as conn:
-                    user = await conn.fetchrow(
-                        'SELECT ui_settings FROM users WHERE username = $1',
-                        session['username']
-                    )
-                    if user and user['ui_settings']:
-                        try:
-                            ui_settings = json.loads(user['ui_settings'])
-                            if 'navbar' in ui_settings:
-                                navbar_settings = ui_settings['navbar']
-                                # Use PC position if available, otherwise use any position
-                                navbar_position = navbar_settings.get('pc', navbar_settings.get('PC', 'bottom'))
-                        except (json.JSONDecodeError, TypeError):
-                            pass
-            
             # Get user tags
             tags_result = await tag_service.get_user_tags(session.get('username'))
             
-            return await render_template('tags.html', 
-                navbar_position=f"nav-{navbar_position}"
-            )
+            return await render_template('tags.html')
         except Exception as e:
             print(f"Error loading tags page: {str(e)}")
             return redirect(url_for('feed.index'))
@@ -0,0 +1,207 @@
+"""
+Bulk import of memes from a local directory tree.
+
+Files are hashed and probed in parallel in a process pool, files whose
+content hash is already stored are skipped, and new rows are loaded with
+large COPY batches streamed from the original files. Stored memes without
+a content hash (ingested before it was recorded) are hashed first, so an
+archive of memes that are already stored is not imported a second time.
+
+    python -m ingest.directory_import /path/to/archive
+"""
+import argparse
+import asyncio
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from ingest.media_processing import process_media
+from ingest.pipeline import DryRunWriter, StageStats
+from ingest.spool import SpooledFile
+from services.database_service import create_database_pool
+from services.meme_writer_service import MemeWriterService
+from services.schema_service import ensure_schema
+
+MEDIA_EXTENSIONS = {
+    '.png': 'image', '.jpg': 'image', '.jpeg': 'image', '.webp': 'image',
+    '.gif': 'gif',
+    '.mp4': 'video', '.webm': 'video', '.mov': 'video'
+}
+LOCAL_AUTHOR_ID = 'local-import'
+
+
+def iter_media_files(root: str):
+    """
+    Walk a directory tree in a stable order, yielding media file paths
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in MEDIA_EXTENSIONS:
+                yield os.path.join(dirpath, filename)
+
+
+def media_type_for(path: str, content_type: str = None) -> str:
+    if content_type == 'image/gif':
+        return 'gif'
+    if content_type and content_type.startswith('image/'):
+        return 'image'
+    if content_type and content_type.startswith('video/'):
+        return 'video'
+    return MEDIA_EXTENSIONS.get(os.path.splitext(path)[1].lower(), 'video')
+
+
+async def import_directory(root: str, writer, workers: int = None, check_batch: int = 200,
+                           executor=None, report_interval: float = 10.0) -> dict:
+    """
+    Import every media file below root
+    Returns dict with files/bytes per second and skip counts
+    """
+    # Known memes are only recognized by their hash
+    backfilled = await writer.backfill_content_hashes()
+    if backfilled:
+        print(f"Hashed {backfilled} stored memes that had no content hash")
+
+    workers = workers or os.cpu_count() or 1
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+
+    loop = asyncio.get_running_loop()
+    path_queue = asyncio.Queue(maxsize=workers * 4)
+    result_queue = asyncio.Queue(maxsize=check_batch)
+    stats = {
+        'hash': StageStats('hash', path_queue),
+        'write': StageStats('write', result_queue)
+    }
+    skipped = {'known': 0, 'failed': 0}
+
+    async def walk():
+        try:
+            for path in iter_media_files(root):
+                await path_queue.put(path)
+        finally:
+            for _ in range(workers):
+                await path_queue.put(None)
+
+    async def hash_worker():
+        while True:
+            path = await path_queue.get()
+            if path is None:
+                break
+            try:
+                info = await loop.run_in_executor(
+                    executor, process_media, media_type_for(path), path, None, False
+                )
+            except Exception as e:
+                skipped['failed'] += 1
+                print(f"Error processing {path}: {str(e)}")
+                continue
+            stats['hash'].record(info['file_size'])
+            await result_queue.put((path, info))
+
+    async def hash_stage():
+        await asyncio.gather(*[hash_worker() for _ in range(workers)])
+        await result_queue.put(None)
+
+    async def store(batch):
+        # One lookup per batch for hashes and urls already stored
+        new_hashes = set(await writer.filter_new_hashes([info['content_hash'] for _, info in batch]))
+        urls = {path: pathlib.Path(path).resolve().as_uri() for path, _ in batch}
+        new_urls = set(await writer.filter_new_urls(list(urls.values())))
+
+        for path, info in batch:
+            rewritten = info['path'] != path
+            if info['content_hash'] not in new_hashes or urls[path] not in new_urls:
+                skipped['known'] += 1
+                if rewritten:
+                    os.remove(info['path'])
+                continue
+            new_hashes.discard(info['content_hash'])
+
+            # Stream the original (or the faststart copy) from disk
+            spooled = SpooledFile(info['path'], info['file_size'], info['content_hash'], owned=rewritten)
+            await writer.add(
+                urls[path],
+                LOCAL_AUTHOR_ID,
+                datetime.fromtimestamp(os.path.getmtime(path)),
+                media_type_for(path, info['content_type']),
+                spooled,
+                content_hash=info['content_hash'],
+                file_size=info['file_size'],
+                width=info['width'],
+                height=info['height'],
+                thumbnail=info['thumbnail']
+            )
+            stats['write'].record(info['file_size'])
+
+    async def write_stage():
+        batch = []
+        while True:
+            item = await result_queue.get()
+            if item is None:
+                break
+            batch.append(item)
+            if len(batch) >= check_batch:
+                await store(batch)
+                batch = []
+        if batch:
+            await store(batch)
+        await writer.flush()
+
+    async def report_periodically():
+        while True:
+            await asyncio.sleep(report_interval)
+            print(' | '.join(str(stage) for stage in stats.values()))
+
+    reporter = asyncio.create_task(report_periodically())
+    try:
+        await asyncio.gather(walk(), hash_stage(), write_stage())
+    finally:
+        reporter.cancel()
+        if owns_executor:
+            executor.shutdown()
+
+    hashed = stats['hash'].snapshot()
+    summary = {
+        'files': hashed['items'],
+        'bytes': hashed['bytes'],
+        'files_per_sec': hashed['items_per_sec'],
+        'mb_per_sec': hashed['mb_per_sec'],
+        'imported': stats['write'].items,
+        'skipped_known': skipped['known'],
+        'failed': skipped['failed']
+    }
+    print(f"Processed {summary['files']} files ({summary['files_per_sec']:.1f} files/s, "
+          f"{summary['mb_per_sec']:.2f} MB/s): {summary['imported']} imported, "
+          f"{summary['skipped_known']} already known, {summary['failed']} failed")
+    return summary
+
+
+async def main(root: str, dry_run: bool = False, workers: int = None, batch_size: int = 500):
+    if dry_run:
+        async with DryRunWriter() as writer:
+            return await import_directory(root, writer, workers=workers)
+
+    pool = await create_database_pool()
+    try:
+        await ensure_schema(pool)
+        async with MemeWriterService(pool, batch_size=batch_size, flush_interval=30.0) as writer:
+            return await import_directory(root, writer, workers=workers)
+    finally:
+        await pool.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import memes from a local directory tree')
+    parser.add_argument('root', help='Directory to scan for images and videos')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processes used for hashing and probing (default: number of cores)')
+    parser.add_argument('--batch-size', type=int, default=500,
+                        help='Rows per COPY batch (default: 500)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Hash and probe files without writing to the database')
+    args = parser.parse_args()
+
+    asyncio.run(main(args.root, dry_run=args.dry_run, workers=args.workers, batch_size=args.batch_size))
@@ -0,0 +1,159 @@
+import asyncio
+
+from ingest.spool import DEFAULT_CHUNK_SIZE, DEFAULT_MAX_FILE_SIZE, spool_chunks
+
+
+DISCORD_API = "https://discord.com/api/v9"
+
+
+class MessageFetchError(Exception):
+    pass
+
+
+class MediaDownloadError(Exception):
+    pass
+
+
+class DiscordClient:
+    """
+    Thin wrapper around the Discord messages API and CDN.
+    api_base can point at a local stand-in for offline runs.
+    """
+
+    def __init__(self, session, headers=None, cookies=None, api_base: str = DISCORD_API,
+                 page_delay: float = 1.0, max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+                 spool_dir: str = None):
+        self.session = session
+        self.headers = headers or {}
+        self.cookies = cookies or {}
+        self.api_base = api_base
+        self.page_delay = page_delay
+        self.max_file_size = max_file_size
+        self.spool_dir = spool_dir
+
+    async def fetch_message_page(self, channel_id, before=None, after=None):
+        """
+        Fetch one page (up to 100 messages) of a channel
+        Returns the list of messages, an empty list at the end of history,
+        or None if the request failed
+        """
+        url = f"{self.api_base}/channels/{channel_id}/messages?limit=100"
+        if before:
+            url += f"&before={before}"
+        # after=0 is valid and pages the whole channel from its first message
+        if after is not None:
+            url += f"&after={after}"
+
+        while True:
+            try:
+                async with self.session.get(url, headers=self.headers, cookies=self.cookies) as response:
+                    if response.status == 429:
+                        retry_after = float(response.headers.get('Retry-After', 5))
+                        print(f"Rate limited. Waiting {retry_after} seconds...")
+                        await asyncio.sleep(retry_after)
+                        continue
+
+                    if response.status != 200:
+                        print(f"Error: Status Code {response.status}")
+                        return None
+
+                    return await response.json()
+
+            except Exception as e:
+                print(f"Error fetching messages: {str(e)}")
+                return None
+
+    async def iter_message_pages(self, channel_id, before=None, after=None):
+        """
+        Yield pages of a channel one at a time.
+        With after= it pages forward towards the newest message, otherwise it
+        pages backwards from before= (or the newest message) to the start of
+        the history. Raises MessageFetchError if a page could not be fetched.
+        """
+        while True:
+            batch = await self.fetch_message_page(channel_id, before=before, after=after)
+            if batch is None:
+                raise MessageFetchError(f"Could not fetch messages of channel {channel_id}")
+            if not batch:
+                return
+
+            yield batch
+
+            ids = [int(message['id']) for message in batch]
+            if after is not None:
+                after = max(ids)
+            else:
+                before = min(ids)
+            await asyncio.sleep(self.page_delay)
+
+    async def fetch_media(self, url):
+        """
+        Stream a media file to a spool file on disk
+        Returns a SpooledFile, raises MediaDownloadError with the reason on failure
+        """
+        try:
+            async with self.session.get(url) as response:
+                if response.status != 200:
+                    raise MediaDownloadError(f"Status {response.status}")
+
+                # Reject early when the server announces the size
+                if response.content_length and response.content_length > self.max_file_size:
+                    raise MediaDownloadError(f"{response.content_length} bytes exceeds the size limit")
+
+                return await spool_chunks(
+                    response.content.iter_chunked(DEFAULT_CHUNK_SIZE),
+                    max_size=self.max_file_size,
+                    spool_dir=self.spool_dir
+                )
+        except MediaDownloadError:
+            raise
+        except Exception as e:
+            raise MediaDownloadError(str(e) or type(e).__name__) from e
+
+    async def download_media(self, url):
+        """
+        Stream a media file to a spool file on disk
+        Returns a SpooledFile, or None if the download failed or was too large
+        """
+        try:
+            return await self.fetch_media(url)
+        except MediaDownloadError as e:
+            print(f"Failed to download media from {url}: {str(e)}")
+            return None
+
+
+def extract_media_urls(message):
+    urls = []
+    
+    # Check attachments
+    for attachment in message.get('attachments', []):
+        if 'url' in attachment:
+            urls.append(attachment['url'])
+    
+    # Check embeds
+    for embed in message.get('embeds', []):
+        if 'image' in embed and embed['image'].get('url'):
+            urls.append(embed['image']['url'])
+        if 'thumbnail' in embed and embed['thumbnail'].get('url'):
+            urls.append(embed['thumbnail']['url'])
+    
+    # Process URLs
+    processed_urls = []
+    for url in urls:
+        if 'media.discordapp.net' in url:
+            url = url.replace('media.discordapp.net', 'cdn.discordapp.com')
+            if '?' not in url:
+                url = f"{url}?ex=9999999999&is=9999999999&hm=9999999999999999999999999999999999999999999999999999999999999999"
+        if "cdn.discordapp.com" not in url:
+            continue
+        processed_urls.append(url)
+    
+    return list(set(processed_urls))
+
+def get_media_type(url):
+    if '.gif' in url.lower():
+        return 'gif'
+    elif any(ext in url.lower() for ext in ['.jpg', '.jpeg', '.png']):
+        return 'image'
+    else:
+        return 'video'
@@ -0,0 +1,138 @@
+"""
+Offline import of Discord message exports (a JSON array of message objects,
+like discord_messages.json).
+
+The export is parsed incrementally, one message at a time, and fed to the
+ingest pipeline page by page, so memory does not grow with the export size.
+
+    python -m ingest.export_import discord_messages.json
+"""
+import argparse
+import asyncio
+import json
+
+import aiohttp
+
+from ingest.discord_client import DiscordClient
+from ingest.pipeline import DryRunWriter, IngestPipeline
+from ingest.spool import DEFAULT_MAX_FILE_SIZE
+from services.database_service import create_database_pool
+from services.meme_writer_service import MemeWriterService
+from services.schema_service import ensure_schema
+
+READ_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+
+class ExportFormatError(Exception):
+    pass
+
+
+def iter_export_messages(f, read_size: int = READ_SIZE):
+    """
+    Yield the elements of a top-level JSON array from a text file object
+    without loading the whole document
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    started = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = f.read(read_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in WHITESPACE:
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                raise ExportFormatError('Unexpected end of export')
+            fill()
+            continue
+
+        if not started:
+            if buffer[pos] != '[':
+                raise ExportFormatError('Export must be a JSON array of messages')
+            started = True
+            pos += 1
+            continue
+
+        if buffer[pos] == ']':
+            return
+        if buffer[pos] == ',':
+            pos += 1
+            continue
+
+        try:
+            message, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # The element continues in the next chunk
+            fill()
+            continue
+
+        pos = end
+        yield message
+
+
+async def iter_export_pages(path: str, page_size: int = 100):
+    """
+    Async iterator over pages of messages from an export file
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        page = []
+        for message in iter_export_messages(f):
+            if 'id' not in message:
+                continue
+            page.append(message)
+            if len(page) >= page_size:
+                yield page
+                page = []
+                await asyncio.sleep(0)
+        if page:
+            yield page
+
+
+async def import_export(path: str, dry_run: bool = False, page_size: int = 100,
+                        max_file_size: int = DEFAULT_MAX_FILE_SIZE, spool_dir: str = None):
+    pool = None
+    if dry_run:
+        writer = DryRunWriter()
+    else:
+        pool = await create_database_pool()
+        await ensure_schema(pool)
+        writer = MemeWriterService(pool)
+
+    try:
+        async with aiohttp.ClientSession() as session, writer:
+            client = DiscordClient(session, max_file_size=max_file_size, spool_dir=spool_dir)
+            async with IngestPipeline(writer, client.download_media) as pipeline:
+                await pipeline.run('export', iter_export_pages(path, page_size))
+    finally:
+        if pool:
+            await pool.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import memes from a Discord message export')
+    parser.add_argument('path', help='JSON export (array of Discord message objects)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Download and process media without writing to the database')
+    parser.add_argument('--page-size', type=int, default=100,
+                        help='Messages per pipeline page (default: 100)')
+    parser.add_argument('--max-file-size', type=int, default=DEFAULT_MAX_FILE_SIZE // (1024 * 1024),
+                        help='Skip media larger than this many MB')
+    parser.add_argument('--spool-dir', default=None,
+                        help='Directory for in-progress downloads (default: system temp dir)')
+    args = parser.parse_args()
+
+    asyncio.run(import_export(args.path, dry_run=args.dry_run, page_size=args.page_size,
+                              max_file_size=args.max_file_size * 1024 * 1024,
+                              spool_dir=args.spool_dir))
@@ -0,0 +1,264 @@
+"""
+CPU-bound media work for the ingest pipeline.
+Everything here runs inside a ProcessPoolExecutor, so functions must be
+top-level and only take/return picklable values. Files are passed by path
+so media bytes never have to be pickled between processes.
+"""
+import hashlib
+import io
+import os
+import struct
+import tempfile
+
+try:
+    from PIL import Image
+except ImportError:  # Thumbnails are optional
+    Image = None
+
+
+THUMBNAIL_SIZE = (320, 320)
+
+# Enough of the file to detect its type and read image dimensions
+HEADER_BYTES = 256 * 1024
+
+# Larger moov boxes are left where they are instead of being loaded
+MAX_MOOV_BYTES = 64 * 1024 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Boxes that have to be descended into to reach the chunk offset tables
+MP4_CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl', b'edts', b'dinf', b'udta'}
+
+
+def detect_content_type(data: bytes) -> str:
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:3] == b'GIF':
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if data[4:8] == b'ftyp':
+        return 'video/mp4'
+    if data[:4] == b'\x1a\x45\xdf\xa3':
+        return 'video/webm'
+    return 'application/octet-stream'
+
+
+def probe_dimensions(data: bytes, content_type: str):
+    """
+    Read width and height from the image header without decoding it
+    Returns (width, height) or (None, None) if unknown
+    """
+    try:
+        if content_type == 'image/png' and len(data) >= 24:
+            return struct.unpack('>II', data[16:24])
+        if content_type == 'image/gif' and len(data) >= 10:
+            return struct.unpack('<HH', data[6:10])
+        if content_type == 'image/jpeg':
+            return _probe_jpeg(data)
+    except struct.error:
+        pass
+    return None, None
+
+
+def _probe_jpeg(data: bytes):
+    pos = 2
+    while pos + 9 < len(data):
+        if data[pos] != 0xFF:
+            pos += 1
+            continue
+        marker = data[pos + 1]
+        # SOFn markers carry the frame size (C4, C8 and CC are not frames)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+            return width, height
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        segment_length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        pos += 2 + segment_length
+    return None, None
+
+
+def _iter_boxes(data, start, end):
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack('>I4s', data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield box_type, pos, header, size
+        pos += size
+
+
+def _shift_chunk_offsets(buffer, start, end, delta):
+    for box_type, pos, header, size in _iter_boxes(buffer, start, end):
+        body = pos + header
+        if box_type in MP4_CONTAINER_BOXES:
+            _shift_chunk_offsets(buffer, body, pos + size, delta)
+        elif box_type == b'stco':
+            count = struct.unpack('>I', buffer[body + 4:body + 8])[0]
+            for i in range(count):
+                offset_pos = body + 8 + i * 4
+                offset = struct.unpack('>I', buffer[offset_pos:offset_pos + 4])[0] + delta
+                if offset > 0xFFFFFFFF:
+                    raise ValueError('Chunk offset overflow')
+                struct.pack_into('>I', buffer, offset_pos, offset)
+        elif box_type == b'co64':
+            count = struct.unpack('>I', buffer[body + 4:body + 8])[0]
+            for i in range(count):
+                offset_pos = body + 8 + i * 8
+                offset = struct.unpack('>Q', buffer[offset_pos:offset_pos + 8])[0] + delta
+                struct.pack_into('>Q', buffer, offset_pos, offset)
+
+
+def _scan_file_boxes(f, file_size: int) -> list:
+    # Top-level boxes of an MP4 file, read header by header with seeks
+    boxes = []
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        size, box_type = struct.unpack('>I4s', header[:8])
+        header_size = 8
+        if size == 1:
+            if len(header) < 16:
+                break
+            size = struct.unpack('>Q', header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_size or pos + size > file_size:
+            break
+        boxes.append((box_type, pos, header_size, size))
+        pos += size
+    return boxes
+
+
+def _copy_range(src, dst, start: int, end: int):
+    src.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = src.read(min(COPY_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise ValueError('File ended early')
+        dst.write(chunk)
+        remaining -= len(chunk)
+
+
+def faststart_file(path: str, out_path: str) -> bool:
+    """
+    Move the moov box of an MP4 in front of the media data so browsers can
+    start playback before the whole file is loaded. Only the moov box is
+    loaded, the media data is copied to out_path in chunks.
+    Returns False (and writes nothing) if the file is not an MP4 or already faststart
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as src:
+        if src.read(8)[4:8] != b'ftyp':
+            return False
+
+        boxes = _scan_file_boxes(src, file_size)
+        moov = next((box for box in boxes if box[0] == b'moov'), None)
+        mdat = next((box for box in boxes if box[0] == b'mdat'), None)
+        if not moov or not mdat or moov[1] < mdat[1] or moov[3] > MAX_MOOV_BYTES:
+            return False
+
+        _, moov_pos, _, moov_size = moov
+        src.seek(moov_pos)
+        moov_box = bytearray(src.read(moov_size))
+        try:
+            _shift_chunk_offsets(moov_box, 0, len(moov_box), moov_size)
+        except (ValueError, struct.error):
+            return False
+
+        insert_at = mdat[1]
+        with open(out_path, 'wb') as dst:
+            _copy_range(src, dst, 0, insert_at)
+            dst.write(moov_box)
+            _copy_range(src, dst, insert_at, moov_pos)
+            _copy_range(src, dst, moov_pos + moov_size, file_size)
+    return True
+
+
+def thumbnails_available() -> bool:
+    return Image is not None
+
+
+def make_thumbnail(path):
+    """
+    Render a small JPEG preview of a file (path or file object), or None if
+    Pillow is missing or the file is not a decodable image
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as image:
+            image.thumbnail(THUMBNAIL_SIZE)
+            output = io.BytesIO()
+            image.convert('RGB').save(output, format='JPEG', quality=80)
+            return output.getvalue()
+    except Exception:
+        return None
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def process_media(media_type: str, path: str, content_hash: str = None, in_place: bool = True) -> dict:
+    """
+    Run all CPU work for one downloaded file.
+    MP4 files are rewritten for faststart, in place or (in_place=False) into a
+    new temp file whose location is returned as 'path'. content_hash is the
+    hash computed while downloading and is only recomputed if the file changed.
+    Returns dict with the file's metadata
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_BYTES)
+    content_type = detect_content_type(header)
+
+    if content_type == 'video/mp4':
+        # Written next to the original, so replacing it is a rename
+        fd, rewritten = tempfile.mkstemp(prefix='meme-', suffix='.mp4',
+                                         dir=os.path.dirname(os.path.abspath(path)) if in_place else None)
+        os.close(fd)
+        try:
+            changed = faststart_file(path, rewritten)
+        except BaseException:
+            os.remove(rewritten)
+            raise
+
+        if not changed:
+            os.remove(rewritten)
+        else:
+            if in_place:
+                os.replace(rewritten, path)
+            else:
+                path = rewritten
+            with open(path, 'rb') as f:
+                header = f.read(HEADER_BYTES)
+            content_hash = None
+
+    width, height = probe_dimensions(header, content_type)
+    thumbnail = make_thumbnail(path) if media_type in ('image', 'gif') else None
+
+    return {
+        'path': path,
+        'content_type': content_type,
+        'content_hash': content_hash or hash_file(path),
+        'file_size': os.path.getsize(path),
+        'width': width,
+        'height': height,
+        'thumbnail': thumbnail
+    }
@@ -0,0 +1,210 @@
+"""
+Read the text in image memes so /search can find them.
+
+Image memes whose ocr_hash differs from their content_hash (never read, or
+the media changed since) are read in id order, recognized with Tesseract in
+a process pool and written back in batches. Throughput is reported in
+pages (images) per second.
+
+    python -m ingest.ocr
+    python -m ingest.ocr --workers 4 --lang eng+deu
+
+Needs Pillow, pytesseract and the tesseract binary.
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import pytesseract
+    from PIL import Image, ImageOps
+except ImportError:  # OCR is optional
+    pytesseract = None
+    Image = None
+
+from ingest.pipeline import StageStats
+from services.database_service import create_database_pool
+from services.ocr_service import OcrService
+from services.schema_service import ensure_schema
+
+
+MAX_OCR_TEXT = 10000
+
+
+def ocr_available() -> bool:
+    if pytesseract is None or Image is None:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except pytesseract.TesseractNotFoundError:
+        return False
+
+
+def extract_text(data: bytes, lang: str = 'eng') -> dict:
+    """
+    Recognize the text in one image (the first frame of a GIF).
+    Runs in a worker process. Images that cannot be decoded get empty text,
+    so they are not read again until their media changes.
+    Returns dict with text and the content_hash it was read from
+    """
+    content_hash = hashlib.sha256(data).hexdigest()
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            text = pytesseract.image_to_string(ImageOps.grayscale(image), lang=lang)
+    except pytesseract.TesseractNotFoundError:
+        raise
+    except (OSError, ValueError, Image.DecompressionBombError, pytesseract.TesseractError):
+        text = ''
+
+    return {'text': ' '.join(text.split())[:MAX_OCR_TEXT], 'content_hash': content_hash}
+
+
+class OcrJob:
+    """
+    extract is a picklable callable taking (image bytes, lang) and returning a
+    dict with text and content_hash; it runs in the executor.
+    """
+
+    def __init__(self, ocr: OcrService, extract=extract_text, lang: str = 'eng', workers: int = None,
+                 batch_size: int = 32, executor=None, report_interval: float = 10.0):
+        self.ocr = ocr
+        self.extract = extract
+        self.lang = lang
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.executor = executor
+        self.report_interval = report_interval
+        self._owns_executor = executor is None
+
+    async def __aenter__(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    async def __aexit__(self, *args):
+        if self._owns_executor and self.executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    async def run_once(self) -> dict:
+        """
+        Read every meme that currently needs OCR
+        Returns dict with pages, pages/s and MB/s, and how many had text or failed
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.workers * 2)
+        stats = StageStats('ocr', queue)
+        results = []
+        counts = {'with_text': 0, 'failed': 0}
+
+        async def produce():
+            after_id = 0
+            try:
+                while True:
+                    batch = await self.ocr.get_pending(after_id, self.batch_size)
+                    if not batch:
+                        break
+                    for meme in batch:
+                        await queue.put(meme)
+                    after_id = batch[-1]['id']
+            finally:
+                for _ in range(self.workers):
+                    await queue.put(None)
+
+        async def flush():
+            nonlocal results
+            batch, results = results, []
+            await self.ocr.store_results(batch)
+
+        async def worker():
+            while True:
+                meme = await queue.get()
+                if meme is None:
+                    break
+                try:
+                    result = await loop.run_in_executor(
+                        self.executor, self.extract, meme['file_data'], self.lang
+                    )
+                except Exception as e:
+                    # Left pending, the next run tries again
+                    counts['failed'] += 1
+                    stats.errors += 1
+                    print(f"Error reading text of meme {meme['id']}: {str(e)}")
+                    continue
+
+                stats.record(len(meme['file_data']))
+                if result['text']:
+                    counts['with_text'] += 1
+                results.append({'id': meme['id'], **result})
+                if len(results) >= self.batch_size:
+                    await flush()
+
+        async def report_periodically():
+            while True:
+                await asyncio.sleep(self.report_interval)
+                print(stats)
+
+        reporter = asyncio.create_task(report_periodically())
+        try:
+            await asyncio.gather(produce(), *(worker() for _ in range(self.workers)))
+            await flush()
+        finally:
+            reporter.cancel()
+
+        snapshot = stats.snapshot()
+        return {
+            'pages': snapshot['items'],
+            'pages_per_sec': snapshot['items_per_sec'],
+            'mb_per_sec': snapshot['mb_per_sec'],
+            'with_text': counts['with_text'],
+            'failed': counts['failed']
+        }
+
+
+async def main(workers: int = None, batch_size: int = 32, lang: str = 'eng',
+               daemon: bool = False, interval: int = 600):
+    if not ocr_available():
+        print("OCR needs Pillow, pytesseract and the tesseract binary")
+        return
+
+    pool = await create_database_pool()
+    try:
+        await ensure_schema(pool)
+        ocr = OcrService(pool)
+
+        async with OcrJob(ocr, lang=lang, workers=workers, batch_size=batch_size) as job:
+            while True:
+                summary = await job.run_once()
+                stats = await ocr.get_stats()
+                print(f"Read {summary['pages']} pages ({summary['pages_per_sec']:.1f} pages/s, "
+                      f"{summary['mb_per_sec']:.2f} MB/s): {summary['with_text']} with text, "
+                      f"{summary['failed']} failed; {stats['with_text']} memes searchable by text, "
+                      f"{stats['pending']} pending")
+
+                if not daemon:
+                    break
+                await asyncio.sleep(interval)
+    finally:
+        await pool.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recognize text in image memes for search')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='OCR processes (default: number of cores)')
+    parser.add_argument('--batch-size', type=int, default=32,
+                        help='Memes fetched and stored per query (default: 32)')
+    parser.add_argument('--lang', default='eng',
+                        help='Tesseract languages, e.g. eng+deu (default: eng)')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep running and read new memes every interval')
+    parser.add_argument('--interval', type=int, default=600,
+                        help='Seconds between passes in daemon mode (default: 600)')
+    args = parser.parse_args()
+
+    asyncio.run(main(workers=args.workers, batch_size=args.batch_size, lang=args.lang,
+                     daemon=args.daemon, interval=args.interval))
@@ -0,0 +1,437 @@
+"""
+Staged ingest pipeline:
+
+    fetch pages -> extract/dedup urls -> download -> CPU (process pool) -> batched write
+
+Stages are connected by bounded asyncio queues, so a slow stage pushes back
+on the ones before it instead of letting work pile up in memory.
+
+Run offline against local fixtures with:
+
+    python -m ingest.pipeline tests/fixtures/ingest
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from ingest.discord_client import MessageFetchError, extract_media_urls, get_media_type
+from ingest.media_processing import process_media
+from ingest.spool import SpooledFile, iter_file_chunks, spool_chunks
+
+
+class StageStats:
+    def __init__(self, name: str, queue: asyncio.Queue = None):
+        self.name = name
+        self.queue = queue
+        self.items = 0
+        self.bytes = 0
+        self.errors = 0
+        self.started = time.monotonic()
+
+    def record(self, nbytes: int = 0):
+        self.items += 1
+        self.bytes += nbytes
+
+    def snapshot(self) -> dict:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            'stage': self.name,
+            'items': self.items,
+            'bytes': self.bytes,
+            'errors': self.errors,
+            'items_per_sec': self.items / elapsed,
+            'mb_per_sec': self.bytes / elapsed / (1024 * 1024),
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'queue_size': self.queue.maxsize if self.queue else 0
+        }
+
+    def __str__(self):
+        s = self.snapshot()
+        line = f"{s['stage']}: {s['items']} ({s['items_per_sec']:.1f}/s"
+        if s['bytes']:
+            line += f", {s['mb_per_sec']:.2f} MB/s"
+        line += ')'
+        if self.queue:
+            line += f" q={s['queue_depth']}/{s['queue_size']}"
+        if s['errors']:
+            line += f" err={s['errors']}"
+        return line
+
+
+class PageProgress:
+    """
+    Tracks the media items of one page so the checkpoint only moves past it
+    once every item of the page has been handled
+    """
+
+    def __init__(self, messages, pending):
+        ids = [int(message['id']) for message in messages]
+        self.oldest_id = min(ids)
+        self.newest_id = max(ids)
+        self.message_count = len(messages)
+        self.pending = pending
+        self.done = asyncio.Event()
+        if pending == 0:
+            self.done.set()
+
+    def item_finished(self):
+        self.pending -= 1
+        if self.pending <= 0:
+            self.done.set()
+
+
+def parse_timestamp(value: str) -> datetime:
+    return datetime.strptime(value.split('.')[0].split('+')[0], '%Y-%m-%dT%H:%M:%S')
+
+
+class IngestPipeline:
+    """
+    Runs pages of messages through the ingest stages.
+    `download` is an async callable url -> SpooledFile (or None on failure) and
+    `writer` provides filter_new_urls/add/flush like MemeWriterService.
+    Downloaded files stay on disk; the CPU stage and the writer work on the
+    spool file. MP4 faststart only loads the moov box, but images are decoded
+    in full for their thumbnail, so every CPU worker may hold one decoded image.
+    Use as an async context manager to own the process pool.
+    """
+
+    def __init__(self, writer, download, checkpoints=None, download_workers: int = 4,
+                 cpu_workers: int = None, queue_size: int = 2, report_interval: float = 10.0,
+                 executor=None):
+        self.writer = writer
+        self.download = download
+        self.checkpoints = checkpoints
+        self.download_workers = download_workers
+        self.cpu_workers = cpu_workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.report_interval = report_interval
+        self.executor = executor
+        self._owns_executor = executor is None
+        self.stats = {}
+
+    async def __aenter__(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.cpu_workers)
+        return self
+
+    async def __aexit__(self, *args):
+        if self._owns_executor and self.executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    def report(self) -> list:
+        return [stats.snapshot() for stats in self.stats.values()]
+
+    def print_report(self):
+        print(' | '.join(str(stats) for stats in self.stats.values()))
+
+    async def _report_periodically(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.print_report()
+
+    async def run(self, channel_id, pages) -> bool:
+        """
+        Ingest an async iterator of message pages
+        Returns True if the iterator was exhausted, False if fetching failed
+        """
+        page_queue = asyncio.Queue(maxsize=self.queue_size)
+        commit_queue = asyncio.Queue(maxsize=self.queue_size)
+        download_queue = asyncio.Queue(maxsize=self.queue_size * 100)
+        cpu_queue = asyncio.Queue(maxsize=self.cpu_workers * 2)
+        write_queue = asyncio.Queue(maxsize=self.cpu_workers * 2)
+
+        self.stats = {
+            'fetch': StageStats('fetch', page_queue),
+            'extract': StageStats('extract', download_queue),
+            'download': StageStats('download', cpu_queue),
+            'cpu': StageStats('cpu', write_queue),
+            'write': StageStats('write'),
+            'commit': StageStats('commit', commit_queue)
+        }
+        finished = {'complete': False}
+        # Urls queued by an earlier page that are not stored yet
+        in_flight = set()
+        loop = asyncio.get_running_loop()
+
+        def item_done(url, progress):
+            in_flight.discard(url)
+            progress.item_finished()
+
+        async def fetch():
+            try:
+                async for page in pages:
+                    self.stats['fetch'].record()
+                    await page_queue.put(page)
+                finished['complete'] = True
+            except MessageFetchError as e:
+                self.stats['fetch'].errors += 1
+                print(str(e))
+            finally:
+                await page_queue.put(None)
+
+        async def extract():
+            try:
+                while True:
+                    page = await page_queue.get()
+                    if page is None:
+                        break
+
+                    url_messages = {}
+                    for message in page:
+                        for url in extract_media_urls(message):
+                            url_messages.setdefault(url, message)
+
+                    # One existence check for the whole page
+                    new_urls = await self.writer.filter_new_urls(list(url_messages))
+                    new_urls = [url for url in new_urls if url not in in_flight]
+                    in_flight.update(new_urls)
+
+                    progress = PageProgress(page, len(new_urls))
+                    await commit_queue.put(progress)
+                    for url in new_urls:
+                        self.stats['extract'].record()
+                        await download_queue.put((url, url_messages[url], progress))
+            finally:
+                for _ in range(self.download_workers):
+                    await download_queue.put(None)
+                await commit_queue.put(None)
+
+        async def download_worker():
+            while True:
+                item = await download_queue.get()
+                if item is None:
+                    break
+
+                url, message, progress = item
+                try:
+                    spooled = await self.download(url)
+                except Exception as e:
+                    print(f"Error downloading media from {url}: {str(e)}")
+                    spooled = None
+                if not spooled:
+                    self.stats['download'].errors += 1
+                    # Stored without media, so the repair worker retries it
+                    # once the checkpoint has moved past its message
+                    print(f"Storing {url} without media after download failure")
+                    await write_queue.put((url, message, get_media_type(url), None, None, progress))
+                    continue
+
+                self.stats['download'].record(spooled.size)
+                await cpu_queue.put((url, message, spooled, progress))
+
+        async def cpu_worker():
+            while True:
+                item = await cpu_queue.get()
+                if item is None:
+                    break
+
+                url, message, spooled, progress = item
+                media_type = get_media_type(url)
+                try:
+                    info = await loop.run_in_executor(
+                        self.executor, process_media, media_type, spooled.path, spooled.sha256
+                    )
+                except Exception as e:
+                    self.stats['cpu'].errors += 1
+                    print(f"Error processing media {url}: {str(e)}")
+                    spooled.cleanup()
+                    await write_queue.put((url, message, media_type, None, None, progress))
+                    continue
+
+                # The CPU stage may have rewritten the file (faststart)
+                spooled.size = info['file_size']
+                spooled.sha256 = info['content_hash']
+                self.stats['cpu'].record(info['file_size'])
+                await write_queue.put((url, message, media_type, spooled, info, progress))
+
+        async def write():
+            while True:
+                item = await write_queue.get()
+                if item is None:
+                    break
+
+                # Failed downloads arrive without a file and metadata
+                url, message, media_type, spooled, info, progress = item
+                metadata = {}
+                if info:
+                    metadata = {key: info[key] for key in ('content_hash', 'file_size', 'width', 'height', 'thumbnail')}
+                try:
+                    await self.writer.add(
+                        url,
+                        message['author']['id'],
+                        parse_timestamp(message['timestamp']),
+                        media_type,
+                        spooled,
+                        **metadata
+                    )
+                    self.stats['write'].record(info['file_size'] if info else 0)
+                except Exception as e:
+                    # A failed flush keeps its rows pending; stop before the
+                    # checkpoint can move past them
+                    self.stats['write'].errors += 1
+                    print(f"Error storing {url}: {str(e)}")
+                    raise
+                finally:
+                    item_done(url, progress)
+
+        async def commit():
+            # Pages are committed in the order they were fetched
+            while True:
+                progress = await commit_queue.get()
+                if progress is None:
+                    break
+
+                await progress.done.wait()
+                # Make the page durable before the checkpoint moves past it
+                await self.writer.flush()
+                if self.checkpoints:
+                    await self.checkpoints.record_page(channel_id, progress.oldest_id, progress.newest_id)
+                self.stats['commit'].record()
+
+        async def stage(workers, downstream, downstream_workers):
+            await asyncio.gather(*workers)
+            for _ in range(downstream_workers):
+                await downstream.put(None)
+
+        tasks = [
+            asyncio.create_task(fetch()),
+            asyncio.create_task(extract()),
+            asyncio.create_task(stage(
+                [download_worker() for _ in range(self.download_workers)],
+                cpu_queue, self.cpu_workers
+            )),
+            asyncio.create_task(stage(
+                [cpu_worker() for _ in range(self.cpu_workers)],
+                write_queue, 1
+            )),
+            asyncio.create_task(write()),
+            asyncio.create_task(commit())
+        ]
+        reporter = asyncio.create_task(self._report_periodically())
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # A failed stage would leave the others blocked on full queues
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            reporter.cancel()
+            self.print_report()
+
+        return finished['complete']
+
+
+async def sync_channel(channel_id, client, pipeline, checkpoints):
+    """
+    Ingest a channel incrementally.
+    First fetches everything newer than the stored checkpoint (after=), then
+    continues the backfill of older history from where the last run stopped
+    (before=). The checkpoint is advanced after every stored page, so an
+    interrupted run resumes without re-reading processed messages.
+    """
+    checkpoint = await checkpoints.get_checkpoint(channel_id)
+
+    # New messages since the last run. A channel that was still empty when its
+    # backfill completed has no newest id, so it is read from the beginning
+    if checkpoint['newest_message_id'] is not None or checkpoint['backfill_complete']:
+        pages = client.iter_message_pages(channel_id, after=checkpoint['newest_message_id'] or 0)
+        await pipeline.run(channel_id, pages)
+
+    # Older history not processed yet
+    if not checkpoint['backfill_complete']:
+        pages = client.iter_message_pages(channel_id, before=checkpoint['oldest_message_id'])
+        if await pipeline.run(channel_id, pages):
+            await checkpoints.mark_backfill_complete(channel_id)
+            print(f"Backfill of channel {channel_id} complete")
+
+
+class DryRunWriter:
+    """
+    Writer that only counts rows, for running the pipeline without a database
+    """
+
+    def __init__(self):
+        self.rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def filter_new_urls(self, urls: list) -> list:
+        seen = {row[0] for row in self.rows}
+        return [url for url in dict.fromkeys(urls) if url not in seen]
+
+    async def backfill_content_hashes(self) -> int:
+        return 0
+
+    async def filter_new_hashes(self, hashes: list) -> list:
+        seen = {row[5].get('content_hash') for row in self.rows}
+        return [h for h in dict.fromkeys(hashes) if h and h not in seen]
+
+    async def add(self, url, author_id, timestamp, media_type, file_data, **metadata):
+        size = len(file_data) if file_data is not None else None
+        self.rows.append((url, author_id, timestamp, media_type, size, metadata))
+        if isinstance(file_data, SpooledFile):
+            file_data.cleanup()
+
+    async def flush(self) -> int:
+        return 0
+
+
+def load_fixture_pages(fixture_dir: str, page_size: int = 100):
+    """
+    Async iterator over pages of a fixture's messages.json
+    """
+    with open(os.path.join(fixture_dir, 'messages.json'), 'r') as f:
+        messages = json.load(f)
+
+    async def pages():
+        for start in range(0, len(messages), page_size):
+            yield messages[start:start + page_size]
+
+    return pages()
+
+
+def fixture_downloader(fixture_dir: str, spool_dir: str = None):
+    """
+    Download function serving media by file name from the fixture's media directory
+    """
+    media_dir = os.path.join(fixture_dir, 'media')
+
+    async def download(url):
+        filename = url.split('?')[0].rsplit('/', 1)[-1]
+        path = os.path.join(media_dir, filename)
+        if not os.path.isfile(path):
+            return None
+        # Copy into the spool like a real download, the CPU stage may rewrite it
+        return await spool_chunks(iter_file_chunks(path), spool_dir=spool_dir)
+
+    return download
+
+
+async def run_fixture(fixture_dir: str, cpu_workers: int = None):
+    writer = DryRunWriter()
+    async with writer, IngestPipeline(writer, fixture_downloader(fixture_dir), cpu_workers=cpu_workers) as pipeline:
+        await pipeline.run('fixture', load_fixture_pages(fixture_dir))
+
+    print(f"Processed {len(writer.rows)} media items")
+    return writer.rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the ingest pipeline against local fixtures')
+    parser.add_argument('fixture_dir', help='Directory with messages.json and a media/ folder')
+    parser.add_argument('--cpu-workers', type=int, default=None,
+                        help='Processes for the CPU stage (default: number of cores)')
+    args = parser.parse_args()
+
+    asyncio.run(run_fixture(args.fixture_dir, cpu_workers=args.cpu_workers))
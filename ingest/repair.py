@@ -0,0 +1,171 @@
+"""
+Retry downloads for memes that were stored without file_data.
+
+Blob-less rows are read in id order from a partial index, re-downloaded
+concurrently and run through the same CPU stage as the ingest pipeline.
+Failures are counted per row with an exponential backoff, and rows that
+failed max_failures times are left alone.
+
+    python -m ingest.repair
+    python -m ingest.repair --daemon --interval 600
+"""
+import argparse
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+
+from ingest.discord_client import DiscordClient, MediaDownloadError
+from ingest.media_processing import process_media
+from ingest.spool import DEFAULT_MAX_FILE_SIZE
+from services.database_service import create_database_pool
+from services.repair_service import RepairService
+from services.schema_service import ensure_schema
+
+
+def retry_delay(failures: int, base_delay: float = 300.0, max_delay: float = 86400.0) -> float:
+    """
+    Seconds until the next attempt after the given number of previous failures
+    """
+    return min(base_delay * (2 ** failures), max_delay)
+
+
+class RepairWorker:
+    """
+    fetch is an async callable returning a SpooledFile for a url and raising
+    MediaDownloadError with the reason if it cannot be downloaded.
+    """
+
+    def __init__(self, repairs: RepairService, fetch, concurrency: int = 8, batch_size: int = 100,
+                 base_delay: float = 300.0, max_delay: float = 86400.0, executor=None):
+        self.repairs = repairs
+        self.fetch = fetch
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.executor = executor
+        self._owns_executor = executor is None
+
+    async def __aenter__(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return self
+
+    async def __aexit__(self, *args):
+        if self._owns_executor and self.executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    async def repair_one(self, meme: dict) -> str:
+        """
+        Download and store one meme, or record why it failed
+        Returns 'repaired', 'skipped' (the row was deleted or filled by another
+        repair meanwhile) or 'failed'
+        """
+        spooled = None
+        try:
+            spooled = await self.fetch(meme['url'])
+            info = await asyncio.get_running_loop().run_in_executor(
+                self.executor, process_media, meme['media_type'], spooled.path, spooled.sha256
+            )
+            # The CPU stage may have rewritten the file (faststart)
+            spooled.size = info['file_size']
+            stored = await self.repairs.store_media(meme['id'], spooled, info)
+            return 'repaired' if stored else 'skipped'
+        except Exception as e:
+            # Anything from a corrupt file to a lost database connection counts
+            # as a failed attempt, so a meme that always fails is given up on
+            delay = retry_delay(meme['download_failures'], self.base_delay, self.max_delay)
+            await self.repairs.record_failure(meme['id'], str(e), delay)
+            print(f"Repair of meme {meme['id']} failed ({meme['download_failures'] + 1} attempts): {str(e)}")
+            return 'failed'
+        finally:
+            if spooled:
+                spooled.cleanup()
+
+    async def run_once(self) -> dict:
+        """
+        Make one attempt for every meme that is currently due
+        Returns dict with counts of repaired, skipped and failed memes
+        """
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results = {'repaired': 0, 'skipped': 0, 'failed': 0}
+
+        async def produce():
+            after_id = 0
+            try:
+                while True:
+                    batch = await self.repairs.get_due(after_id, self.batch_size)
+                    if not batch:
+                        break
+                    for meme in batch:
+                        await queue.put(meme)
+                    after_id = batch[-1]['id']
+            finally:
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+
+        async def worker():
+            while True:
+                meme = await queue.get()
+                if meme is None:
+                    break
+                try:
+                    outcome = await self.repair_one(meme)
+                except Exception as e:
+                    print(f"Error repairing meme {meme['id']}: {str(e)}")
+                    outcome = 'failed'
+                results[outcome] += 1
+
+        await asyncio.gather(produce(), *(worker() for _ in range(self.concurrency)))
+        return results
+
+
+async def main(daemon: bool = False, interval: int = 600, concurrency: int = 8, max_failures: int = 5,
+               base_delay: float = 300.0, max_file_size: int = DEFAULT_MAX_FILE_SIZE, spool_dir: str = None):
+    pool = await create_database_pool()
+    try:
+        await ensure_schema(pool)
+        repairs = RepairService(pool, max_failures=max_failures)
+
+        async with aiohttp.ClientSession() as session:
+            client = DiscordClient(session, max_file_size=max_file_size, spool_dir=spool_dir)
+            async with RepairWorker(repairs, client.fetch_media, concurrency=concurrency,
+                                    base_delay=base_delay) as worker:
+                while True:
+                    results = await worker.run_once()
+                    stats = await repairs.get_stats()
+                    print(f"Repaired {results['repaired']}, skipped {results['skipped']}, "
+                          f"failed {results['failed']}; "
+                          f"{stats['pending']} pending, {stats['dead']} given up")
+
+                    if not daemon:
+                        break
+                    await asyncio.sleep(interval)
+    finally:
+        await pool.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Retry downloads of memes without file_data')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep running and retry due memes every interval')
+    parser.add_argument('--interval', type=int, default=600,
+                        help='Seconds between passes in daemon mode (default: 600)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Parallel downloads (default: 8)')
+    parser.add_argument('--max-failures', type=int, default=5,
+                        help='Stop retrying a meme after this many failed attempts (default: 5)')
+    parser.add_argument('--base-delay', type=float, default=300.0,
+                        help='Seconds before the first retry, doubled after every failure')
+    parser.add_argument('--max-file-size', type=int, default=DEFAULT_MAX_FILE_SIZE // (1024 * 1024),
+                        help='Skip media larger than this many MB')
+    parser.add_argument('--spool-dir', default=None,
+                        help='Directory for in-progress downloads (default: system temp dir)')
+    args = parser.parse_args()
+
+    asyncio.run(main(daemon=args.daemon, interval=args.interval, concurrency=args.concurrency,
+                     max_failures=args.max_failures, base_delay=args.base_delay,
+                     max_file_size=args.max_file_size * 1024 * 1024, spool_dir=args.spool_dir))
@@ -0,0 +1,77 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+DEFAULT_MAX_FILE_SIZE = int(os.getenv('INGEST_MAX_FILE_SIZE', str(100 * 1024 * 1024)))
+
+
+class FileTooLargeError(Exception):
+    pass
+
+
+class SpooledFile:
+    """
+    A downloaded file living on disk instead of in memory.
+    sha256 is computed while the file is written. Files that are not owned
+    (e.g. originals of a local import) are never removed by cleanup().
+    """
+
+    def __init__(self, path: str, size: int, sha256: str, owned: bool = True):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.owned = owned
+
+    def __len__(self):
+        return self.size
+
+    def read(self) -> bytes:
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        return iter_file_chunks(self.path, chunk_size)
+
+    def cleanup(self):
+        if not self.owned:
+            return
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+async def spool_chunks(chunks, max_size: int = DEFAULT_MAX_FILE_SIZE, spool_dir: str = None,
+                       suffix: str = '') -> SpooledFile:
+    """
+    Write an async iterator of byte chunks to a temporary file, hashing as it goes
+    Raises FileTooLargeError (and removes the partial file) once max_size is exceeded
+    """
+    fd, path = tempfile.mkstemp(prefix='meme-', suffix=suffix, dir=spool_dir)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTooLargeError(f"File exceeds the limit of {max_size} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+
+    return SpooledFile(path, size, digest.hexdigest())
+
+
+async def iter_file_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
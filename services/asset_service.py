@@ -0,0 +1,214 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+
+try:
+    import brotli
+except ImportError:  # Brotli variants are optional
+    brotli = None
+
+
+# Text assets worth precompressing; images and icons are served as they are
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.svg', '.json', '.html', '.txt', '.map'}
+# A variant is only kept if it saves at least this fraction of the size
+MIN_COMPRESSION_SAVING = 0.1
+# Suffix of a compressed variant's ETag, since its bytes differ from the asset's
+ETAG_SUFFIXES = {'br': 'br', 'gzip': 'gz'}
+
+# Relative module imports: import x from './a.js', export * from './a.js', import('./a.js')
+JS_IMPORT_PATTERN = re.compile(r'''(\bfrom\s*|\bimport\s*\(?\s*)(['"])(\.{1,2}/[^'"]+)\2''')
+# @import url('./a.css') and url(../img/a.png)
+CSS_URL_PATTERN = re.compile(r'''(url\(\s*)(['"]?)([^'")\s]+)\2(\s*\))''')
+
+
+class Asset:
+    def __init__(self, path: str, hashed_path: str, body: bytes, content_type: str):
+        self.path = path
+        self.hashed_path = hashed_path
+        self.body = body
+        self.content_type = content_type
+        self.hash = content_hash(body)
+        self.etag = f'"{self.hash}"'
+        # encoding -> compressed body, best compression first
+        self.variants = {}
+
+    def compress(self):
+        candidates = []
+        if brotli is not None:
+            candidates.append(('br', brotli.compress(self.body, quality=11)))
+        candidates.append(('gzip', gzip.compress(self.body, compresslevel=9, mtime=0)))
+
+        for encoding, data in candidates:
+            if len(data) <= len(self.body) * (1 - MIN_COMPRESSION_SAVING):
+                self.variants[encoding] = data
+
+    def select(self, accept_encoding: str) -> tuple:
+        """
+        The smallest variant the client accepts, as (encoding or None, body)
+        """
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, data in self.variants.items():
+            if encoding in accepted:
+                return encoding, data
+        return None, self.body
+
+    def etag_for(self, encoding: str = None) -> str:
+        """
+        The ETag of the variant sent with a Content-Encoding (None: the asset itself)
+        """
+        if not encoding:
+            return self.etag
+        return f'"{self.hash}-{ETAG_SUFFIXES.get(encoding, encoding)}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Whether an If-None-Match header (a list of possibly weak ETags, or *) names etag
+    """
+    for candidate in (if_none_match or '').split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        # If-None-Match uses the weak comparison, W/"x" matches "x"
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate and candidate == etag:
+            return True
+    return False
+
+
+def accepted_encodings(header: str) -> set:
+    """
+    Content codings from an Accept-Encoding header, without those refused with q=0
+    """
+    accepted = set()
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    return accepted
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:10]
+
+
+def fingerprint(path: str, body: bytes) -> str:
+    """
+    css/styles.css -> css/styles.<first 10 hex digits of sha256>.css
+    """
+    root, ext = posixpath.splitext(path)
+    return f'{root}.{content_hash(body)}{ext}'
+
+
+class AssetManifest:
+    """
+    Every file under the static folder, fingerprinted and kept in memory.
+    References between JS modules and CSS files are rewritten to the hashed
+    names, so a change to an imported file also changes the importer's hash
+    """
+
+    def __init__(self):
+        self.assets = {}
+        self.by_hashed_path = {}
+        self._sources = {}
+
+    def build(self, static_dir: str):
+        self.assets = {}
+        self.by_hashed_path = {}
+        self._sources = {}
+
+        for root, _, files in os.walk(static_dir):
+            for name in files:
+                full_path = os.path.join(root, name)
+                path = os.path.relpath(full_path, static_dir).replace(os.sep, '/')
+                with open(full_path, 'rb') as f:
+                    self._sources[path] = f.read()
+
+        for path in sorted(self._sources):
+            self._process(path, ())
+
+        self._sources = {}
+        return self
+
+    def _process(self, path: str, importers: tuple):
+        if path in self.assets:
+            return self.assets[path]
+
+        body = self._sources[path]
+        ext = posixpath.splitext(path)[1].lower()
+        if ext in ('.js', '.css'):
+            body = self._rewrite_references(path, body, ext, importers + (path,))
+
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or ext in ('.js', '.svg', '.json'):
+            content_type += '; charset=utf-8'
+
+        asset = Asset(path, fingerprint(path, body), body, content_type)
+        if ext in COMPRESSIBLE_EXTENSIONS:
+            asset.compress()
+
+        self.assets[path] = asset
+        self.by_hashed_path[asset.hashed_path] = asset
+        return asset
+
+    def _rewrite_references(self, path: str, body: bytes, ext: str, importers: tuple) -> bytes:
+        base_dir = posixpath.dirname(path)
+
+        def replace(match):
+            reference = match.group(3)
+            clean = reference.split('?', 1)[0].split('#', 1)[0]
+            if not clean or ':' in clean or clean.startswith(('/', '#')):
+                return match.group(0)  # absolute, external and data: urls stay as they are
+
+            target = posixpath.normpath(posixpath.join(base_dir, clean))
+            # Import cycles keep the plain name, which is served without immutable caching
+            if target not in self._sources or target in importers:
+                return match.group(0)
+
+            hashed = self._process(target, importers).hashed_path
+            relative = posixpath.relpath(hashed, base_dir or '.')
+            if not relative.startswith('.'):
+                relative = './' + relative
+            closing = match.group(4) if ext == '.css' else ''
+            return f'{match.group(1)}{match.group(2)}{relative}{match.group(2)}{closing}'
+
+        pattern = CSS_URL_PATTERN if ext == '.css' else JS_IMPORT_PATTERN
+        return pattern.sub(replace, body.decode('utf-8')).encode('utf-8')
+
+    def get(self, path: str) -> tuple:
+        """
+        The asset for a request path as (asset, immutable); plain names are
+        found too, but must be revalidated since their content can change
+        """
+        asset = self.by_hashed_path.get(path)
+        if asset:
+            return asset, True
+        return self.assets.get(path), False
+
+    def hashed_path(self, path: str):
+        asset = self.assets.get(path)
+        return asset.hashed_path if asset else None
+
+    def inline(self, path: str, default: str = '') -> str:
+        """
+        A small text asset (e.g. an SVG embedded in a page) from memory
+        """
+        asset = self.assets.get(path)
+        return asset.body.decode('utf-8') if asset else default
+
+
+# Built once at startup by init_asset_routes
+assets = AssetManifest()
@@ -0,0 +1,65 @@
+class CheckpointService:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def get_checkpoint(self, channel_id: str) -> dict:
+        """
+        Get the ingest checkpoint for a channel
+        Returns dict with newest/oldest processed message ids (None if never seen)
+        """
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                '''
+                SELECT newest_message_id, oldest_message_id, backfill_complete
+                FROM channel_checkpoints
+                WHERE channel_id = $1
+                ''',
+                str(channel_id)
+            )
+
+        if not row:
+            return {
+                'newest_message_id': None,
+                'oldest_message_id': None,
+                'backfill_complete': False
+            }
+
+        return {
+            'newest_message_id': row['newest_message_id'],
+            'oldest_message_id': row['oldest_message_id'],
+            'backfill_complete': row['backfill_complete']
+        }
+
+    async def record_page(self, channel_id: str, oldest_id: int, newest_id: int):
+        """
+        Widen the processed message range of a channel after a page was stored.
+        Works for both forward (after=) and backfill (before=) pages.
+        """
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                '''
+                INSERT INTO channel_checkpoints (channel_id, newest_message_id, oldest_message_id)
+                VALUES ($1, $2, $3)
+                ON CONFLICT (channel_id) DO UPDATE SET
+                    newest_message_id = GREATEST(channel_checkpoints.newest_message_id, EXCLUDED.newest_message_id),
+                    oldest_message_id = LEAST(channel_checkpoints.oldest_message_id, EXCLUDED.oldest_message_id),
+                    updated_at = NOW()
+                ''',
+                str(channel_id), int(newest_id), int(oldest_id)
+            )
+
+    async def mark_backfill_complete(self, channel_id: str):
+        """
+        Mark that the channel history has been paged back to its first message
+        """
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                '''
+                INSERT INTO channel_checkpoints (channel_id, backfill_complete)
+                VALUES ($1, TRUE)
+                ON CONFLICT (channel_id) DO UPDATE SET
+                    backfill_complete = TRUE,
+                    updated_at = NOW()
+                ''',
+                str(channel_id)
+            )
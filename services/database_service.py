@@ -1,6 +1,11 @@
+import asyncio
+import time
+from collections import deque
+
 import asyncpg
 import os
 from dotenv import load_dotenv
+from quart import has_request_context, request
 load_dotenv()
 
 
@@ -13,15 +18,155 @@ DB_CONFIG = {
     'port': int(os.getenv('DB_PORT', '5433'))
 }
 
+# Connection pool settings
+POOL_CONFIG = {
+    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+    # Prepared statements kept per connection (asyncpg's default is 100)
+    'statement_cache_size': int(os.getenv('DB_STATEMENT_CACHE_SIZE', '500')),
+    # Seconds a single query may run before it is cancelled
+    'command_timeout': float(os.getenv('DB_COMMAND_TIMEOUT', '30')),
+    # Idle connections above min_size are closed after this many seconds
+    'max_inactive_connection_lifetime': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+}
+
+# Acquire waits kept for the latency percentiles
+POOL_WAIT_SAMPLES = 1000
+
+
+class PoolMetrics:
+    """
+    How long callers wait for a connection and how long they hold it,
+    overall and per request endpoint ('background' outside of requests)
+    """
+
+    def __init__(self, samples: int = POOL_WAIT_SAMPLES):
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.waits = deque(maxlen=samples)
+        self.endpoints = {}
+
+    def _endpoint(self, endpoint: str) -> dict:
+        return self.endpoints.setdefault(endpoint, {
+            'acquired': 0, 'wait_total': 0.0, 'wait_max': 0.0, 'hold_total': 0.0, 'hold_max': 0.0
+        })
+
+    def record_acquire(self, endpoint: str, wait: float):
+        self.acquired += 1
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        self.waits.append(wait)
+        stats = self._endpoint(endpoint)
+        stats['acquired'] += 1
+        stats['wait_total'] += wait
+        stats['wait_max'] = max(stats['wait_max'], wait)
+
+    def record_release(self, endpoint: str, held: float):
+        self.in_use -= 1
+        stats = self._endpoint(endpoint)
+        stats['hold_total'] += held
+        stats['hold_max'] = max(stats['hold_max'], held)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.waits)
+
+        def wait_ms(fraction):
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 2)
+
+        return {
+            'in_use': self.in_use,
+            'peak_in_use': self.peak_in_use,
+            'waiting': self.waiting,
+            'acquired': self.acquired,
+            'timeouts': self.timeouts,
+            'wait_p50_ms': wait_ms(0.5),
+            'wait_p95_ms': wait_ms(0.95),
+            'wait_p99_ms': wait_ms(0.99),
+            'endpoints': {
+                endpoint: {
+                    'acquired': stats['acquired'],
+                    'wait_avg_ms': round(stats['wait_total'] / stats['acquired'] * 1000, 2),
+                    'wait_max_ms': round(stats['wait_max'] * 1000, 2),
+                    'hold_avg_ms': round(stats['hold_total'] / stats['acquired'] * 1000, 2),
+                    'hold_max_ms': round(stats['hold_max'] * 1000, 2)
+                }
+                for endpoint, stats in sorted(self.endpoints.items())
+                if stats['acquired']
+            }
+        }
+
+
+class _InstrumentedAcquire:
+    def __init__(self, pool, metrics: PoolMetrics, timeout):
+        self.pool = pool
+        self.metrics = metrics
+        self.timeout = timeout
+        self.endpoint = (request.endpoint or request.path) if has_request_context() else 'background'
+
+    async def __aenter__(self):
+        started = time.perf_counter()
+        self.metrics.waiting += 1
+        try:
+            self._context = self.pool.acquire(timeout=self.timeout)
+            conn = await self._context.__aenter__()
+        except asyncio.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.waiting -= 1
+
+        self._acquired_at = time.perf_counter()
+        self.metrics.record_acquire(self.endpoint, self._acquired_at - started)
+        return conn
+
+    async def __aexit__(self, *exc_info):
+        self.metrics.record_release(self.endpoint, time.perf_counter() - self._acquired_at)
+        return await self._context.__aexit__(*exc_info)
+
+
+class InstrumentedPool:
+    """
+    An asyncpg pool whose acquire() records PoolMetrics; everything else
+    (close, get_size, ...) is passed through to the pool
+    """
+
+    def __init__(self, pool, metrics: PoolMetrics = None):
+        self._pool = pool
+        self.metrics = metrics or PoolMetrics()
+
+    def acquire(self, timeout: float = None):
+        return _InstrumentedAcquire(self._pool, self.metrics, timeout)
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+    def get_stats(self) -> dict:
+        """
+        Pool size and limits together with the acquire metrics
+        """
+        return {
+            'size': self._pool.get_size(),
+            'idle': self._pool.get_idle_size(),
+            'min_size': self._pool.get_min_size(),
+            'max_size': self._pool.get_max_size(),
+            **self.metrics.snapshot()
+        }
+
 
-async def create_database_pool():
+async def create_database_pool(**overrides):
     """
-    Create and return a database connection pool
+    Create and return an instrumented database connection pool
+    POOL_CONFIG settings can be overridden per caller (e.g. init=...)
     """
     try:
-        pool = await asyncpg.create_pool(**DB_CONFIG)
+        pool = await asyncpg.create_pool(**DB_CONFIG, **{**POOL_CONFIG, **overrides})
         print("Successfully connected to database")
-        return pool
+        return InstrumentedPool(pool)
     except Exception as e:
         print(f"Error connecting to database: {str(e)}")
         raise
@@ -1,5 +1,7 @@
 import json
 
+from services import queries
+
 
 class FeedService:
     def __init__(self, pool):
@@ -16,14 +18,7 @@ class FeedService:
         try:
             async with self.pool.acquire() as conn:
                 # Get random media items
-                query = '''
-                    SELECT id, url, file_data, timestamp, author_id, media_type
-                    FROM memes
-                    WHERE file_data IS NOT NULL
-                    ORDER BY RANDOM()
-                    LIMIT $1
-                '''
-                rows = await conn.fetch(query, count)
+                rows = await queries.fetch(conn, 'random_feed', count)
 
                 items = []
                 has_more = len(rows) == count
@@ -48,7 +43,7 @@ class FeedService:
         """
         try:
             async with self.pool.acquire() as conn:
-                count = await conn.fetchval('SELECT COUNT(*) FROM memes WHERE file_data IS NOT NULL')
+                count = await queries.fetchval(conn, 'feed_count')
                 return count
         except Exception as e:
             print(f"Error getting total items: {str(e)}")
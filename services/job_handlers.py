@@ -0,0 +1,140 @@
+import asyncio
+import io
+import os
+
+import aiohttp
+
+from ingest.discord_client import DiscordClient
+from ingest.media_processing import make_thumbnail, thumbnails_available
+from ingest.ocr import OcrJob, ocr_available
+from ingest.repair import RepairWorker
+from services.job_runner import JOB_PROCESS_WORKERS
+from services.ocr_service import OcrService
+from services.repair_service import RepairService
+from services.tag_index import tag_indexes
+
+
+def job_concurrency(job_type: str, default: int) -> int:
+    """
+    Per-type limit, overridable with JOB_CONCURRENCY_<TYPE> (e.g. JOB_CONCURRENCY_REPAIR_MEDIA=2)
+    """
+    return int(os.getenv(f'JOB_CONCURRENCY_{job_type.upper()}', str(default)))
+
+
+def job_interval(job_type: str, default: float) -> float:
+    """
+    Seconds between scheduled runs, overridable with JOB_INTERVAL_<TYPE>; 0 disables the schedule
+    """
+    return float(os.getenv(f'JOB_INTERVAL_{job_type.upper()}', str(default)))
+
+
+THUMBNAIL_BATCH_SIZE = 32
+
+
+def register_default_jobs(runner, pool):
+    """
+    Register the app's job types with a JobRunner
+    """
+
+    async def account_cleanup(payload: dict):
+        # Rows of a deleted account that nothing references anymore
+        user_id = payload['user_id']
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute('DELETE FROM meme_tags WHERE user_id = $1', user_id)
+                await conn.execute('DELETE FROM tags WHERE user_id = $1', user_id)
+        tag_indexes.invalidate(user_id)
+
+    async def rebuild_counts(payload: dict):
+        # Recount the cached counters from their source rows, in case they drifted
+        async with pool.acquire() as conn:
+            await conn.execute(
+                '''
+                UPDATE tags SET usage_count = counts.count
+                FROM (
+                    SELECT t.id, COUNT(mt.tag_id) AS count
+                    FROM tags t
+                    LEFT JOIN meme_tags mt ON mt.tag_id = t.id
+                    GROUP BY t.id
+                ) counts
+                WHERE tags.id = counts.id AND tags.usage_count <> counts.count
+                '''
+            )
+            await conn.execute(
+                '''
+                UPDATE users SET like_count = jsonb_array_length(liked_memes)
+                WHERE jsonb_typeof(liked_memes) = 'array'
+                  AND like_count <> jsonb_array_length(liked_memes)
+                '''
+            )
+
+    async def repair_media(payload: dict):
+        repairs = RepairService(pool, max_failures=payload.get('max_failures', 5))
+        async with aiohttp.ClientSession() as session:
+            client = DiscordClient(session)
+            async with RepairWorker(repairs, client.fetch_media, concurrency=payload.get('concurrency', 4),
+                                    executor=runner.executor) as worker:
+                await worker.run_once()
+
+    async def thumbnails(payload: dict):
+        # Previews for memes stored without one (older rows, imports without Pillow).
+        # One batch per job; a full batch queues the next one after its last id.
+        # Media that cannot be decoded is marked, so later runs skip it
+        after_id = payload.get('after_id', 0)
+        async with pool.acquire() as conn:
+            ids = await conn.fetch(
+                '''
+                SELECT id
+                FROM memes
+                WHERE id > $1
+                  AND thumbnail IS NULL
+                  AND NOT thumbnail_failed
+                  AND file_data IS NOT NULL
+                  AND media_type IN ('image', 'gif')
+                ORDER BY id
+                LIMIT $2
+                ''',
+                after_id, THUMBNAIL_BATCH_SIZE
+            )
+
+        loop = asyncio.get_running_loop()
+        for row in ids:
+            # One blob in this process at a time; decoding runs in the runner's processes
+            async with pool.acquire() as conn:
+                file_data = await conn.fetchval('SELECT file_data FROM memes WHERE id = $1', row['id'])
+            if file_data is None:
+                continue
+            thumbnail = await loop.run_in_executor(runner.executor, make_thumbnail, io.BytesIO(file_data))
+            del file_data
+
+            async with pool.acquire() as conn:
+                if thumbnail:
+                    await conn.execute('UPDATE memes SET thumbnail = $2 WHERE id = $1', row['id'], thumbnail)
+                else:
+                    await conn.execute('UPDATE memes SET thumbnail_failed = TRUE WHERE id = $1', row['id'])
+
+        if len(ids) == THUMBNAIL_BATCH_SIZE:
+            await runner.jobs.enqueue('thumbnails', {'after_id': ids[-1]['id']})
+
+    async def ocr(payload: dict):
+        async with OcrJob(OcrService(pool), lang=payload.get('lang', 'eng'),
+                          workers=payload.get('workers', JOB_PROCESS_WORKERS), executor=runner.executor) as job:
+            await job.run_once()
+
+    runner.register('account_cleanup', account_cleanup, concurrency=job_concurrency('account_cleanup', 2))
+    runner.register('rebuild_counts', rebuild_counts, concurrency=job_concurrency('rebuild_counts', 1))
+    runner.register('repair_media', repair_media, concurrency=job_concurrency('repair_media', 1))
+    scheduled = {'rebuild_counts': 86400, 'repair_media': 900}
+
+    if thumbnails_available():
+        runner.register('thumbnails', thumbnails, concurrency=job_concurrency('thumbnails', 1))
+        scheduled['thumbnails'] = 3600
+    if ocr_available():
+        runner.register('ocr', ocr, concurrency=job_concurrency('ocr', 1))
+        scheduled['ocr'] = 600
+
+    # Maintenance jobs nobody enqueues by hand run on a schedule
+    for job_type, default in scheduled.items():
+        interval = job_interval(job_type, default)
+        if interval > 0:
+            runner.schedule(job_type, interval)
@@ -0,0 +1,219 @@
+import asyncio
+import os
+import socket
+from concurrent.futures import ProcessPoolExecutor
+
+from services.job_service import JobService
+
+
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '2'))
+# Running jobs not finished after this long are assumed lost and queued again,
+# so it has to be longer than the slowest job (a full repair or OCR pass)
+JOB_LOCK_TIMEOUT = float(os.getenv('JOB_LOCK_TIMEOUT', '3600'))
+JOB_RETENTION = float(os.getenv('JOB_RETENTION', str(7 * 86400)))
+MAINTENANCE_INTERVAL = 60.0
+# How long stop() waits for cancelled tasks (pollers, interrupted jobs) to wind down
+STOP_GRACE = 5.0
+# Processes shared by the CPU-heavy jobs (media processing, OCR, thumbnails)
+JOB_PROCESS_WORKERS = int(os.getenv('JOB_PROCESS_WORKERS', '2'))
+
+
+class JobRunner:
+    """
+    Worker coroutines for the jobs table, one poller per job type. A job type
+    never has more than its concurrency limit running in this process.
+    Handlers are async callables taking the job's payload dict; raising retries
+    the job with an exponential backoff.
+    """
+
+    def __init__(self, jobs: JobService, poll_interval: float = JOB_POLL_INTERVAL,
+                 base_delay: float = 30.0, max_delay: float = 3600.0,
+                 lock_timeout: float = JOB_LOCK_TIMEOUT, retention: float = JOB_RETENTION):
+        self.jobs = jobs
+        self.poll_interval = poll_interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock_timeout = lock_timeout
+        self.retention = retention
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.handlers = {}
+        self.running = {}
+        self.completed = {}
+        self.failed = {}
+        self._wake = {}
+        # job_type -> [interval, payload, next enqueue (loop time)]
+        self._schedules = {}
+        self._stopping = asyncio.Event()
+        self._pollers = []
+        self._in_flight = set()
+        self._executor = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """
+        Process pool for the handlers' CPU work, created on first use and shared
+        by all job types, so a job run does not start processes of its own
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=JOB_PROCESS_WORKERS)
+        return self._executor
+
+    def register(self, job_type: str, handler, concurrency: int = 1):
+        self.handlers[job_type] = (handler, concurrency)
+        self.running[job_type] = 0
+        self.completed[job_type] = 0
+        self.failed[job_type] = 0
+        self._wake[job_type] = asyncio.Event()
+
+    def schedule(self, job_type: str, interval: float, payload: dict = None):
+        """
+        Queue a job of this type every interval seconds (none while one is still pending)
+        """
+        self._schedules[job_type] = [interval, payload or {}, 0.0]
+
+    def wake(self, job_type: str):
+        """
+        Look for new jobs of this type now instead of at the next poll
+        """
+        if job_type in self._wake:
+            self._wake[job_type].set()
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(self.base_delay * (2 ** max(attempts - 1, 0)), self.max_delay)
+
+    async def start(self):
+        self._stopping.clear()
+        for job_type in self.handlers:
+            self._pollers.append(asyncio.create_task(self._poll(job_type)))
+        self._pollers.append(asyncio.create_task(self._maintain()))
+        print(f"Job runner {self.worker_id} started for {', '.join(self.handlers) or 'no job types'}")
+
+    async def stop(self, timeout: float = 30.0):
+        """
+        Stop claiming jobs and give running ones timeout seconds to finish;
+        jobs still running after that are cancelled and put back in the queue
+        """
+        # Pollers see the flag at their next wake-up and return on their own
+        self._stopping.set()
+        for wake in self._wake.values():
+            wake.set()
+        if self._pollers:
+            _, pending = await asyncio.wait(self._pollers, timeout=STOP_GRACE)
+            await _cancel(pending)
+        self._pollers = []
+
+        if self._in_flight:
+            _, pending = await asyncio.wait(set(self._in_flight), timeout=timeout)
+            await _cancel(pending)
+
+        if self._executor is not None:
+            # No job is left to wait for its results
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _poll(self, job_type: str):
+        handler, concurrency = self.handlers[job_type]
+        wake = self._wake[job_type]
+
+        while not self._stopping.is_set():
+            claimed = []
+            free = concurrency - self.running[job_type]
+            if free > 0:
+                try:
+                    claimed = await self.jobs.claim(job_type, self.worker_id, free)
+                except Exception as e:
+                    print(f"Error claiming {job_type} jobs: {str(e)}")
+
+            for job in claimed:
+                self.running[job_type] += 1
+                task = asyncio.create_task(self._run(job, handler))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+
+            # A full batch may mean more jobs are due; otherwise wait for a
+            # free slot, a wake-up or the next poll
+            if not claimed or len(claimed) < free:
+                await _wait_for_event(wake, self.poll_interval)
+                wake.clear()
+            else:
+                await asyncio.sleep(0)
+
+    async def _run(self, job: dict, handler):
+        job_type = job['job_type']
+        try:
+            await handler(job['payload'])
+            await self.jobs.complete(job['id'])
+            self.completed[job_type] += 1
+        except asyncio.CancelledError:
+            await self.jobs.release(job['id'])
+            raise
+        except Exception as e:
+            self.failed[job_type] += 1
+            print(f"Job {job['id']} ({job_type}) failed on attempt {job['attempts']}: {str(e)}")
+            try:
+                await self.jobs.fail(job['id'], str(e), self.retry_delay(job['attempts']))
+            except Exception as e:
+                print(f"Error recording failure of job {job['id']}: {str(e)}")
+        finally:
+            self.running[job_type] -= 1
+            # A slot is free again
+            self.wake(job_type)
+
+    async def _maintain(self):
+        while not self._stopping.is_set():
+            try:
+                requeued = await self.jobs.requeue_stale(self.lock_timeout)
+                if requeued:
+                    print(f"Requeued {requeued} jobs from unresponsive workers")
+                await self.jobs.purge_finished(self.retention)
+            except Exception as e:
+                print(f"Error maintaining job queue: {str(e)}")
+            await self._enqueue_scheduled()
+            await _wait_for_event(self._stopping, MAINTENANCE_INTERVAL)
+
+    async def _enqueue_scheduled(self):
+        now = asyncio.get_running_loop().time()
+        for job_type, schedule in self._schedules.items():
+            interval, payload, next_at = schedule
+            if now < next_at:
+                continue
+            try:
+                if await self.jobs.enqueue_unless_pending(job_type, payload):
+                    self.wake(job_type)
+                schedule[2] = now + interval
+            except Exception as e:
+                print(f"Error scheduling {job_type} job: {str(e)}")
+
+    def get_status(self) -> dict:
+        """
+        Running jobs and limits of this process per job type
+        """
+        return {
+            job_type: {
+                'running': self.running[job_type],
+                'concurrency': concurrency,
+                'completed': self.completed[job_type],
+                'failed': self.failed[job_type]
+            }
+            for job_type, (_, concurrency) in self.handlers.items()
+        }
+
+
+async def _wait_for_event(event: asyncio.Event, timeout: float):
+    """
+    Wait until the event is set or timeout seconds pass. Unlike
+    asyncio.wait_for, the waiter is never cancelled while it is completing,
+    so a wake-up racing the timeout (or stop()) cannot leave the caller stuck
+    """
+    waiter = asyncio.ensure_future(event.wait())
+    try:
+        await asyncio.wait({waiter}, timeout=timeout)
+    finally:
+        waiter.cancel()
+
+
+async def _cancel(tasks: set):
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.wait(tasks, timeout=STOP_GRACE)
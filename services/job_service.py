@@ -0,0 +1,104 @@
+import json
+
+from services import queries
+
+
+class JobService:
+    """
+    Database side of the background job queue. Jobs move from queued to
+    running when a worker claims them, then to done, back to queued for a
+    retry, or to failed once max_attempts is used up. Claims use
+    FOR UPDATE SKIP LOCKED, so any number of app processes can share the table.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def enqueue(self, job_type: str, payload: dict = None, priority: int = 0,
+                      max_attempts: int = 5, delay: float = 0) -> int:
+        """
+        Queue a job to run after delay seconds; higher priorities are claimed first
+        Returns the job id
+        """
+        async with self.pool.acquire() as conn:
+            return await queries.fetchval(conn, 'enqueue_job', job_type, json.dumps(payload or {}),
+                                          priority, max_attempts, float(delay))
+
+    async def enqueue_unless_pending(self, job_type: str, payload: dict = None, priority: int = 0) -> int:
+        """
+        Queue a job unless one of the same type is already queued or running,
+        so periodic jobs don't pile up behind a slow run
+        Returns the job id, or None if one was pending
+        """
+        async with self.pool.acquire() as conn:
+            return await queries.fetchval(conn, 'enqueue_job_unless_pending',
+                                          job_type, json.dumps(payload or {}), priority)
+
+    async def claim(self, job_type: str, worker_id: str, limit: int = 1) -> list:
+        """
+        Lock up to limit due jobs of one type for this worker
+        Returns list of dicts with id, job_type, payload, attempts and max_attempts
+        """
+        async with self.pool.acquire() as conn:
+            rows = await queries.fetch(conn, 'claim_jobs', job_type, worker_id, limit)
+
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            if isinstance(job['payload'], str):
+                job['payload'] = json.loads(job['payload'])
+            jobs.append(job)
+        return jobs
+
+    async def complete(self, job_id: int):
+        async with self.pool.acquire() as conn:
+            await queries.execute(conn, 'complete_job', job_id)
+
+    async def fail(self, job_id: int, error: str, retry_in: float):
+        """
+        Record a failed attempt; the job is retried after retry_in seconds
+        unless it has used up its attempts
+        """
+        async with self.pool.acquire() as conn:
+            await queries.execute(conn, 'fail_job', job_id, error[:1000], float(retry_in))
+
+    async def release(self, job_id: int):
+        """
+        Put back a job that was interrupted (e.g. by shutdown) without counting the attempt
+        """
+        async with self.pool.acquire() as conn:
+            await queries.execute(conn, 'release_job', job_id)
+
+    async def requeue_stale(self, timeout: float) -> int:
+        """
+        Queue running jobs again whose worker has held them for longer than timeout seconds
+        (the process died or lost its connection). Returns the number of jobs requeued
+        """
+        async with self.pool.acquire() as conn:
+            status = await queries.execute(conn, 'requeue_stale_jobs', float(timeout))
+        return int(status.split()[-1])
+
+    async def purge_finished(self, older_than: float) -> int:
+        """
+        Delete done and failed jobs that finished more than older_than seconds ago
+        """
+        async with self.pool.acquire() as conn:
+            status = await queries.execute(conn, 'purge_jobs', float(older_than))
+        return int(status.split()[-1])
+
+    async def get_stats(self) -> dict:
+        """
+        Get job counts per type and status, and how long the oldest due job has waited
+        """
+        async with self.pool.acquire() as conn:
+            rows = await queries.fetch(conn, 'job_stats')
+
+        stats = {}
+        for row in rows:
+            queue = stats.setdefault(row['job_type'], {
+                'queued': 0, 'running': 0, 'done': 0, 'failed': 0, 'oldest_due_seconds': None
+            })
+            queue[row['status']] = row['count']
+            if row['oldest_due_seconds'] is not None:
+                queue['oldest_due_seconds'] = round(float(row['oldest_due_seconds']), 1)
+        return stats
@@ -1,5 +1,6 @@
 import json
 from quart import session
+from services import queries
 
 
 class LikeService:
@@ -11,15 +12,7 @@ class LikeService:
         Get tags for a specific meme and user
         """
         try:
-            tags = await conn.fetch(
-                '''
-                SELECT t.id, t.name, t.color
-                FROM tags t
-                JOIN meme_tags mt ON t.id = mt.tag_id
-                WHERE mt.meme_id = $1 AND mt.user_id = $2 AND t.user_id = $2
-                ''',
-                meme_id, user_id
-            )
+            tags = await queries.fetch(conn, 'meme_tags', meme_id, user_id)
             return [dict(tag) for tag in tags]
         except Exception as e:
             print(f"Error getting meme tags: {str(e)}")
@@ -35,10 +28,7 @@ class LikeService:
 
         try:
             async with self.pool.acquire() as conn:
-                user = await conn.fetchrow(
-                    'SELECT liked_memes FROM users WHERE username = $1',
-                    session['username']
-                )
+                user = await queries.fetchrow(conn, 'user_likes', session['username'])
 
                 if not user:
                     return {'status': 'error', 'message': 'User not found'}
@@ -59,11 +49,7 @@ class LikeService:
                     liked_memes.append(item_id_str)
                     action = 'liked'
 
-                await conn.execute(
-                    'UPDATE users SET liked_memes = $1::jsonb WHERE username = $2',
-                    json.dumps(liked_memes),
-                    session['username']
-                )
+                await queries.execute(conn, 'update_likes', user['id'], json.dumps(liked_memes), len(liked_memes))
 
                 return {'status': 'success', 'action': action}
 
@@ -84,10 +70,7 @@ class LikeService:
 
         try:
             async with self.pool.acquire() as conn:
-                user = await conn.fetchrow(
-                    'SELECT liked_memes FROM users WHERE username = $1',
-                    target_username
-                )
+                user = await queries.fetchrow(conn, 'user_likes', target_username)
 
                 if not user:
                     return {'error': 'User not found'}
@@ -106,19 +89,11 @@ class LikeService:
                     end_idx = start_idx + per_page
                     page_meme_ids = liked_meme_ids[start_idx:end_idx]
 
-                    # Get user ID for tag lookup
-                    user_record = await conn.fetchrow(
-                        'SELECT id FROM users WHERE username = $1',
-                        target_username
-                    )
-                    user_id = user_record['id'] if user_record else None
+                    user_id = user['id']
 
                     memes = []
                     for meme_id in page_meme_ids:
-                        meme = await conn.fetchrow(
-                            'SELECT id, media_type FROM memes WHERE id = $1',
-                            int(meme_id)
-                        )
+                        meme = await queries.fetchrow(conn, 'meme_type', int(meme_id))
                         if meme:
                             # Get tags for this meme
                             tags = []
@@ -1,3 +1,6 @@
+from services import queries
+
+
 class MediaService:
     def __init__(self, pool):
         self.pool = pool
@@ -19,10 +22,7 @@ class MediaService:
         """
         try:
             async with self.pool.acquire() as conn:
-                media = await conn.fetchrow(
-                    'SELECT file_data, media_type FROM memes WHERE id = $1',
-                    media_id
-                )
+                media = await queries.fetchrow(conn, 'meme_media', media_id)
 
                 if not media:
                     return None
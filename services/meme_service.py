@@ -0,0 +1,64 @@
+from quart import session
+from services import queries
+from services.user_context import get_current_user_id
+
+
+MAX_HYDRATE_IDS = 100
+
+
+class MemeService:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def hydrate_memes(self, meme_ids: list) -> dict:
+        """
+        Get media type, like count, liked flag and tags for many memes.
+        Uses the same number of queries no matter how many ids are requested.
+        Returns dict with the memes in request order and the ids that do not exist
+        """
+        try:
+            meme_ids = list(dict.fromkeys(int(meme_id) for meme_id in meme_ids or []))
+        except (TypeError, ValueError):
+            return {'status': 'error', 'message': 'Meme IDs must be integers'}
+
+        if not meme_ids:
+            return {'status': 'error', 'message': 'Meme IDs are required'}
+
+        if len(meme_ids) > MAX_HYDRATE_IDS:
+            return {'status': 'error', 'message': f'At most {MAX_HYDRATE_IDS} memes per request'}
+
+        try:
+            async with self.pool.acquire() as conn:
+                user_id = await get_current_user_id(conn, session)
+
+                # Like counts use the GIN index on users.liked_memes
+                rows = await queries.fetch(conn, 'hydrate_memes', meme_ids, user_id)
+
+                tags_by_meme = {row['id']: [] for row in rows}
+                if user_id and rows:
+                    tag_rows = await queries.fetch(conn, 'memes_tags', user_id, list(tags_by_meme))
+                    for tag in tag_rows:
+                        tags_by_meme[tag['meme_id']].append(
+                            {'id': tag['id'], 'name': tag['name'], 'color': tag['color']}
+                        )
+
+            found = {row['id']: row for row in rows}
+            return {
+                'status': 'success',
+                'memes': [
+                    {
+                        'id': meme_id,
+                        'media_type': found[meme_id]['media_type'],
+                        'media_url': f'/media/{meme_id}',
+                        'liked': found[meme_id]['liked'],
+                        'like_count': found[meme_id]['like_count'],
+                        'tags': tags_by_meme[meme_id]
+                    }
+                    for meme_id in meme_ids if meme_id in found
+                ],
+                'missing': [meme_id for meme_id in meme_ids if meme_id not in found]
+            }
+
+        except Exception as e:
+            print(f"Error hydrating memes: {str(e)}")
+            return {'status': 'error', 'message': str(e)}
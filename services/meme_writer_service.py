@@ -0,0 +1,292 @@
+import asyncio
+import struct
+import time
+from datetime import date, datetime, timezone
+
+from ingest.spool import SpooledFile
+
+
+COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+COPY_TRAILER = struct.pack('>h', -1)
+PG_EPOCH = datetime(2000, 1, 1)
+PG_EPOCH_DATE = date(2000, 1, 1)
+TEXT_TYPES = {'text', 'varchar', 'bpchar', 'name'}
+# pg_advisory_xact_lock key serializing flushes of concurrent ingest runs
+INGEST_LOCK_ID = 0x6D656D65
+# Rows hashed per statement by backfill_content_hashes
+HASH_BACKFILL_BATCH = 200
+
+
+def encode_binary_value(value, type_name: str) -> bytes:
+    """
+    Encode a value in PostgreSQL's binary COPY format for the given column type
+    """
+    if type_name in TEXT_TYPES:
+        return str(value).encode('utf-8')
+    if type_name == 'int8':
+        return struct.pack('>q', int(value))
+    if type_name == 'int4':
+        return struct.pack('>i', int(value))
+    if type_name == 'int2':
+        return struct.pack('>h', int(value))
+    if type_name in ('timestamp', 'timestamptz'):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        delta = value - PG_EPOCH
+        return struct.pack('>q', (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+    if type_name == 'date':
+        if isinstance(value, datetime):
+            value = value.date()
+        return struct.pack('>i', (value - PG_EPOCH_DATE).days)
+    if type_name == 'bytea':
+        return bytes(value)
+    raise ValueError(f"Unsupported column type for binary COPY: {type_name}")
+
+
+class MemeWriterService:
+    """
+    Batches ingested memes and loads them with COPY instead of one INSERT per row.
+    file_data may be bytes or a SpooledFile; spooled files are streamed from
+    disk with binary COPY and removed after the flush.
+    Use as an async context manager so pending rows are flushed on exit.
+    """
+
+    COLUMNS = [
+        'url', 'author_id', 'timestamp', 'media_type', 'file_data',
+        'content_hash', 'file_size', 'width', 'height', 'thumbnail'
+    ]
+
+    def __init__(self, pool, batch_size: int = 100, flush_interval: float = 5.0):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = []
+        self.pending_urls = set()
+        self.pending_hashes = set()
+        self.rows_written = 0
+        self.flushes = 0
+        self._last_flush = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._flush_task = None
+        self._column_types = None
+
+    async def __aenter__(self):
+        self._flush_task = asyncio.create_task(self._flush_periodically())
+        return self
+
+    async def __aexit__(self, *args):
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        try:
+            await self.flush()
+        finally:
+            # Rows that could not be stored are not checkpointed either; the
+            # next run fetches their messages again
+            self.discard()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                if time.monotonic() - self._last_flush >= self.flush_interval:
+                    await self.flush()
+            except Exception as e:
+                print(f"Error in periodic flush: {str(e)}")
+
+    async def filter_new_urls(self, urls: list) -> list:
+        """
+        Return the urls that are neither stored nor waiting in the batch,
+        using a single query for the whole list
+        """
+        urls = [url for url in dict.fromkeys(urls) if url not in self.pending_urls]
+        if not urls:
+            return []
+
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch('SELECT url FROM memes WHERE url = ANY($1)', urls)
+
+        existing = {row['url'] for row in rows}
+        return [url for url in urls if url not in existing]
+
+    async def backfill_content_hashes(self, batch_size: int = HASH_BACKFILL_BATCH) -> int:
+        """
+        Hash stored memes that have no content_hash yet (rows ingested before it
+        was recorded), so filter_new_hashes finds them too. The hashes are computed
+        by the database, batch_size rows per statement.
+        Returns the number of rows hashed
+        """
+        total = 0
+        while True:
+            async with self.pool.acquire() as conn:
+                status = await conn.execute(
+                    '''
+                    UPDATE memes SET content_hash = encode(sha256(file_data), 'hex')
+                    WHERE id IN (
+                        SELECT id FROM memes
+                        WHERE content_hash IS NULL AND file_data IS NOT NULL
+                        ORDER BY id
+                        LIMIT $1
+                    )
+                    ''',
+                    batch_size
+                )
+            count = int(status.split()[-1])
+            total += count
+            if count < batch_size:
+                return total
+
+    async def filter_new_hashes(self, hashes: list) -> list:
+        """
+        Return the content hashes that are neither stored nor waiting in the batch
+        """
+        hashes = [h for h in dict.fromkeys(hashes) if h and h not in self.pending_hashes]
+        if not hashes:
+            return []
+
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                'SELECT content_hash FROM memes WHERE content_hash = ANY($1)',
+                hashes
+            )
+
+        existing = {row['content_hash'] for row in rows}
+        return [h for h in hashes if h not in existing]
+
+    async def add(self, url: str, author_id: str, timestamp, media_type: str, file_data: bytes,
+                  content_hash: str = None, file_size: int = None, width: int = None,
+                  height: int = None, thumbnail: bytes = None):
+        """
+        Queue a meme for insertion, flushing when the batch is full or stale
+        """
+        if url in self.pending_urls:
+            if isinstance(file_data, SpooledFile):
+                file_data.cleanup()
+            return
+
+        self.pending.append((
+            url, author_id, timestamp, media_type, file_data,
+            content_hash, file_size, width, height, thumbnail
+        ))
+        self.pending_urls.add(url)
+        if content_hash:
+            self.pending_hashes.add(content_hash)
+
+        if (len(self.pending) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Write all pending rows in one transaction
+        Returns the number of rows inserted. If the write fails the rows stay
+        pending for the next flush and the error is raised, so callers don't
+        record them as stored
+        """
+        async with self._lock:
+            self._last_flush = time.monotonic()
+            if not self.pending:
+                return 0
+
+            # Rows added while the COPY runs go into a fresh batch
+            batch = self.pending
+            self.pending = []
+            self.pending_urls = set()
+            self.pending_hashes = set()
+
+            try:
+                async with self.pool.acquire() as conn:
+                    async with conn.transaction():
+                        # Ingest runs flush one at a time, so no other run can store
+                        # one of these urls between the check and the COPY
+                        await conn.execute('SELECT pg_advisory_xact_lock($1)', INGEST_LOCK_ID)
+                        rows = await conn.fetch(
+                            'SELECT url FROM memes WHERE url = ANY($1)',
+                            [record[0] for record in batch]
+                        )
+                        existing = {row['url'] for row in rows}
+                        records = [record for record in batch if record[0] not in existing]
+
+                        if any(isinstance(record[4], SpooledFile) for record in records):
+                            # Stream spooled files from disk instead of loading them
+                            column_types = await self._get_column_types(conn)
+                            await conn.copy_to_table(
+                                'memes',
+                                source=self._binary_copy_stream(records, column_types),
+                                columns=self.COLUMNS,
+                                format='binary'
+                            )
+                        elif records:
+                            await conn.copy_records_to_table(
+                                'memes',
+                                records=records,
+                                columns=self.COLUMNS
+                            )
+            except BaseException:
+                # Put the batch back in front of rows added meanwhile
+                self.pending = batch + self.pending
+                self._track(batch)
+                raise
+
+            for record in batch:
+                if isinstance(record[4], SpooledFile):
+                    record[4].cleanup()
+
+            self.rows_written += len(records)
+            self.flushes += 1
+            print(f"Stored {len(records)} memes in one batch ({len(batch) - len(records)} already present)")
+            return len(records)
+
+    def _track(self, records):
+        for record in records:
+            self.pending_urls.add(record[0])
+            if record[5]:
+                self.pending_hashes.add(record[5])
+
+    def discard(self):
+        """
+        Drop all pending rows and remove their spool files
+        """
+        for record in self.pending:
+            if isinstance(record[4], SpooledFile):
+                record[4].cleanup()
+        self.pending = []
+        self.pending_urls = set()
+        self.pending_hashes = set()
+
+    async def _get_column_types(self, conn) -> dict:
+        if self._column_types is None:
+            rows = await conn.fetch(
+                '''
+                SELECT a.attname, t.typname
+                FROM pg_attribute a
+                JOIN pg_type t ON t.oid = a.atttypid
+                WHERE a.attrelid = 'memes'::regclass AND a.attnum > 0 AND NOT a.attisdropped
+                '''
+            )
+            self._column_types = {row['attname']: row['typname'] for row in rows}
+        return self._column_types
+
+    async def _binary_copy_stream(self, records, column_types):
+        yield COPY_HEADER
+        for record in records:
+            parts = [struct.pack('>h', len(self.COLUMNS))]
+            for column, value in zip(self.COLUMNS, record):
+                if value is None:
+                    parts.append(struct.pack('>i', -1))
+                elif isinstance(value, SpooledFile):
+                    yield b''.join(parts)
+                    parts = []
+                    yield struct.pack('>i', value.size)
+                    async for chunk in value.iter_chunks():
+                        yield chunk
+                else:
+                    data = encode_binary_value(value, column_types[column])
+                    parts.append(struct.pack('>i', len(data)))
+                    parts.append(data)
+            yield b''.join(parts)
+        yield COPY_TRAILER
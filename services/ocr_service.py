@@ -0,0 +1,70 @@
+class OcrService:
+    """
+    Database side of the OCR job. A meme needs OCR while its ocr_hash differs
+    from its content_hash, so new and changed media are found through the
+    idx_memes_ocr_pending partial index, whose media_type list the queries repeat.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def get_pending(self, after_id: int = 0, limit: int = 32) -> list:
+        """
+        Get image memes whose text has not been read from their current media, by id
+        Returns list of dicts with id, media_type and file_data
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                '''
+                SELECT id, media_type, file_data
+                FROM memes
+                WHERE id > $1
+                  AND media_type IN ('image', 'gif')
+                  AND (ocr_hash IS NULL OR ocr_hash IS DISTINCT FROM content_hash)
+                  AND file_data IS NOT NULL
+                ORDER BY id
+                LIMIT $2
+                ''',
+                after_id, limit
+            )
+        return [dict(row) for row in rows]
+
+    async def store_results(self, results: list) -> int:
+        """
+        Store recognized text for many memes in one statement
+        results is a list of dicts with id, text and content_hash
+        """
+        if not results:
+            return 0
+
+        async with self.pool.acquire() as conn:
+            status = await conn.execute(
+                '''
+                UPDATE memes SET
+                    ocr_text = NULLIF(results.text, ''),
+                    ocr_hash = results.content_hash,
+                    content_hash = COALESCE(memes.content_hash, results.content_hash)
+                FROM unnest($1::int[], $2::text[], $3::text[]) AS results(id, text, content_hash)
+                WHERE memes.id = results.id
+                ''',
+                [r['id'] for r in results],
+                [r['text'] for r in results],
+                [r['content_hash'] for r in results]
+            )
+        return int(status.split()[-1])
+
+    async def get_stats(self) -> dict:
+        """
+        Get counts of image memes with text and still waiting for OCR
+        """
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                '''
+                SELECT
+                    COUNT(*) FILTER (WHERE ocr_text IS NOT NULL) AS with_text,
+                    COUNT(*) FILTER (WHERE ocr_hash IS NULL OR ocr_hash IS DISTINCT FROM content_hash) AS pending
+                FROM memes
+                WHERE media_type IN ('image', 'gif') AND file_data IS NOT NULL
+                '''
+            )
+        return {'with_text': row['with_text'], 'pending': row['pending']}
@@ -0,0 +1,62 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+# bcrypt releases the GIL while hashing, so threads run hashes in parallel
+PASSWORD_WORKERS = int(os.getenv('PASSWORD_WORKERS', '2'))
+# Hashes waiting for a worker; beyond this, logins are turned away instead of
+# piling up behind each other until they all time out
+PASSWORD_QUEUE_LIMIT = int(os.getenv('PASSWORD_QUEUE_LIMIT', '32'))
+
+
+class HasherBusyError(Exception):
+    pass
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a small thread pool, so a hash (100-300 ms) never blocks
+    the event loop that is serving feed and media requests
+    """
+
+    def __init__(self, workers: int = PASSWORD_WORKERS, queue_limit: int = PASSWORD_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+
+    async def _run(self, func, *args):
+        if self.pending >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HasherBusyError('Too many password checks in progress')
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash_password, password)
+
+    async def check(self, password: str, password_hash: str) -> bool:
+        return await self._run(_check_password, password, password_hash)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def _hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+
+def _check_password(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode(), password_hash.encode())
+
+
+# Shared by every UserService in this process
+password_hasher = PasswordHasher()
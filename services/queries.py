@@ -0,0 +1,475 @@
+import weakref
+from contextlib import AsyncExitStack
+
+import asyncpg
+from asyncpg.pool import PoolConnectionProxy
+
+
+# Ids in the user's ($1) liked_memes array, for joining against meme_tags
+LIKED_MEME_IDS_CTE = '''
+    liked AS (
+        SELECT DISTINCT value::int AS meme_id
+        FROM users, jsonb_array_elements_text(users.liked_memes) AS value
+        WHERE users.id = $1 AND value ~ '^[0-9]+$'
+    )
+'''
+
+TAG_SORT_ORDERS = {
+    'recent': 'last_used DESC NULLS LAST, created_at DESC',
+    'usage': 'usage_count DESC, lower(name)',
+    'name': 'lower(name)'
+}
+
+# Must match idx_memes_text_search in services/schema_service.py
+MEME_SEARCH_VECTOR = "to_tsvector('simple', COALESCE(description, '') || ' ' || COALESCE(ocr_text, ''))"
+
+
+def _bulk_meme_tags(change: str, sign: str) -> str:
+    # Every meme x tag pair of a bulk tag update in one statement; change
+    # inserts or deletes the valid pairs and returns those it changed
+    return f'''
+        WITH pairs AS (
+            SELECT m.meme_id, t.tag_id
+            FROM unnest($2::int[]) AS m(meme_id)
+            CROSS JOIN unnest($3::int[]) AS t(tag_id)
+        ),
+        known_memes AS (
+            SELECT id FROM memes WHERE id = ANY($2::int[])
+        ),
+        owned_tags AS (
+            SELECT id FROM tags WHERE id = ANY($3::int[]) AND user_id = $1
+        ),
+        valid AS (
+            SELECT p.meme_id, p.tag_id
+            FROM pairs p
+            JOIN known_memes km ON km.id = p.meme_id
+            JOIN owned_tags ot ON ot.id = p.tag_id
+        ),
+        changed AS ({change}),
+        counted AS (
+            UPDATE tags SET usage_count = GREATEST(usage_count {sign} per_tag.count, 0)
+            FROM (SELECT tag_id, COUNT(*) AS count FROM changed GROUP BY tag_id) per_tag
+            WHERE tags.id = per_tag.tag_id AND tags.user_id = $1
+        )
+        SELECT
+            p.meme_id,
+            p.tag_id,
+            p.meme_id IN (SELECT id FROM known_memes) AS meme_exists,
+            p.tag_id IN (SELECT id FROM owned_tags) AS tag_owned,
+            EXISTS (
+                SELECT 1 FROM changed c
+                WHERE c.meme_id = p.meme_id AND c.tag_id = p.tag_id
+            ) AS changed
+        FROM pairs p
+    '''
+
+
+# Every statement the web app runs while serving requests or polling for jobs,
+# defined once so every caller sends the same text: asyncpg caches prepared
+# statements per connection by query text, and slight variations of a lookup
+# would each be planned and cached separately. The ingest services (writer,
+# checkpoints, OCR, repair) keep their queries inline: they run in the CLI
+# scripts, whose pools are created without prepare_statements.
+QUERIES = {
+    # Users
+    'user_id': 'SELECT id FROM users WHERE username = $1',
+    'user_login': 'SELECT id, password_hash FROM users WHERE username = $1',
+    'user_profile': 'SELECT id, username, created_at, bio, ui_settings FROM users WHERE username = $1',
+    'user_likes': 'SELECT id, liked_memes FROM users WHERE username = $1',
+    'register_user': 'INSERT INTO users (username, password_hash) VALUES ($1, $2) RETURNING id',
+    'update_likes': 'UPDATE users SET liked_memes = $2::jsonb, like_count = $3 WHERE id = $1',
+    'update_ui_settings': 'UPDATE users SET ui_settings = $1 WHERE username = $2',
+    'update_bio': 'UPDATE users SET bio = $1 WHERE username = $2',
+    'delete_user': 'DELETE FROM users WHERE username = $1 RETURNING id',
+    # Newest likes are at the end of liked_memes. The page's positions are read by
+    # index (liked_memes -> position - 1) instead of expanding and sorting the whole
+    # array, so a page costs one element lookup and one index probe per shown meme
+    # (plus reading the array itself, which Postgres loads as one value)
+    'liked_page': '''
+        WITH liked AS (
+            -- Position of the page's newest like: the one before the cursor
+            SELECT liked_memes, LEAST(COALESCE($2::int - 1, total), total) AS first
+            FROM (
+                SELECT liked_memes,
+                       CASE WHEN jsonb_typeof(liked_memes) = 'array'
+                            THEN jsonb_array_length(liked_memes) ELSE 0 END AS total
+                FROM users
+                WHERE username = $1
+            ) u
+        ),
+        page AS (
+            SELECT position, liked.liked_memes ->> (position - 1) AS meme_id
+            FROM liked, generate_series(liked.first, GREATEST(liked.first - $3::int + 1, 1), -1) AS position
+        )
+        SELECT page.position, m.id, m.media_type
+        FROM page
+        LEFT JOIN memes m
+            ON m.id = CASE WHEN page.meme_id ~ '^[0-9]+$' THEN page.meme_id::int END
+        ORDER BY page.position DESC
+    ''',
+    # Both users pages walk idx_users_created_id and stop after limit rows
+    'users_page': '''
+        SELECT id, username, created_at, like_count
+        FROM users
+        ORDER BY created_at DESC, id DESC
+        LIMIT $1
+    ''',
+    'users_page_after': '''
+        SELECT id, username, created_at, like_count
+        FROM users
+        WHERE (created_at, id) < ($1, $2)
+        ORDER BY created_at DESC, id DESC
+        LIMIT $3
+    ''',
+
+    # Memes
+    'meme_media': 'SELECT file_data, media_type FROM memes WHERE id = $1',
+    'meme_type': 'SELECT id, media_type FROM memes WHERE id = $1',
+    'meme_exists': 'SELECT id FROM memes WHERE id = $1',
+    'random_feed': '''
+        SELECT id, media_type
+        FROM memes
+        WHERE file_data IS NOT NULL
+        ORDER BY RANDOM()
+        LIMIT $1
+    ''',
+    'feed_count': 'SELECT COUNT(*) FROM memes WHERE file_data IS NOT NULL',
+    # Like counts use the GIN index on users.liked_memes
+    'hydrate_memes': '''
+        SELECT
+            m.id,
+            m.media_type,
+            (
+                SELECT COUNT(*) FROM users u
+                WHERE u.liked_memes @> jsonb_build_array(m.id::text)
+            ) AS like_count,
+            COALESCE((
+                SELECT u.liked_memes @> jsonb_build_array(m.id::text)
+                FROM users u WHERE u.id = $2
+            ), FALSE) AS liked
+        FROM memes m
+        WHERE m.id = ANY($1::int[])
+    ''',
+
+    # Tags
+    **{
+        f'user_tags_{sort}': f'SELECT id, name, color, created_at, last_used, usage_count FROM tags WHERE user_id = $1 ORDER BY {order}'
+        for sort, order in TAG_SORT_ORDERS.items()
+    },
+    'tag_index': 'SELECT id, name, color, created_at, last_used FROM tags WHERE user_id = $1',
+    'create_tag': '''
+        INSERT INTO tags (user_id, name, color)
+        VALUES ($1, $2, $3)
+        ON CONFLICT (user_id, lower(name)) DO UPDATE SET name = EXCLUDED.name, color = EXCLUDED.color
+        RETURNING id, name, color, created_at, last_used, usage_count
+    ''',
+    'delete_tag': 'DELETE FROM tags WHERE id = $1 AND user_id = $2',
+    'meme_tags': '''
+        SELECT t.id, t.name, t.color
+        FROM tags t
+        JOIN meme_tags mt ON t.id = mt.tag_id
+        WHERE mt.meme_id = $1 AND mt.user_id = $2 AND t.user_id = $2
+    ''',
+    # Tags of many memes ($2) at once
+    'memes_tags': '''
+        SELECT mt.meme_id, t.id, t.name, t.color
+        FROM meme_tags mt
+        JOIN tags t ON t.id = mt.tag_id
+        WHERE mt.user_id = $1 AND mt.meme_id = ANY($2::int[]) AND t.user_id = $1
+        ORDER BY t.name
+    ''',
+    # Only the user's own tags; counted only if the tag was not on the meme yet
+    'add_meme_tag': '''
+        WITH inserted AS (
+            INSERT INTO meme_tags (user_id, meme_id, tag_id)
+            SELECT $1, $2, id FROM tags WHERE id = $3 AND user_id = $1
+            ON CONFLICT (user_id, meme_id, tag_id) DO NOTHING
+            RETURNING tag_id
+        )
+        UPDATE tags SET usage_count = usage_count + 1
+        FROM inserted
+        WHERE tags.id = inserted.tag_id AND tags.user_id = $1
+    ''',
+    'remove_meme_tag': '''
+        WITH deleted AS (
+            DELETE FROM meme_tags
+            WHERE user_id = $1 AND meme_id = $2 AND tag_id = $3
+            RETURNING tag_id
+        )
+        UPDATE tags SET usage_count = GREATEST(usage_count - 1, 0)
+        FROM deleted
+        WHERE tags.id = deleted.tag_id AND tags.user_id = $1
+    ''',
+    'bulk_add_meme_tags': _bulk_meme_tags(
+        '''
+            INSERT INTO meme_tags (user_id, meme_id, tag_id)
+            SELECT $1, meme_id, tag_id FROM valid
+            ON CONFLICT (user_id, meme_id, tag_id) DO NOTHING
+            RETURNING meme_id, tag_id
+        ''',
+        '+'
+    ),
+    'bulk_remove_meme_tags': _bulk_meme_tags(
+        '''
+            DELETE FROM meme_tags mt
+            USING valid v
+            WHERE mt.user_id = $1 AND mt.meme_id = v.meme_id AND mt.tag_id = v.tag_id
+            RETURNING mt.meme_id, mt.tag_id
+        ''',
+        '-'
+    ),
+    # Walks the index entries of the rarest requested tag newest first and
+    # stops after one page; each candidate is checked for the others
+    'liked_by_all_tags': f'''
+        WITH {LIKED_MEME_IDS_CTE}
+        SELECT m.id, m.media_type
+        FROM meme_tags mt
+        JOIN memes m ON m.id = mt.meme_id
+        WHERE mt.user_id = $1
+          AND mt.tag_id = (
+              SELECT t.id FROM tags t
+              WHERE t.user_id = $1 AND t.id = ANY($2::int[])
+              ORDER BY t.usage_count, t.id
+              LIMIT 1
+          )
+          AND ($4::int IS NULL OR mt.meme_id < $4)
+          AND mt.meme_id IN (SELECT meme_id FROM liked)
+          AND (
+              SELECT COUNT(*) FROM meme_tags other
+              WHERE other.user_id = $1
+                AND other.tag_id = ANY($2::int[])
+                AND other.meme_id = mt.meme_id
+          ) >= $3
+        ORDER BY mt.meme_id DESC
+        LIMIT $5
+    ''',
+    # One page per tag from its index entries, newest first; the newest
+    # memes of their union are the page
+    'liked_by_any_tag': f'''
+        WITH {LIKED_MEME_IDS_CTE},
+        matched AS (
+            SELECT DISTINCT tagged.meme_id
+            FROM unnest($2::int[]) AS tag(id)
+            CROSS JOIN LATERAL (
+                SELECT mt.meme_id
+                FROM meme_tags mt
+                WHERE mt.user_id = $1
+                  AND mt.tag_id = tag.id
+                  AND ($3::int IS NULL OR mt.meme_id < $3)
+                  AND mt.meme_id IN (SELECT meme_id FROM liked)
+                ORDER BY mt.meme_id DESC
+                LIMIT $4
+            ) tagged
+        )
+        SELECT m.id, m.media_type
+        FROM matched
+        JOIN memes m ON m.id = matched.meme_id
+        ORDER BY m.id DESC
+        LIMIT $4
+    ''',
+    'liked_tag_counts': f'''
+        WITH {LIKED_MEME_IDS_CTE}
+        SELECT mt.tag_id, COUNT(*) AS count
+        FROM meme_tags mt
+        JOIN liked ON liked.meme_id = mt.meme_id
+        WHERE mt.user_id = $1 AND mt.tag_id = ANY($2::int[])
+        GROUP BY mt.tag_id
+    ''',
+    'liked_by_tags_total': f'''
+        WITH {LIKED_MEME_IDS_CTE}
+        SELECT COUNT(*) FROM (
+            SELECT mt.meme_id
+            FROM meme_tags mt
+            JOIN liked ON liked.meme_id = mt.meme_id
+            WHERE mt.user_id = $1 AND mt.tag_id = ANY($2::int[])
+            GROUP BY mt.meme_id
+            HAVING COUNT(DISTINCT mt.tag_id) >= $3
+        ) matched
+    ''',
+
+    # Search
+    'has_trigram': "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')",
+    # Substring and fuzzy matches through the trigram index, closest names first
+    'search_users_fuzzy': '''
+        SELECT username
+        FROM users
+        WHERE username ILIKE $1 OR username % $2
+        ORDER BY similarity(username, $2) DESC, length(username), username
+        LIMIT $3 OFFSET $4
+    ''',
+    # Prefix matches through the lower(username) text_pattern_ops index
+    'search_users_prefix': '''
+        SELECT username
+        FROM users
+        WHERE lower(username) LIKE $1
+        ORDER BY lower(username) = $2 DESC, length(username), username
+        LIMIT $3 OFFSET $4
+    ''',
+    # The GIN index finds the matching rows, only those are ranked
+    'search_memes': f'''
+        SELECT id, media_type
+        FROM memes, to_tsquery('simple', $1) AS query
+        WHERE {MEME_SEARCH_VECTOR} @@ query
+        ORDER BY ts_rank({MEME_SEARCH_VECTOR}, query) DESC, id DESC
+        LIMIT $2 OFFSET $3
+    ''',
+
+    # Jobs (see services/job_service.py)
+    'enqueue_job': '''
+        INSERT INTO jobs (job_type, payload, priority, max_attempts, run_at)
+        VALUES ($1, $2::jsonb, $3, $4, NOW() + make_interval(secs => $5))
+        RETURNING id
+    ''',
+    'enqueue_job_unless_pending': '''
+        INSERT INTO jobs (job_type, payload, priority)
+        SELECT $1, $2::jsonb, $3
+        WHERE NOT EXISTS (
+            SELECT 1 FROM jobs WHERE job_type = $1 AND status IN ('queued', 'running')
+        )
+        RETURNING id
+    ''',
+    'claim_jobs': '''
+        UPDATE jobs SET
+            status = 'running',
+            attempts = attempts + 1,
+            locked_at = NOW(),
+            locked_by = $2
+        WHERE id IN (
+            SELECT id FROM jobs
+            WHERE status = 'queued' AND job_type = $1 AND run_at <= NOW()
+            ORDER BY priority DESC, run_at, id
+            LIMIT $3
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, job_type, payload, attempts, max_attempts
+    ''',
+    'complete_job': '''
+        UPDATE jobs SET status = 'done', finished_at = NOW(), locked_at = NULL, last_error = NULL
+        WHERE id = $1
+    ''',
+    'fail_job': '''
+        UPDATE jobs SET
+            status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+            finished_at = CASE WHEN attempts >= max_attempts THEN NOW() END,
+            run_at = NOW() + make_interval(secs => $3),
+            locked_at = NULL,
+            last_error = $2
+        WHERE id = $1
+    ''',
+    'release_job': '''
+        UPDATE jobs SET status = 'queued', attempts = GREATEST(attempts - 1, 0), locked_at = NULL
+        WHERE id = $1 AND status = 'running'
+    ''',
+    'requeue_stale_jobs': '''
+        UPDATE jobs SET
+            status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+            finished_at = CASE WHEN attempts >= max_attempts THEN NOW() END,
+            locked_at = NULL,
+            last_error = 'Worker stopped responding'
+        WHERE status = 'running' AND locked_at < NOW() - make_interval(secs => $1)
+    ''',
+    'purge_jobs': 'DELETE FROM jobs WHERE finished_at < NOW() - make_interval(secs => $1)',
+    'job_stats': '''
+        SELECT
+            job_type,
+            status,
+            COUNT(*) AS count,
+            EXTRACT(EPOCH FROM NOW() - MIN(run_at) FILTER (
+                WHERE status = 'queued' AND run_at <= NOW()
+            )) AS oldest_due_seconds
+        FROM jobs
+        GROUP BY job_type, status
+    ''',
+}
+
+# connection -> {name: PreparedStatement}, filled by prepare_statements
+_prepared = weakref.WeakKeyDictionary()
+
+
+def _connection(conn):
+    # Pool connections are handed out as proxies; statements belong to the connection behind them
+    return conn._con if isinstance(conn, PoolConnectionProxy) else conn
+
+
+async def prepare_statements(conn):
+    """
+    Prepare every registered statement on a connection. Used as the pool's
+    init callback, so planning happens once per connection instead of on
+    the first request that needs a statement
+    """
+    statements = _prepared.setdefault(_connection(conn), {})
+    for name, query in QUERIES.items():
+        if name in statements:
+            continue
+        try:
+            statements[name] = await conn.prepare(query)
+        except asyncpg.UndefinedFunctionError:
+            # Needs an optional extension (search_users_fuzzy: pg_trgm) that is
+            # not installed; callers check for it before running the statement
+            continue
+        except asyncpg.PostgresError as e:
+            # e.g. a column ensure_schema has not added yet; warm_up retries
+            print(f"Error preparing statement {name}: {str(e)}")
+
+
+async def warm_up(pool):
+    """
+    Prepare the registered statements on all of the pool's idle connections,
+    after ensure_schema has created everything they refer to
+    """
+    count = pool.get_idle_size()
+    # Held together, otherwise every acquire would return the same idle connection
+    async with AsyncExitStack() as stack:
+        for _ in range(count):
+            conn = await stack.enter_async_context(pool.acquire())
+            await prepare_statements(conn)
+    print(f"Prepared {len(QUERIES)} statements on {count} connections")
+
+
+def _statement(conn, name: str):
+    try:
+        return _prepared.get(_connection(conn), {}).get(name)
+    except TypeError:  # not weak-referenceable, e.g. a test double
+        return None
+
+
+def _forget(conn, name: str):
+    _prepared.get(_connection(conn), {}).pop(name, None)
+
+
+async def _run(conn, method: str, name: str, args: tuple):
+    statement = _statement(conn, name)
+    if statement is not None:
+        try:
+            return await getattr(statement, method)(*args)
+        except asyncpg.InvalidCachedStatementError:
+            # The table changed underneath the statement, plan it again through the cache
+            _forget(conn, name)
+    return await getattr(conn, method)(QUERIES[name], *args)
+
+
+async def fetch(conn, name: str, *args) -> list:
+    return await _run(conn, 'fetch', name, args)
+
+
+async def fetchrow(conn, name: str, *args):
+    return await _run(conn, 'fetchrow', name, args)
+
+
+async def fetchval(conn, name: str, *args):
+    return await _run(conn, 'fetchval', name, args)
+
+
+async def execute(conn, name: str, *args):
+    """
+    Run a statement that returns no rows. Returns the status, e.g. 'UPDATE 1'
+    """
+    statement = _statement(conn, name)
+    if statement is not None:
+        try:
+            # Prepared statements report their status after a fetch
+            await statement.fetch(*args)
+            return statement.get_statusmsg()
+        except asyncpg.InvalidCachedStatementError:
+            _forget(conn, name)
+    return await conn.execute(QUERIES[name], *args)
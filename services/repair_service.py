@@ -0,0 +1,122 @@
+import struct
+
+from ingest.spool import SpooledFile
+from services.meme_writer_service import COPY_HEADER, COPY_TRAILER
+
+
+class RepairService:
+    """
+    Database side of the retry queue for memes whose media was never stored
+    (file_data IS NULL). Every failed attempt pushes next_download_attempt
+    further out; rows that reached max_failures are no longer returned.
+    """
+
+    def __init__(self, pool, max_failures: int = 5):
+        self.pool = pool
+        self.max_failures = max_failures
+
+    async def get_due(self, after_id: int = 0, limit: int = 100) -> list:
+        """
+        Get blob-less memes that are due for another download attempt, by id
+        Returns list of dicts with id, url, media_type and download_failures
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                '''
+                SELECT id, url, media_type, download_failures
+                FROM memes
+                WHERE file_data IS NULL
+                  AND id > $1
+                  AND download_failures < $2
+                  AND (next_download_attempt IS NULL OR next_download_attempt <= NOW())
+                ORDER BY id
+                LIMIT $3
+                ''',
+                after_id, self.max_failures, limit
+            )
+        return [dict(row) for row in rows]
+
+    async def store_media(self, meme_id: int, file_data, info: dict) -> bool:
+        """
+        Store downloaded media and clear the retry state
+        file_data may be bytes or a SpooledFile, which is streamed from disk
+        through a temporary table instead of being loaded
+        Returns False if the row is gone or already has media
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if isinstance(file_data, SpooledFile):
+                    await conn.execute(
+                        'CREATE TEMP TABLE repair_upload (file_data BYTEA) ON COMMIT DROP'
+                    )
+                    await conn.copy_to_table(
+                        'repair_upload',
+                        source=_binary_copy_stream(file_data),
+                        columns=['file_data'],
+                        format='binary'
+                    )
+                    source = '(SELECT file_data FROM repair_upload)'
+                    args = ()
+                else:
+                    source = '$7'
+                    args = (file_data,)
+
+                result = await conn.execute(
+                    f'''
+                    UPDATE memes SET
+                        file_data = {source},
+                        content_hash = $2,
+                        file_size = $3,
+                        width = $4,
+                        height = $5,
+                        thumbnail = $6,
+                        download_failures = 0,
+                        last_download_error = NULL,
+                        next_download_attempt = NULL
+                    WHERE id = $1 AND file_data IS NULL
+                    ''',
+                    meme_id, info['content_hash'], info['file_size'],
+                    info['width'], info['height'], info['thumbnail'], *args
+                )
+        return result == 'UPDATE 1'
+
+    async def record_failure(self, meme_id: int, error: str, retry_in: float):
+        """
+        Count a failed attempt and schedule the next one retry_in seconds from now
+        """
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                '''
+                UPDATE memes SET
+                    download_failures = download_failures + 1,
+                    last_download_error = $2,
+                    next_download_attempt = NOW() + make_interval(secs => $3)
+                WHERE id = $1
+                ''',
+                meme_id, error[:1000], float(retry_in)
+            )
+
+    async def get_stats(self) -> dict:
+        """
+        Get counts of blob-less memes that will be retried and that were given up
+        """
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                '''
+                SELECT
+                    COUNT(*) FILTER (WHERE download_failures < $1) AS pending,
+                    COUNT(*) FILTER (WHERE download_failures >= $1) AS dead
+                FROM memes
+                WHERE file_data IS NULL
+                ''',
+                self.max_failures
+            )
+        return {'pending': row['pending'], 'dead': row['dead']}
+
+
+async def _binary_copy_stream(spooled: SpooledFile):
+    # One row with one bytea column, in binary COPY format
+    yield COPY_HEADER + struct.pack('>hi', 1, spooled.size)
+    async for chunk in spooled.iter_chunks():
+        yield chunk
+    yield COPY_TRAILER
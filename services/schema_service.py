@@ -0,0 +1,169 @@
+# Idempotent DDL applied at startup (web app and ingest scripts).
+# Every statement must be safe to run repeatedly against an existing database.
+SCHEMA_STATEMENTS = [
+    '''
+    CREATE TABLE IF NOT EXISTS channel_checkpoints (
+        channel_id TEXT PRIMARY KEY,
+        newest_message_id BIGINT,
+        oldest_message_id BIGINT,
+        backfill_complete BOOLEAN NOT NULL DEFAULT FALSE,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    ''',
+    # Metadata filled in by the ingest pipeline's CPU stage
+    '''
+    ALTER TABLE memes
+        ADD COLUMN IF NOT EXISTS content_hash TEXT,
+        ADD COLUMN IF NOT EXISTS file_size BIGINT,
+        ADD COLUMN IF NOT EXISTS width INTEGER,
+        ADD COLUMN IF NOT EXISTS height INTEGER,
+        ADD COLUMN IF NOT EXISTS thumbnail BYTEA
+    ''',
+    # One row per url, so concurrent ingest runs cannot store a meme twice. Rows
+    # duplicated before the constraint existed keep the plain index until they
+    # are merged by hand (their ids may be referenced by likes and tags)
+    '''
+    DO $$
+    BEGIN
+        IF to_regclass('idx_memes_url_unique') IS NULL THEN
+            IF EXISTS (SELECT 1 FROM memes GROUP BY url HAVING COUNT(*) > 1) THEN
+                RAISE NOTICE 'memes contains duplicate urls, not adding idx_memes_url_unique';
+                CREATE INDEX IF NOT EXISTS idx_memes_url ON memes (url);
+            ELSE
+                CREATE UNIQUE INDEX idx_memes_url_unique ON memes (url);
+                DROP INDEX IF EXISTS idx_memes_url;
+            END IF;
+        END IF;
+    END
+    $$
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_memes_content_hash ON memes (content_hash)',
+    # Retry bookkeeping for memes whose download failed (see ingest/repair.py)
+    '''
+    ALTER TABLE memes
+        ADD COLUMN IF NOT EXISTS download_failures INTEGER NOT NULL DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS last_download_error TEXT,
+        ADD COLUMN IF NOT EXISTS next_download_attempt TIMESTAMPTZ
+    ''',
+    # Only blob-less rows are indexed, so finding them never scans the media
+    'CREATE INDEX IF NOT EXISTS idx_memes_missing_file_data ON memes (id) WHERE file_data IS NULL',
+    # Tag filters: all memes of a user carrying a tag, in meme id order
+    'CREATE INDEX IF NOT EXISTS idx_meme_tags_user_tag_meme ON meme_tags (user_id, tag_id, meme_id)',
+    # Like counts: users whose liked_memes contain a meme id (liked_memes @> '["42"]')
+    'CREATE INDEX IF NOT EXISTS idx_users_liked_memes ON users USING GIN (liked_memes jsonb_path_ops)',
+    # Memes per tag, maintained by TagService on every meme_tags write.
+    # Backfilled once, when the column is added.
+    '''
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'tags' AND column_name = 'usage_count'
+        ) THEN
+            ALTER TABLE tags ADD COLUMN usage_count INTEGER NOT NULL DEFAULT 0;
+            UPDATE tags SET usage_count = counts.count
+            FROM (SELECT tag_id, COUNT(*) AS count FROM meme_tags GROUP BY tag_id) counts
+            WHERE tags.id = counts.tag_id;
+        END IF;
+    END
+    $$
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_tags_user_usage ON tags (user_id, usage_count DESC)',
+    # Search (see services/search_service.py). Trigram matching needs the pg_trgm
+    # extension; without the privilege to create it, usernames are prefix matched.
+    '''
+    DO $$
+    BEGIN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    EXCEPTION WHEN insufficient_privilege OR undefined_file THEN
+        RAISE NOTICE 'pg_trgm is not available, username search uses prefix matching';
+    END
+    $$
+    ''',
+    '''
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+            CREATE INDEX IF NOT EXISTS idx_users_username_trgm ON users USING GIN (username gin_trgm_ops);
+        END IF;
+    END
+    $$
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_users_username_prefix ON users (lower(username) text_pattern_ops)',
+    # Number of liked memes per user, maintained by LikeService on every like toggle.
+    # Backfilled once, when the column is added.
+    '''
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'users' AND column_name = 'like_count'
+        ) THEN
+            ALTER TABLE users ADD COLUMN like_count INTEGER NOT NULL DEFAULT 0;
+            UPDATE users SET like_count = jsonb_array_length(liked_memes)
+            WHERE jsonb_typeof(liked_memes) = 'array';
+        END IF;
+    END
+    $$
+    ''',
+    # Users directory: newest members first, paged by (created_at, id)
+    'CREATE INDEX IF NOT EXISTS idx_users_created_id ON users (created_at DESC, id DESC)',
+    # Text recognized in image memes by ingest/ocr.py; ocr_hash is the content_hash
+    # the text was read from, so changed media is picked up again
+    '''
+    ALTER TABLE memes
+        ADD COLUMN IF NOT EXISTS ocr_text TEXT,
+        ADD COLUMN IF NOT EXISTS ocr_hash TEXT
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_memes_ocr_pending ON memes (id)
+        WHERE media_type IN ('image', 'gif') AND (ocr_hash IS NULL OR ocr_hash IS DISTINCT FROM content_hash)
+    ''',
+    # Superseded by idx_memes_text_search, which also covers ocr_text
+    'DROP INDEX IF EXISTS idx_memes_description_search',
+    # Must match MEME_SEARCH_VECTOR in services/queries.py to be used
+    '''
+    CREATE INDEX IF NOT EXISTS idx_memes_text_search
+        ON memes USING GIN (to_tsvector('simple', COALESCE(description, '') || ' ' || COALESCE(ocr_text, '')))
+    ''',
+    # Set by the thumbnails job for media it could not decode, so it is not retried
+    'ALTER TABLE memes ADD COLUMN IF NOT EXISTS thumbnail_failed BOOLEAN NOT NULL DEFAULT FALSE',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_memes_thumbnail_pending ON memes (id)
+        WHERE thumbnail IS NULL AND NOT thumbnail_failed AND media_type IN ('image', 'gif')
+    ''',
+    # Background jobs run by services/job_runner.py
+    '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id BIGSERIAL PRIMARY KEY,
+        job_type TEXT NOT NULL,
+        payload JSONB NOT NULL DEFAULT '{}',
+        priority INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 5,
+        run_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        locked_at TIMESTAMPTZ,
+        locked_by TEXT,
+        last_error TEXT,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        finished_at TIMESTAMPTZ
+    )
+    ''',
+    # Claiming only looks at queued rows, in the order they are handed out
+    '''
+    CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (job_type, priority DESC, run_at, id)
+        WHERE status = 'queued'
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs (locked_at) WHERE status = 'running'",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at) WHERE finished_at IS NOT NULL",
+]
+
+
+async def ensure_schema(pool):
+    """
+    Apply all schema statements on a single connection
+    """
+    async with pool.acquire() as conn:
+        for statement in SCHEMA_STATEMENTS:
+            await conn.execute(statement)
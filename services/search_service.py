@@ -0,0 +1,84 @@
+import re
+
+from services import queries
+
+
+SEARCH_PAGE_SIZE = 10
+MAX_SEARCH_PAGE_SIZE = 50
+# Deep pages of a ranked search are never looked at, but would still have to be sorted past
+MAX_SEARCH_PAGE = 20
+# Trigram indexes only narrow down the rows for patterns of at least three characters
+MIN_TRIGRAM_QUERY = 3
+MAX_QUERY_TERMS = 8
+
+
+def escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def build_tsquery(query: str):
+    """
+    'funny ca' -> 'funny & ca:*', so the word being typed matches as a prefix.
+    Returns None if the query has no searchable words
+    """
+    terms = re.findall(r'[^\W_]+', query.lower())[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    terms[-1] += ':*'
+    return ' & '.join(terms)
+
+
+class SearchService:
+    def __init__(self, pool):
+        self.pool = pool
+        self._has_trigram = None
+
+    async def search(self, query: str, page: int = 1, per_page: int = SEARCH_PAGE_SIZE) -> dict:
+        """
+        Ranked search over usernames and meme text (description and OCR)
+        Returns dict with one page of users and memes and whether more pages exist
+        """
+        query = (query or '').strip()
+        try:
+            page = max(1, min(int(page), MAX_SEARCH_PAGE))
+            per_page = max(1, min(int(per_page), MAX_SEARCH_PAGE_SIZE))
+        except (TypeError, ValueError):
+            return {'status': 'error', 'message': 'Invalid page'}
+
+        result = {'status': 'success', 'query': query, 'page': page,
+                  'users': [], 'memes': [], 'has_more': False}
+        if not query:
+            return result
+
+        offset = (page - 1) * per_page
+        try:
+            async with self.pool.acquire() as conn:
+                # One extra row tells whether there is a next page
+                users = await self._search_users(conn, query, per_page + 1, offset)
+                memes = await self._search_memes(conn, query, per_page + 1, offset)
+        except Exception as e:
+            print(f"Error during search: {str(e)}")
+            return {'status': 'error', 'message': str(e)}
+
+        result['users'] = [{'username': row['username']} for row in users[:per_page]]
+        result['memes'] = [{'id': row['id'], 'media_type': row['media_type']} for row in memes[:per_page]]
+        result['has_more'] = page < MAX_SEARCH_PAGE and (len(users) > per_page or len(memes) > per_page)
+        return result
+
+    async def _search_users(self, conn, query: str, limit: int, offset: int) -> list:
+        if self._has_trigram is None:
+            self._has_trigram = await queries.fetchval(conn, 'has_trigram')
+
+        if self._has_trigram and len(query) >= MIN_TRIGRAM_QUERY:
+            return await queries.fetch(conn, 'search_users_fuzzy',
+                                       f'%{escape_like(query)}%', query, limit, offset)
+
+        return await queries.fetch(conn, 'search_users_prefix',
+                                   f'{escape_like(query.lower())}%', query.lower(), limit, offset)
+
+    async def _search_memes(self, conn, query: str, limit: int, offset: int) -> list:
+        tsquery = build_tsquery(query)
+        if not tsquery:
+            return []
+
+        return await queries.fetch(conn, 'search_memes', tsquery, limit, offset)
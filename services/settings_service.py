@@ -0,0 +1,99 @@
+import copy
+import json
+
+from services import queries
+from services.ttl_cache import TTLCache
+
+
+NAVBAR_POSITIONS = {'left', 'right', 'top', 'bottom'}
+DEFAULT_NAVBAR_SETTINGS = {'pc': 'left', 'mobile': 'bottom'}
+
+# username -> ui_settings, shared by all requests of this process
+SETTINGS_CACHE_SIZE = 10000
+SETTINGS_TTL = 300.0
+_settings_cache = TTLCache(SETTINGS_CACHE_SIZE, SETTINGS_TTL)
+
+
+def parse_ui_settings(value) -> dict:
+    """
+    ui_settings as a dict, whether the driver returned a JSON string or a dict
+    """
+    if not value:
+        return {}
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+def navbar_settings_from(ui_settings: dict) -> dict:
+    """
+    Normalized navbar positions ({'pc': ..., 'mobile': ...}) from ui_settings.
+    Accepts PC/Mobile and pc/mobile keys, unknown positions fall back to the defaults.
+    """
+    navbar = ui_settings.get('navbar', {})
+    if isinstance(navbar, dict) and isinstance(navbar.get('navbar'), dict):
+        # Older saves nested the settings twice
+        navbar = navbar['navbar']
+    if not isinstance(navbar, dict):
+        navbar = {}
+
+    settings = {}
+    for device, legacy_key in (('pc', 'PC'), ('mobile', 'Mobile')):
+        position = navbar.get(device, navbar.get(legacy_key))
+        settings[device] = position if position in NAVBAR_POSITIONS else DEFAULT_NAVBAR_SETTINGS[device]
+    return settings
+
+
+class SettingsService:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def get_ui_settings(self, username: str) -> dict:
+        """
+        Get a user's ui_settings through the per-user cache. Returns a copy
+        the caller may modify
+        """
+        if not username:
+            return {}
+
+        ui_settings = _settings_cache.get(username)
+        if ui_settings is not None:
+            return copy.deepcopy(ui_settings)
+
+        try:
+            async with self.pool.acquire() as conn:
+                user = await queries.fetchrow(conn, 'user_profile', username)
+        except Exception as e:
+            print(f"Error loading ui settings: {str(e)}")
+            return {}
+
+        ui_settings = parse_ui_settings(user['ui_settings']) if user else {}
+        _settings_cache.set(username, ui_settings)
+        return copy.deepcopy(ui_settings)
+
+    async def get_navbar_settings(self, username: str) -> dict:
+        """
+        Get a user's navbar positions, the defaults for anonymous users
+        """
+        return navbar_settings_from(await self.get_ui_settings(username))
+
+    async def update_navbar_settings(self, username: str, navbar_settings: dict):
+        """
+        Store navbar settings within ui_settings and drop the cached copy
+        """
+        async with self.pool.acquire() as conn:
+            user = await queries.fetchrow(conn, 'user_profile', username)
+
+            current_ui_settings = parse_ui_settings(user['ui_settings']) if user else {}
+            current_ui_settings['navbar'] = navbar_settings
+
+            await queries.execute(conn, 'update_ui_settings', json.dumps(current_ui_settings), username)
+
+        self.invalidate(username)
+
+    @staticmethod
+    def invalidate(username: str):
+        _settings_cache.pop(username)
@@ -0,0 +1,110 @@
+import heapq
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+# Indexes are rebuilt from the database after this many seconds, so changes
+# made by other worker processes show up eventually
+INDEX_TTL = 300.0
+MAX_CACHED_USERS = 1000
+NEVER_USED = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _recency(tag: dict) -> datetime:
+    value = tag.get('last_used') or tag.get('created_at') or NEVER_USED
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class TagPrefixIndex:
+    """
+    One user's tags sorted by lowercased name, so all tags starting with a
+    prefix are a contiguous slice found with two binary searches
+    """
+
+    def __init__(self, tags: list):
+        self.tags = {}
+        self.keys = []
+        self.built_at = time.monotonic()
+        for tag in tags:
+            self.add(tag)
+
+    def add(self, tag: dict):
+        """
+        Insert a tag, replacing an existing one with the same id (rename or recolor)
+        """
+        self.remove(tag['id'])
+        tag = dict(tag)
+        self.tags[tag['id']] = tag
+        insort(self.keys, (tag['name'].lower(), tag['id']))
+
+    def remove(self, tag_id: int):
+        tag = self.tags.pop(tag_id, None)
+        if tag:
+            key = (tag['name'].lower(), tag_id)
+            self.keys.pop(bisect_left(self.keys, key))
+
+    def touch(self, tag_ids: list, when: datetime = None):
+        """
+        Mark tags as just used, like the meme_tags trigger does in the database
+        """
+        when = when or datetime.now(timezone.utc)
+        for tag_id in tag_ids:
+            if tag_id in self.tags:
+                self.tags[tag_id]['last_used'] = when
+
+    def suggest(self, prefix: str, limit: int = 10) -> list:
+        """
+        Tags whose name starts with prefix (case-insensitive), most recently used first
+        """
+        prefix = prefix.lower()
+        start = bisect_left(self.keys, (prefix,))
+        # Every key with this prefix sorts before prefix + the highest code point
+        end = bisect_left(self.keys, (prefix + '\U0010ffff',), lo=start)
+        candidates = (self.tags[tag_id] for _, tag_id in self.keys[start:end])
+        return heapq.nlargest(limit, candidates, key=_recency)
+
+    def expired(self) -> bool:
+        return time.monotonic() - self.built_at > INDEX_TTL
+
+
+class TagIndexCache:
+    """
+    Per-user prefix indexes, least recently used users are evicted first
+    """
+
+    def __init__(self, max_users: int = MAX_CACHED_USERS):
+        self.max_users = max_users
+        self._indexes = OrderedDict()
+
+    def get(self, user_id: int):
+        index = self._indexes.get(user_id)
+        if index is None or index.expired():
+            self._indexes.pop(user_id, None)
+            return None
+        self._indexes.move_to_end(user_id)
+        return index
+
+    def build(self, user_id: int, tags: list) -> TagPrefixIndex:
+        index = TagPrefixIndex(tags)
+        self._indexes[user_id] = index
+        self._indexes.move_to_end(user_id)
+        while len(self._indexes) > self.max_users:
+            self._indexes.popitem(last=False)
+        return index
+
+    def peek(self, user_id: int):
+        """
+        The user's index if it is loaded, without refreshing it (for keeping it in sync)
+        """
+        return self._indexes.get(user_id)
+
+    def invalidate(self, user_id: int):
+        self._indexes.pop(user_id, None)
+
+
+# Shared by every TagService in this process
+tag_indexes = TagIndexCache()
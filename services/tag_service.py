@@ -1,37 +1,39 @@
 import re
 import json
 from quart import session
+from services import queries
+from services.queries import TAG_SORT_ORDERS
+from services.tag_index import tag_indexes
+from services.user_context import get_current_user_id
+
+
+# Upper bound of memes x tags for one bulk request
+MAX_BULK_PAIRS = 10000
 
 
 class TagService:
     def __init__(self, pool):
         self.pool = pool
 
-    async def get_user_tags(self, username: str) -> dict:
+    async def get_user_tags(self, username: str, sort: str = 'recent') -> dict:
         """
-        Get all tags for a user
+        Get all tags for a user with the number of memes carrying each
+        sort is 'recent' (last used), 'usage' or 'name'
         """
         if 'username' not in session:
             return {'status': 'error', 'message': 'Not logged in'}
 
+        if sort not in TAG_SORT_ORDERS:
+            return {'status': 'error', 'message': 'Sort must be recent, usage or name'}
+
         try:
             async with self.pool.acquire() as conn:
-                # Get user ID
-                user = await conn.fetchrow(
-                    'SELECT id FROM users WHERE username = $1',
-                    session['username']
-                )
-
-                if not user:
+                user_id = await get_current_user_id(conn, session)
+                if not user_id:
                     return {'status': 'error', 'message': 'User not found'}
 
-                user_id = user['id']
-
                 # Get all tags for this user
-                tags = await conn.fetch(
-                    'SELECT id, name, color, created_at, last_used FROM tags WHERE user_id = $1 ORDER BY last_used DESC NULLS LAST, created_at DESC',
-                    user_id
-                )
+                tags = await queries.fetch(conn, f'user_tags_{sort}', user_id)
 
                 # Convert to list of dicts
                 tag_list = [dict(tag) for tag in tags]
@@ -59,27 +61,16 @@ class TagService:
                 return {'status': 'error', 'message': 'Invalid color format'}
 
             async with self.pool.acquire() as conn:
-                # Get user ID
-                user = await conn.fetchrow(
-                    'SELECT id FROM users WHERE username = $1',
-                    session['username']
-                )
-
-                if not user:
+                user_id = await get_current_user_id(conn, session)
+                if not user_id:
                     return {'status': 'error', 'message': 'User not found'}
 
-                user_id = user['id']
-
                 # Create the tag
-                tag = await conn.fetchrow(
-                    '''
-                    INSERT INTO tags (user_id, name, color)
-                    VALUES ($1, $2, $3)
-                    ON CONFLICT (user_id, lower(name)) DO UPDATE SET name = EXCLUDED.name, color = EXCLUDED.color
-                    RETURNING id, name, color, created_at, last_used
-                    ''',
-                    user_id, tag_name.strip(), tag_color
-                )
+                tag = await queries.fetchrow(conn, 'create_tag', user_id, tag_name.strip(), tag_color)
+
+                index = tag_indexes.peek(user_id)
+                if index:
+                    index.add(dict(tag))
 
                 return {
                     'status': 'success',
@@ -88,7 +79,8 @@ class TagService:
                         'name': tag['name'],
                         'color': tag['color'],
                         'created_at': tag['created_at'],
-                        'last_used': tag['last_used']
+                        'last_used': tag['last_used'],
+                        'usage_count': tag['usage_count']
                     }
                 }
 
@@ -105,26 +97,20 @@ class TagService:
 
         try:
             async with self.pool.acquire() as conn:
-                # Get user ID
-                user = await conn.fetchrow(
-                    'SELECT id FROM users WHERE username = $1',
-                    session['username']
-                )
-
-                if not user:
+                user_id = await get_current_user_id(conn, session)
+                if not user_id:
                     return {'status': 'error', 'message': 'User not found'}
 
-                user_id = user['id']
-
                 # Delete the tag (will also delete associated meme_tags due to CASCADE)
-                result = await conn.execute(
-                    'DELETE FROM tags WHERE id = $1 AND user_id = $2',
-                    tag_id, user_id
-                )
+                result = await queries.execute(conn, 'delete_tag', tag_id, user_id)
 
                 if result == 'DELETE 0':
                     return {'status': 'error', 'message': 'Tag not found or not owned by user'}
 
+                index = tag_indexes.peek(user_id)
+                if index:
+                    index.remove(tag_id)
+
                 return {'status': 'success', 'message': 'Tag deleted'}
 
         except Exception as e:
@@ -140,27 +126,12 @@ class TagService:
 
         try:
             async with self.pool.acquire() as conn:
-                # Get user ID
-                user = await conn.fetchrow(
-                    'SELECT id FROM users WHERE username = $1',
-                    session['username']
-                )
-
-                if not user:
+                user_id = await get_current_user_id(conn, session)
+                if not user_id:
                     return {'status': 'error', 'message': 'User not found'}
 
-                user_id = user['id']
-
                 # Get tags for this meme and user
-                tags = await conn.fetch(
-                    '''
-                    SELECT t.id, t.name, t.color
-                    FROM tags t
-                    JOIN meme_tags mt ON t.id = mt.tag_id
-                    WHERE mt.meme_id = $1 AND mt.user_id = $2 AND t.user_id = $2
-                    ''',
-                    meme_id, user_id
-                )
+                tags = await queries.fetch(conn, 'meme_tags', meme_id, user_id)
 
                 # Convert to list of dicts
                 tag_list = [dict(tag) for tag in tags]
@@ -183,22 +154,12 @@ class TagService:
                 return {'status': 'error', 'message': 'Tag IDs are required'}
 
             async with self.pool.acquire() as conn:
-                # Get user ID
-                user = await conn.fetchrow(
-                    'SELECT id FROM users WHERE username = $1',
-                    session['username']
-                )
-
-                if not user:
+                user_id = await get_current_user_id(conn, session)
+                if not user_id:
                     return {'status': 'error', 'message': 'User not found'}
 
-                user_id = user['id']
-
                 # Verify meme exists
-                meme = await conn.fetchrow(
-                    'SELECT id FROM memes WHERE id = $1',
-                    meme_id
-                )
+                meme = await queries.fetchrow(conn, 'meme_exists', meme_id)
 
                 if not meme:
                     return {'status': 'error', 'message': 'Meme not found'}
@@ -206,18 +167,16 @@ class TagService:
                 # Add tags to meme (will trigger last_used update)
                 for tag_id in tag_ids:
                     try:
-                        await conn.execute(
-                            '''
-                            INSERT INTO meme_tags (user_id, meme_id, tag_id)
-                            VALUES ($1, $2, $3)
-                            ON CONFLICT (user_id, meme_id, tag_id) DO NOTHING
-                            ''',
-                            user_id, meme_id, tag_id
-                        )
+                        # Only the user's own tags; counted only if the tag was not on the meme yet
+                        await queries.execute(conn, 'add_meme_tag', user_id, meme_id, tag_id)
                     except Exception as e:
                         print(f"Error adding tag {tag_id} to meme {meme_id}: {str(e)}")
                         # Continue with other tags even if one fails
 
+                index = tag_indexes.peek(user_id)
+                if index:
+                    index.touch(tag_ids)
+
                 return {'status': 'success', 'message': 'Tags added to meme'}
 
         except Exception as e:
@@ -233,24 +192,14 @@ class TagService:
 
         try:
             async with self.pool.acquire() as conn:
-                # Get user ID
-                user = await conn.fetchrow(
-                    'SELECT id FROM users WHERE username = $1',
-                    session['username']
-                )
-
-                if not user:
+                user_id = await get_current_user_id(conn, session)
+                if not user_id:
                     return {'status': 'error', 'message': 'User not found'}
 
-                user_id = user['id']
-
                 # Remove tag from meme (will trigger last_used update)
-                result = await conn.execute(
-                    'DELETE FROM meme_tags WHERE user_id = $1 AND meme_id = $2 AND tag_id = $3',
-                    user_id, meme_id, tag_id
-                )
+                result = await queries.execute(conn, 'remove_meme_tag', user_id, meme_id, tag_id)
 
-                if result == 'DELETE 0':
+                if result == 'UPDATE 0':
                     return {'status': 'error', 'message': 'Tag not found on meme'}
 
                 return {'status': 'success', 'message': 'Tag removed from meme'}
@@ -258,3 +207,181 @@ class TagService:
         except Exception as e:
             print(f"Error removing tag from meme: {str(e)}")
             return {'status': 'error', 'message': str(e)}
+
+    async def bulk_update_meme_tags(self, meme_ids: list, tag_ids: list, action: str = 'add') -> dict:
+        """
+        Add or remove a set of tags on a set of memes with one statement
+        Returns dict with a result per meme
+        """
+        if 'username' not in session:
+            return {'status': 'error', 'message': 'Not logged in'}
+
+        if action not in ('add', 'remove'):
+            return {'status': 'error', 'message': 'Action must be add or remove'}
+
+        try:
+            meme_ids = list(dict.fromkeys(int(meme_id) for meme_id in meme_ids or []))
+            tag_ids = list(dict.fromkeys(int(tag_id) for tag_id in tag_ids or []))
+        except (TypeError, ValueError):
+            return {'status': 'error', 'message': 'Meme and tag IDs must be integers'}
+
+        if not meme_ids or not tag_ids:
+            return {'status': 'error', 'message': 'Meme IDs and tag IDs are required'}
+
+        if len(meme_ids) * len(tag_ids) > MAX_BULK_PAIRS:
+            return {'status': 'error', 'message': f'At most {MAX_BULK_PAIRS} meme/tag pairs per request'}
+
+        try:
+            async with self.pool.acquire() as conn:
+                user_id = await get_current_user_id(conn, session)
+                if not user_id:
+                    return {'status': 'error', 'message': 'User not found'}
+
+                # Every meme x tag pair in one statement (triggers update last_used)
+                async with conn.transaction():
+                    rows = await queries.fetch(conn, f'bulk_{action}_meme_tags', user_id, meme_ids, tag_ids)
+
+            results = {
+                meme_id: {'meme_id': meme_id, 'status': 'success', 'changed': [], 'unchanged': []}
+                for meme_id in meme_ids
+            }
+            index = tag_indexes.peek(user_id)
+            if index and action == 'add':
+                index.touch(list({row['tag_id'] for row in rows if row['changed']}))
+
+            invalid_tag_ids = set()
+            for row in rows:
+                meme_id = row['meme_id']
+                if not row['meme_exists']:
+                    results[meme_id] = {'meme_id': meme_id, 'status': 'error', 'message': 'Meme not found'}
+                elif not row['tag_owned']:
+                    invalid_tag_ids.add(row['tag_id'])
+                elif row['changed']:
+                    results[meme_id]['changed'].append(row['tag_id'])
+                else:
+                    results[meme_id]['unchanged'].append(row['tag_id'])
+
+            return {
+                'status': 'success',
+                'action': action,
+                'changed': sum(len(result.get('changed', [])) for result in results.values()),
+                'invalid_tag_ids': [tag_id for tag_id in tag_ids if tag_id in invalid_tag_ids],
+                'results': list(results.values())
+            }
+
+        except Exception as e:
+            print(f"Error bulk updating meme tags: {str(e)}")
+            return {'status': 'error', 'message': str(e)}
+
+    async def get_liked_memes_by_tags(self, tag_ids: list, mode: str = 'all', before: int = None,
+                                      limit: int = 24) -> dict:
+        """
+        Get the user's liked memes having any or all of the given tags, newest meme first.
+        Paginated by meme id: pass the returned next_cursor as before for the next page.
+        Counts are only computed for the first page.
+        """
+        if 'username' not in session:
+            return {'status': 'error', 'message': 'Not logged in'}
+
+        if mode not in ('any', 'all'):
+            return {'status': 'error', 'message': 'Mode must be any or all'}
+
+        try:
+            tag_ids = list(dict.fromkeys(int(tag_id) for tag_id in tag_ids or []))
+            before = int(before) if before is not None else None
+            limit = max(1, min(int(limit), 100))
+        except (TypeError, ValueError):
+            return {'status': 'error', 'message': 'Tag IDs, cursor and limit must be integers'}
+
+        if not tag_ids:
+            return {'status': 'error', 'message': 'Tag IDs are required'}
+
+        # A meme matches once it carries this many of the requested tags
+        required = len(tag_ids) if mode == 'all' else 1
+
+        try:
+            async with self.pool.acquire() as conn:
+                user_id = await get_current_user_id(conn, session)
+                if not user_id:
+                    return {'status': 'error', 'message': 'User not found'}
+
+                if mode == 'all':
+                    rows = await queries.fetch(conn, 'liked_by_all_tags',
+                                               user_id, tag_ids, required, before, limit + 1)
+                else:
+                    rows = await queries.fetch(conn, 'liked_by_any_tag', user_id, tag_ids, before, limit + 1)
+
+                has_more = len(rows) > limit
+                rows = rows[:limit]
+                meme_ids = [row['id'] for row in rows]
+
+                # Tags of the whole page in one query
+                tags_by_meme = {meme_id: [] for meme_id in meme_ids}
+                if meme_ids:
+                    tag_rows = await queries.fetch(conn, 'memes_tags', user_id, meme_ids)
+                    for tag in tag_rows:
+                        tags_by_meme[tag['meme_id']].append(
+                            {'id': tag['id'], 'name': tag['name'], 'color': tag['color']}
+                        )
+
+                result = {
+                    'status': 'success',
+                    'memes': [
+                        {
+                            'id': row['id'],
+                            'media_type': row['media_type'],
+                            'media_url': f'/media/{row["id"]}',
+                            'tags': tags_by_meme[row['id']]
+                        }
+                        for row in rows
+                    ],
+                    'hasMore': has_more,
+                    'next_cursor': meme_ids[-1] if has_more else None
+                }
+
+                if before is None:
+                    counts = await queries.fetch(conn, 'liked_tag_counts', user_id, tag_ids)
+                    total = await queries.fetchval(conn, 'liked_by_tags_total', user_id, tag_ids, required)
+                    result['counts'] = {
+                        'total': total,
+                        'tags': {row['tag_id']: row['count'] for row in counts}
+                    }
+
+                return result
+
+        except Exception as e:
+            print(f"Error filtering liked memes by tags: {str(e)}")
+            return {'status': 'error', 'message': str(e)}
+
+    async def suggest_tags(self, prefix: str, limit: int = 10) -> dict:
+        """
+        Get the user's tags starting with prefix, most recently used first
+        """
+        if 'username' not in session:
+            return {'status': 'error', 'message': 'Not logged in'}
+
+        try:
+            limit = max(1, min(int(limit), 50))
+        except (TypeError, ValueError):
+            limit = 10
+
+        try:
+            async with self.pool.acquire() as conn:
+                user_id = await get_current_user_id(conn, session)
+                if not user_id:
+                    return {'status': 'error', 'message': 'User not found'}
+
+                index = tag_indexes.get(user_id)
+                if index is None:
+                    tags = await queries.fetch(conn, 'tag_index', user_id)
+                    index = tag_indexes.build(user_id, [dict(tag) for tag in tags])
+
+            suggestions = index.suggest((prefix or '').strip(), limit)
+            return {
+                'status': 'success',
+                'tags': [{'id': tag['id'], 'name': tag['name'], 'color': tag['color']} for tag in suggestions]
+            }
+
+        except Exception as e:
+            print(f"Error suggesting tags: {str(e)}")
+            return {'status': 'error', 'message': str(e)}
@@ -0,0 +1,65 @@
+from quart import g, has_request_context
+from services import queries
+from services.ttl_cache import TTLCache
+
+
+# username -> user id, shared by all requests of this process. A deleted
+# account is dropped right away here and after USER_ID_TTL in other processes
+USER_ID_TTL = 60.0
+USER_ID_CACHE_SIZE = 10000
+_user_ids = TTLCache(USER_ID_CACHE_SIZE, USER_ID_TTL)
+
+
+async def get_current_user_id(conn, session):
+    """
+    Resolve the logged-in user's id at most once per request, through a
+    short-lived process-wide cache in front of the users table.
+    Returns the user id, or None if not logged in or the user does not exist
+    """
+    username = session.get('username') if session else None
+    if not username:
+        return None
+
+    # Memoized for the rest of this request
+    if has_request_context():
+        cached = getattr(g, '_current_user', None)
+        if cached and cached[0] == username:
+            return cached[1]
+
+    user_id = await lookup_user_id(conn, username)
+    # Login and registration store the numeric id (anonymous visitors get a uuid
+    # string). A different one means the account was deleted, and the name may
+    # since belong to someone else
+    session_id = session.get('user_id')
+    if isinstance(session_id, int) and session_id != user_id:
+        user_id = None
+
+    if has_request_context():
+        g._current_user = (username, user_id)
+    return user_id
+
+
+async def lookup_user_id(conn, username: str):
+    """
+    Get a user's id by username through the TTL cache
+    """
+    user_id = _user_ids.get(username)
+    if user_id is not None:
+        return user_id
+
+    # Unknown users are not cached, they may register any moment
+    user = await queries.fetchrow(conn, 'user_id', username)
+    if not user:
+        return None
+
+    _user_ids.set(username, user['id'])
+    return user['id']
+
+
+def invalidate_user(username: str):
+    """
+    Drop a username from the cache, e.g. after the account was deleted
+    """
+    _user_ids.pop(username)
+    if has_request_context() and getattr(g, '_current_user', (None,))[0] == username:
+        g._current_user = None
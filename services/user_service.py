@@ -1,13 +1,29 @@
 import asyncpg
-import bcrypt
 import json
 import uuid
 from quart import session
+from datetime import datetime
+from services import queries
+from services.password_hasher import HasherBusyError, password_hasher
+
+
+PROFILE_PAGE_SIZE = 24
+MAX_PROFILE_PAGE_SIZE = 100
+USERS_PAGE_SIZE = 30
+MAX_USERS_PAGE_SIZE = 100
+
+def parse_user_cursor(cursor: str) -> tuple:
+    """
+    '<created_at isoformat>|<id>' -> (datetime, id), raises ValueError if malformed
+    """
+    created_at, _, user_id = cursor.rpartition('|')
+    return datetime.fromisoformat(created_at), int(user_id)
 
 
 class UserService:
-    def __init__(self, pool):
+    def __init__(self, pool, hasher=None):
         self.pool = pool
+        self.hasher = hasher or password_hasher
 
     async def ensure_user_id(self):
         """
@@ -20,20 +36,21 @@ class UserService:
         """
         Authenticate user with username and password
         Returns True if authentication successful, False otherwise
+        Raises HasherBusyError if too many logins are being checked already
         """
         try:
             async with self.pool.acquire() as conn:
-                user = await conn.fetchrow(
-                    'SELECT * FROM users WHERE username = $1',
-                    username
-                )
+                user = await queries.fetchrow(conn, 'user_login', username)
 
-                if user and bcrypt.checkpw(password.encode(), user['password_hash'].encode()):
-                    session['username'] = username
-                    session['user_id'] = user['id']
-                    return True
-                else:
-                    return False
+            # The connection goes back to the pool before the slow hash
+            if user and await self.hasher.check(password, user['password_hash']):
+                session['username'] = username
+                session['user_id'] = user['id']
+                return True
+            else:
+                return False
+        except HasherBusyError:
+            raise
         except Exception as e:
             print(f"Authentication error: {str(e)}")
             return False
@@ -47,14 +64,14 @@ class UserService:
             if not username or not password:
                 return False, 'Username and password are required'
 
-            hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+            try:
+                hashed_password = await self.hasher.hash(password)
+            except HasherBusyError:
+                return False, 'Too many sign-ups right now, please try again'
 
             async with self.pool.acquire() as conn:
                 try:
-                    user = await conn.fetchrow(
-                        'INSERT INTO users (username, password_hash) VALUES ($1, $2) RETURNING id',
-                        username, hashed_password
-                    )
+                    user = await queries.fetchrow(conn, 'register_user', username, hashed_password)
                     session['username'] = username
                     session['user_id'] = user['id']
                     return True, ''
@@ -67,48 +84,65 @@ class UserService:
             print(f"Registration error: {str(e)}")
             return False, 'Registration failed'
 
-    async def get_user_profile(self, username: str) -> dict:
+    async def get_user_profile(self, username: str, limit: int = PROFILE_PAGE_SIZE) -> dict:
         """
-        Get user profile information
+        Get user profile information with the first page of liked memes
         """
         try:
             async with self.pool.acquire() as conn:
-                user = await conn.fetchrow(
-                    'SELECT username, created_at, liked_memes FROM users WHERE username = $1',
-                    username
-                )
+                user = await queries.fetchrow(conn, 'user_profile', username)
 
                 if not user:
                     return None
 
-                liked_memes = []
-                if user['liked_memes']:
-                    try:
-                        liked_meme_ids = json.loads(user['liked_memes'])
-                        int_ids = [int(mid) for mid in liked_meme_ids]
-                        if int_ids:
-                            memes = await conn.fetch(
-                                'SELECT id, media_type FROM memes WHERE id = ANY($1)',
-                                int_ids
-                            )
-                            meme_map = {m['id']: m for m in memes}
-                            for mid in int_ids:
-                                if mid in meme_map:
-                                    liked_memes.append({
-                                        'id': meme_map[mid]['id'],
-                                        'media_type': meme_map[mid]['media_type']
-                                    })
-                    except json.JSONDecodeError:
-                        print("Error decoding liked_memes JSON")
+                page = await self._fetch_liked_page(conn, username, None, limit)
 
                 return {
                     'user': user,
-                    'liked_memes': liked_memes[::-1]  # Newest first
+                    'liked_memes': page['memes'],
+                    'next_cursor': page['next_cursor']
                 }
         except Exception as e:
             print(f"Error fetching user profile: {str(e)}")
             return None
 
+    async def get_liked_memes_page(self, username: str, before=None, limit: int = PROFILE_PAGE_SIZE) -> dict:
+        """
+        Get one page of a user's liked memes, newest first
+        before is the next_cursor of the previous page
+        """
+        try:
+            before = int(before) if before not in (None, '') else None
+            limit = max(1, min(int(limit), MAX_PROFILE_PAGE_SIZE))
+        except (TypeError, ValueError):
+            return {'status': 'error', 'message': 'Invalid cursor'}
+
+        try:
+            async with self.pool.acquire() as conn:
+                exists = await queries.fetchval(conn, 'user_id', username)
+                if not exists:
+                    return {'status': 'error', 'message': 'User not found'}
+
+                page = await self._fetch_liked_page(conn, username, before, limit)
+                return {'status': 'success', **page}
+        except Exception as e:
+            print(f"Error fetching liked memes page: {str(e)}")
+            return {'status': 'error', 'message': str(e)}
+
+    async def _fetch_liked_page(self, conn, username: str, before, limit: int) -> dict:
+        # The cursor is the position in liked_memes. New likes are appended, so they
+        # never shift older pages; removing an older like can at worst repeat one meme
+        rows = await queries.fetch(conn, 'liked_page', username, before, limit)
+
+        memes = [
+            {'id': row['id'], 'media_type': row['media_type']}
+            for row in rows
+            if row['id'] is not None
+        ]
+        # A full page may have more behind it, even if some of its memes were deleted
+        next_cursor = rows[-1]['position'] if len(rows) == limit and rows[-1]['position'] > 1 else None
+        return {'memes': memes, 'next_cursor': next_cursor}
+
     async def get_current_user_profile(self) -> dict:
         """
         Get current user's profile information
@@ -118,10 +152,7 @@ class UserService:
 
         try:
             async with self.pool.acquire() as conn:
-                user = await conn.fetchrow(
-                    'SELECT username, created_at, bio, ui_settings FROM users WHERE username = $1',
-                    session['username']
-                )
+                user = await queries.fetchrow(conn, 'user_profile', session['username'])
 
                 if not user:
                     return None
@@ -161,41 +192,42 @@ class UserService:
 
         try:
             async with self.pool.acquire() as conn:
-                await conn.execute(
-                    'UPDATE users SET bio = $1 WHERE username = $2',
-                    bio.strip(),
-                    session['username']
-                )
+                await queries.execute(conn, 'update_bio', bio.strip(), session['username'])
                 return True
         except Exception as e:
             print(f"Error updating bio: {str(e)}")
             return False
 
-    async def get_all_users(self) -> list:
+    async def get_users_page(self, before: str = None, limit: int = USERS_PAGE_SIZE) -> dict:
         """
-        Get all users with their like counts
+        Get one page of users, newest members first, with their cached like counts
+        before is the next_cursor of the previous page
         """
+        try:
+            cursor = parse_user_cursor(before) if before else None
+            limit = max(1, min(int(limit), MAX_USERS_PAGE_SIZE))
+        except (TypeError, ValueError):
+            return {'status': 'error', 'message': 'Invalid cursor'}
+
         try:
             async with self.pool.acquire() as conn:
-                users = await conn.fetch('''
-                    SELECT 
-                        u.username,
-                        u.created_at,
-                        CASE 
-                            WHEN u.liked_memes IS NULL THEN 0
-                            ELSE json_array_length(u.liked_memes::json)
-                        END as like_count
-                    FROM users u
-                    ORDER BY u.created_at DESC
-                ''')
-
-                # Convert to list of dicts
-                user_list = []
-                for user in users:
-                    user_dict = dict(user)
-                    user_list.append(user_dict)
-
-                return user_list
+                if cursor:
+                    rows = await queries.fetch(conn, 'users_page_after', cursor[0], cursor[1], limit)
+                else:
+                    rows = await queries.fetch(conn, 'users_page', limit)
         except Exception as e:
             print(f"Error fetching users: {str(e)}")
-            return []
+            return {'status': 'error', 'message': str(e)}
+
+        users = [
+            {
+                'username': row['username'],
+                'joined': row['created_at'].strftime('%B %Y'),
+                'like_count': row['like_count']
+            }
+            for row in rows
+        ]
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = f"{rows[-1]['created_at'].isoformat()}|{rows[-1]['id']}"
+        return {'status': 'success', 'users': users, 'next_cursor': next_cursor}
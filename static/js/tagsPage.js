@@ -6,6 +6,10 @@ const state = {
     selectedTags: new Map(),
     selectedMemes: new Set(),
     filterTagIds: new Set(),
+    filterMode: 'all',
+    tagSort: 'name',
+    filterCursors: new Map(),
+    filterVersion: 0,
     memes: [],
     hasMore: true,
     loadingCount: 0,
@@ -32,6 +36,7 @@ function initDomRefs() {
     dom.userTagsList = document.getElementById('user-tags-list');
     dom.applyTagsBtn = document.getElementById('apply-tags-btn');
     dom.unselectTagsBtn = document.getElementById('unselect-tags-btn');
+    dom.tagSortSelect = document.getElementById('tag-sort-select');
     dom.unselectMemesBtn = document.getElementById('unselect-memes-btn');
     dom.selectionSummary = document.getElementById('selection-summary');
 
@@ -39,6 +44,8 @@ function initDomRefs() {
     dom.memeTagSuggestions = document.getElementById('meme-tag-suggestions');
     dom.appliedFilters = document.getElementById('applied-filters-tags');
     dom.untaggedToggle = document.getElementById('untagged-toggle');
+    dom.filterModeToggle = document.getElementById('filter-mode-toggle');
+    dom.filterCount = document.getElementById('filter-count');
 
     dom.memesScroll = document.getElementById('liked-memes-container');
     dom.memesGrid = document.getElementById('liked-memes-grid');
@@ -61,9 +68,11 @@ function bindEvents() {
 
     dom.applyTagsBtn.addEventListener('click', applySelectedTagsToMemes);
     dom.unselectTagsBtn.addEventListener('click', clearTagSelection);
+    dom.tagSortSelect.addEventListener('change', handleTagSortChange);
     dom.unselectMemesBtn.addEventListener('click', clearMemeSelection);
 
     dom.untaggedToggle.addEventListener('change', handleUntaggedToggle);
+    dom.filterModeToggle.addEventListener('change', handleFilterModeToggle);
     dom.memesScroll.addEventListener('scroll', maybeLoadMoreMemes);
 
     dom.viewerClose.addEventListener('click', closeViewer);
@@ -91,13 +100,37 @@ function computePageForIndex(index) {
     return Math.floor(index / MEMES_PER_PAGE) + 1;
 }
 
+function buildPageUrl(pageNumber) {
+    if (!state.filterTagIds.size) {
+        return `/api/liked-memes?page=${pageNumber}&per_page=${MEMES_PER_PAGE}`;
+    }
+
+    // Filtered pages are keyset paginated: page N starts after the cursor of page N - 1
+    const tags = Array.from(state.filterTagIds).join(',');
+    let url = `/api/liked-memes/filter?tags=${tags}&mode=${state.filterMode}&limit=${MEMES_PER_PAGE}`;
+    if (pageNumber > 1) {
+        const cursor = state.filterCursors.get(pageNumber - 1);
+        if (cursor == null) {
+            return null;
+        }
+        url += `&before=${cursor}`;
+    }
+    return url;
+}
+
 async function fetchPageData(pageNumber) {
-    if (pageFetchCache.has(pageNumber)) {
-        return pageFetchCache.get(pageNumber);
+    const cacheKey = `${state.filterVersion}:${pageNumber}`;
+    if (pageFetchCache.has(cacheKey)) {
+        return pageFetchCache.get(cacheKey);
     }
 
     const promise = (async () => {
-        const response = await fetch(`/api/liked-memes?page=${pageNumber}&per_page=${MEMES_PER_PAGE}`);
+        const url = buildPageUrl(pageNumber);
+        if (!url) {
+            return { memes: [], hasMore: false };
+        }
+
+        const response = await fetch(url);
         const data = await response.json();
 
         if (data.error === 'Not authenticated') {
@@ -105,6 +138,18 @@ async function fetchPageData(pageNumber) {
             return { memes: [], hasMore: false };
         }
 
+        if (data.status === 'error' && data.message === 'Not logged in') {
+            window.location.href = '/login';
+            return { memes: [], hasMore: false };
+        }
+
+        if (data.next_cursor != null) {
+            state.filterCursors.set(pageNumber, data.next_cursor);
+        }
+        if (data.counts) {
+            renderFilterCount(data.counts.total);
+        }
+
         const processedMemes = (data.memes || []).map((meme, idx) => ({
             ...meme,
             _page: pageNumber,
@@ -114,10 +159,10 @@ async function fetchPageData(pageNumber) {
         return { memes: processedMemes, hasMore: Boolean(data.hasMore) };
     })();
 
-    pageFetchCache.set(pageNumber, promise);
+    pageFetchCache.set(cacheKey, promise);
 
     promise.finally(() => {
-        pageFetchCache.delete(pageNumber);
+        pageFetchCache.delete(cacheKey);
     });
 
     return promise;
@@ -149,7 +194,7 @@ function renderMemesGrid() {
     if (!state.memes.length) {
         const empty = document.createElement('div');
         empty.className = 'empty-state';
-        empty.textContent = 'No liked memes yet.';
+        empty.textContent = state.filterTagIds.size ? 'No liked memes match these tags.' : 'No liked memes yet.';
         dom.memesGrid.appendChild(empty);
         dom.memesScroll.scrollTop = previousScrollTop;
         return;
@@ -233,10 +278,16 @@ async function loadPage(pageNumber, { position = 'append', preferredIndex } = {}
     }
 
     beginLoading();
+    const filterVersion = state.filterVersion;
 
     try {
         const { memes, hasMore } = await fetchPageData(pageNumber);
 
+        // The filters changed while this page was loading
+        if (filterVersion !== state.filterVersion) {
+            return false;
+        }
+
         if (!memes.length) {
             if (position === 'append') {
                 state.hasMore = false;
@@ -317,6 +368,8 @@ async function ensureIndexAvailable(targetIndex) {
 }
 
 async function resetMemes() {
+    state.filterVersion += 1;
+    state.filterCursors = new Map();
     state.pageData = new Map();
     state.pageOrder = [];
     state.memes = [];
@@ -387,7 +440,7 @@ async function loadInitialData() {
 
 async function loadUserTags() {
     try {
-        const response = await fetch('/api/tags');
+        const response = await fetch(`/api/tags?sort=${state.tagSort}`);
         const data = await response.json();
 
         if (data.status === 'success') {
@@ -413,14 +466,19 @@ function renderUserTags() {
         return;
     }
 
-    state.tags
-        .sort((a, b) => a.name.localeCompare(b.name))
+    // Usage and recency order come from the server
+    const tags = state.tagSort === 'name'
+        ? state.tags.slice().sort((a, b) => a.name.localeCompare(b.name))
+        : state.tags;
+
+    tags
         .forEach((tag) => {
             const tagElement = document.createElement('div');
             tagElement.className = 'tag-item';
             tagElement.dataset.tagId = tag.id;
             tagElement.innerHTML = `
                 <span class="tag-badge" style="background:${tag.color};">${escapeHtml(tag.name)}</span>
+                <span class="tag-count" title="Memes with this tag">${tag.usage_count ?? 0}</span>
                 <button class="remove-tag-btn" type="button" aria-label="Delete tag">
                     <i data-feather="trash-2"></i>
                 </button>
@@ -442,6 +500,11 @@ function renderUserTags() {
     syncSelectedTagHighlight();
 }
 
+function handleTagSortChange(event) {
+    state.tagSort = event.target.value;
+    loadUserTags();
+}
+
 function toggleTagSelection(tag) {
     if (state.selectedTags.has(tag.id)) {
         state.selectedTags.delete(tag.id);
@@ -479,11 +542,15 @@ async function deleteTag(tagId) {
 
         if (data.status === 'success') {
             state.selectedTags.delete(Number(tagId));
-            state.filterTagIds.delete(Number(tagId));
+            const wasFiltered = state.filterTagIds.delete(Number(tagId));
             state.tags = state.tags.filter((tag) => tag.id !== Number(tagId));
             renderUserTags();
             renderAppliedFilters();
-            applyFiltersToMemes();
+            if (wasFiltered) {
+                resetMemes();
+            } else {
+                applyFiltersToMemes();
+            }
             updateApplyButtonState();
             updateSelectionSummary();
         } else if (data.status === 'error' && data.message === 'Not logged in') {
@@ -497,15 +564,42 @@ async function deleteTag(tagId) {
     }
 }
 
-function handleTagSearchInput(event) {
+const suggestRequests = new Map();
+
+async function fetchTagSuggestions(container, prefix, limit) {
+    // Only the latest request per input is rendered
+    suggestRequests.get(container)?.abort();
+    const controller = new AbortController();
+    suggestRequests.set(container, controller);
+
+    try {
+        const response = await fetch(
+            `/api/tags/suggest?prefix=${encodeURIComponent(prefix)}&limit=${limit}`,
+            { signal: controller.signal }
+        );
+        const data = await response.json();
+        return data.status === 'success' ? data.tags : [];
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            console.error('Error fetching tag suggestions:', error);
+        }
+        return null;
+    }
+}
+
+async function handleTagSearchInput(event) {
     const term = event.target.value.trim();
 
     if (!term) {
+        suggestRequests.get(dom.tagSuggestions)?.abort();
         hideSuggestions(dom.tagSuggestions);
         return;
     }
 
-    const lowerTerm = term.toLowerCase();
+    const matches = await fetchTagSuggestions(dom.tagSuggestions, term, 6);
+    if (matches === null) {
+        return;
+    }
     dom.tagSuggestions.innerHTML = '';
 
     const createOption = document.createElement('div');
@@ -514,7 +608,6 @@ function handleTagSearchInput(event) {
     createOption.addEventListener('click', () => createTag(term));
     dom.tagSuggestions.appendChild(createOption);
 
-    const matches = state.tags.filter((tag) => tag.name.toLowerCase().includes(lowerTerm)).slice(0, 6);
     matches.forEach((tag) => {
         const suggestion = document.createElement('div');
         suggestion.className = 'suggestion-item';
@@ -573,19 +666,21 @@ async function createTag(name) {
     }
 }
 
-function handleMemeFilterSearch(event) {
+async function handleMemeFilterSearch(event) {
     const term = event.target.value.trim();
     if (!term) {
+        suggestRequests.get(dom.memeTagSuggestions)?.abort();
         hideSuggestions(dom.memeTagSuggestions);
         return;
     }
 
-    const lowerTerm = term.toLowerCase();
+    const matches = await fetchTagSuggestions(dom.memeTagSuggestions, term, 8);
+    if (matches === null) {
+        return;
+    }
     dom.memeTagSuggestions.innerHTML = '';
 
-    state.tags
-        .filter((tag) => tag.name.toLowerCase().includes(lowerTerm))
-        .slice(0, 8)
+    matches
         .forEach((tag) => {
             const suggestion = document.createElement('div');
             suggestion.className = 'suggestion-item';
@@ -628,22 +723,35 @@ function addFilterTag(tag) {
     }
     state.filterTagIds.add(tag.id);
     renderAppliedFilters();
-    applyFiltersToMemes();
+    resetMemes();
 }
 
 function removeFilterTag(tagId) {
     state.filterTagIds.delete(tagId);
     renderAppliedFilters();
-    applyFiltersToMemes();
+    resetMemes();
 }
 
 function clearFilterTags() {
     state.filterTagIds.clear();
     renderAppliedFilters();
+    resetMemes();
+}
+
+function handleFilterModeToggle(event) {
+    state.filterMode = event.target.checked ? 'any' : 'all';
+    if (state.filterTagIds.size) {
+        resetMemes();
+    }
+}
+
+function renderFilterCount(total) {
+    dom.filterCount.textContent = `${total} meme${total === 1 ? '' : 's'}`;
 }
 
 function renderAppliedFilters() {
     dom.appliedFilters.innerHTML = '';
+    dom.filterCount.textContent = '';
 
     if (!state.filterTagIds.size) {
         const empty = document.createElement('div');
@@ -821,6 +929,12 @@ function updateSelectionSummary() {
     dom.selectionSummary.textContent = `${tagLabel} selected · ${memeLabel} selected`;
 }
 
+function matchesFilters(memeTagIds, filterIds) {
+    return state.filterMode === 'any'
+        ? filterIds.some((id) => memeTagIds.includes(id))
+        : filterIds.every((id) => memeTagIds.includes(id));
+}
+
 function applyFiltersToMemes() {
     const activeFilters = Array.from(state.filterTagIds).map(String);
     dom.memesGrid.querySelectorAll('.meme-item').forEach((card) => {
@@ -836,7 +950,7 @@ function applyFiltersToMemes() {
 
         if (activeFilters.length) {
             const memeTagIds = tags.map((tag) => String(tag.id));
-            visible = activeFilters.every((filterId) => memeTagIds.includes(filterId));
+            visible = matchesFilters(memeTagIds, activeFilters);
         }
 
         if (visible && state.showUntaggedOnly) {
@@ -854,37 +968,42 @@ async function applySelectedTagsToMemes() {
 
     const tagIds = Array.from(state.selectedTags.keys());
 
-    const promises = Array.from(state.selectedMemes).map(async (memeId) => {
-        try {
-            const response = await fetch(`/api/memes/${memeId}/tags`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ tag_ids: tagIds })
-            });
-            const data = await response.json();
-            if (data.status === 'success') {
-                const meme = state.memeMap.get(memeId);
-                if (meme) {
-                    meme.tags = mergeTagsForMeme(meme.tags || [], tagIds);
-                }
-            }
-            return data;
-        } catch (error) {
-            console.error(`Error tagging meme ${memeId}`, error);
-            return { status: 'error', message: error.message };
+    try {
+        const response = await fetch('/api/memes/tags/bulk', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                meme_ids: Array.from(state.selectedMemes),
+                tag_ids: tagIds,
+                action: 'add'
+            })
+        });
+        const data = await response.json();
+        if (data.status !== 'success') {
+            console.error('Error applying tags:', data.message);
+            alert('Error applying tags.');
+            return;
         }
-    });
 
-    try {
-        const results = await Promise.all(promises);
-        const allGood = results.every((result) => result.status === 'success');
+        const appliedTagIds = tagIds.filter((tagId) => !data.invalid_tag_ids.includes(tagId));
+        const failed = data.results.filter((result) => result.status !== 'success');
+        data.results.forEach((result) => {
+            const meme = state.memeMap.get(result.meme_id);
+            if (meme && result.status === 'success') {
+                meme.tags = mergeTagsForMeme(meme.tags || [], appliedTagIds);
+            }
+        });
+        refreshAllMemeTagDisplays();
+        if (data.changed) {
+            loadUserTags();
+        }
 
-        if (allGood) {
+        if (!failed.length && !data.invalid_tag_ids.length) {
             clearTagSelection();
             clearMemeSelection();
-            refreshAllMemeTagDisplays();
             alert('Tags applied successfully.');
         } else {
+            failed.forEach((result) => console.error(`Error tagging meme ${result.meme_id}`, result.message));
             alert('Some memes could not be tagged. Check console for details.');
         }
     } catch (error) {
@@ -958,7 +1077,7 @@ function getVisibleMemes() {
 
         if (activeFilters.length) {
             const memeTagIds = tags.map((tag) => tag.id);
-            return activeFilters.every((id) => memeTagIds.includes(id));
+            return matchesFilters(memeTagIds, activeFilters);
         }
 
         return true;
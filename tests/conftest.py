@@ -32,6 +32,14 @@ TEST_DB_CONFIG = {
     'port': 5433
 }
 
+@pytest.fixture(autouse=True)
+def clear_user_id_cache():
+    """Keep user ids resolved in one test from leaking into the next."""
+    from services import user_context
+    user_context._user_ids.clear()
+    yield
+    user_context._user_ids.clear()
+
 @pytest.fixture(scope="session")
 def event_loop_policy():
     """Use the default event loop policy."""
@@ -0,0 +1,66 @@
+import gzip
+import pytest
+from services.asset_service import AssetManifest, accepted_encodings, etag_matches
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / 'js').mkdir()
+    (tmp_path / 'css' / 'base').mkdir(parents=True)
+    (tmp_path / 'js' / 'main.js').write_text("import { Feed } from './feed.js';\nnew Feed();\n" * 20)
+    (tmp_path / 'js' / 'feed.js').write_text("export class Feed {}\n")
+    (tmp_path / 'css' / 'styles.css').write_text("@import url('./base/reset.css');\nbody { background: url(/static/img/bg.png); }\n")
+    (tmp_path / 'css' / 'base' / 'reset.css').write_text("* { margin: 0; }\n")
+    (tmp_path / 'loading.svg').write_text('<svg></svg>')
+    return tmp_path
+
+def test_references_rewritten_to_hashed_names(static_dir):
+    """Test that imports point at hashed files and changes cascade to importers."""
+    manifest = AssetManifest().build(str(static_dir))
+    feed = manifest.assets['js/feed.js'].hashed_path
+    main = manifest.assets['js/main.js']
+
+    assert feed.startswith('js/feed.') and feed.endswith('.js')
+    assert f"from './{feed[3:]}'".encode() in main.body
+    reset = manifest.hashed_path('css/base/reset.css')
+    assert f"url('./{reset[4:]}')".encode() in manifest.assets['css/styles.css'].body
+    # Absolute urls are left alone
+    assert b'url(/static/img/bg.png)' in manifest.assets['css/styles.css'].body
+
+    (static_dir / 'js' / 'feed.js').write_text("export class Feed { changed() {} }\n")
+    rebuilt = AssetManifest().build(str(static_dir))
+    assert rebuilt.hashed_path('js/main.js') != main.hashed_path
+
+    assert manifest.get(main.hashed_path) == (main, True)
+    assert manifest.get('js/main.js') == (main, False)
+    assert manifest.inline('loading.svg') == '<svg></svg>'
+    assert manifest.inline('missing.svg', 'Loading') == 'Loading'
+
+def test_precompressed_variant_selection(static_dir):
+    """Test that compressed variants are only served to clients accepting them."""
+    main = AssetManifest().build(str(static_dir)).assets['js/main.js']
+
+    encoding, body = main.select('gzip, deflate')
+    assert encoding == 'gzip'
+    assert gzip.decompress(body) == main.body
+    assert main.select('gzip;q=0, identity') == (None, main.body)
+    assert main.select(None) == (None, main.body)
+
+def test_accepted_encodings():
+    assert accepted_encodings('br;q=1.0, GZIP, *;q=0') == {'br', 'gzip'}
+
+def test_etag_per_encoding(static_dir):
+    """Test that compressed variants are not validated by the identity ETag."""
+    main = AssetManifest().build(str(static_dir)).assets['js/main.js']
+
+    assert main.etag_for(None) == main.etag
+    assert main.etag_for('gzip') == main.etag[:-1] + '-gz"'
+    assert main.etag_for('br') == main.etag[:-1] + '-br"'
+    assert len({main.etag_for(None), main.etag_for('gzip'), main.etag_for('br')}) == 3
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"old", W/"abc"', '"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches('"abc-gz"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches('', '"abc"')
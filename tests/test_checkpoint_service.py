@@ -0,0 +1,54 @@
+import pytest
+from services.checkpoint_service import CheckpointService
+from unittest.mock import AsyncMock, MagicMock
+
+def make_pool(row=None):
+    """Create a mock pool whose connection returns the given checkpoint row."""
+    mock_conn = AsyncMock()
+    mock_conn.fetchrow.return_value = row
+
+    mock_pool = MagicMock()
+    mock_pool.acquire.return_value.__aenter__.return_value = mock_conn
+    return mock_pool, mock_conn
+
+@pytest.mark.asyncio
+async def test_get_checkpoint_defaults():
+    """Test that an unknown channel has an empty checkpoint."""
+    pool, _ = make_pool(None)
+    checkpoints = CheckpointService(pool)
+
+    checkpoint = await checkpoints.get_checkpoint('123')
+
+    assert checkpoint['newest_message_id'] is None
+    assert checkpoint['oldest_message_id'] is None
+    assert checkpoint['backfill_complete'] is False
+
+@pytest.mark.asyncio
+async def test_get_checkpoint_existing():
+    """Test reading a stored checkpoint."""
+    pool, _ = make_pool({
+        'newest_message_id': 900,
+        'oldest_message_id': 100,
+        'backfill_complete': True
+    })
+    checkpoints = CheckpointService(pool)
+
+    checkpoint = await checkpoints.get_checkpoint('123')
+
+    assert checkpoint['newest_message_id'] == 900
+    assert checkpoint['oldest_message_id'] == 100
+    assert checkpoint['backfill_complete'] is True
+
+@pytest.mark.asyncio
+async def test_record_page_widens_range():
+    """Test that recording a page upserts the newest and oldest ids."""
+    pool, conn = make_pool()
+    checkpoints = CheckpointService(pool)
+
+    await checkpoints.record_page('123', '100', '200')
+
+    query, channel_id, newest_id, oldest_id = conn.execute.call_args[0]
+    assert 'GREATEST' in query and 'LEAST' in query
+    assert channel_id == '123'
+    assert newest_id == 200
+    assert oldest_id == 100
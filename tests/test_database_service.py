@@ -33,3 +33,82 @@ async def test_database_config():
     assert DB_CONFIG['database'] is not None
     assert DB_CONFIG['host'] is not None
     assert DB_CONFIG['port'] is not None
+
+class FakeAcquire:
+    def __init__(self, pool, timeout):
+        self.pool = pool
+        self.timeout = timeout
+
+    async def __aenter__(self):
+        await asyncio.wait_for(self.pool.slots.acquire(), self.timeout)
+        return object()
+
+    async def __aexit__(self, *exc_info):
+        self.pool.slots.release()
+
+class FakePool:
+    """A one-connection stand-in for asyncpg.Pool."""
+    def __init__(self):
+        self.slots = asyncio.Semaphore(1)
+
+    def acquire(self, timeout=None):
+        return FakeAcquire(self, timeout)
+
+    def get_size(self):
+        return 1
+
+    def get_idle_size(self):
+        return 0 if self.slots.locked() else 1
+
+    def get_min_size(self):
+        return 1
+
+    def get_max_size(self):
+        return 1
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_records_waits_and_in_use():
+    """Test acquire-wait, hold time, in-use and timeout metrics."""
+    from services.database_service import InstrumentedPool
+    pool = InstrumentedPool(FakePool())
+    in_use = []
+
+    async def hold(seconds):
+        async with pool.acquire():
+            in_use.append(pool.metrics.in_use)
+            await asyncio.sleep(seconds)
+
+    await asyncio.gather(hold(0.05), hold(0))
+    with pytest.raises(asyncio.TimeoutError):
+        async with pool.acquire():
+            async with pool.acquire(timeout=0.01):
+                pass
+
+    stats = pool.get_stats()
+    assert in_use == [1, 1]
+    assert stats['in_use'] == 0 and stats['peak_in_use'] == 1 and stats['waiting'] == 0
+    assert stats['acquired'] == 3 and stats['timeouts'] == 1
+    # The second caller waited for the first one's connection
+    assert stats['wait_p99_ms'] >= 40
+    background = stats['endpoints']['background']
+    assert background['acquired'] == 3
+    assert background['hold_max_ms'] >= 40
+
+@pytest.mark.asyncio
+async def test_create_database_pool_applies_pool_config():
+    """Test that pool settings and overrides reach asyncpg."""
+    from unittest.mock import AsyncMock, patch
+    from services.database_service import POOL_CONFIG, InstrumentedPool
+
+    async def init(conn):
+        pass
+
+    with patch('services.database_service.asyncpg.create_pool', new=AsyncMock(return_value=FakePool())) as create:
+        pool = await create_database_pool(init=init, max_size=3)
+
+    assert isinstance(pool, InstrumentedPool)
+    kwargs = create.call_args.kwargs
+    assert kwargs['max_size'] == 3
+    assert kwargs['init'] is init
+    for key in ('min_size', 'statement_cache_size', 'command_timeout', 'max_inactive_connection_lifetime'):
+        assert kwargs[key] == POOL_CONFIG[key]
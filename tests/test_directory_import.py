@@ -0,0 +1,68 @@
+import hashlib
+import pytest
+import pathlib
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from ingest.directory_import import import_directory, iter_media_files
+from ingest.pipeline import DryRunWriter
+
+MEDIA_DIR = pathlib.Path(__file__).parent / 'fixtures' / 'ingest' / 'media'
+
+@pytest.fixture
+def archive(tmp_path):
+    """Copy the fixture media into a nested archive with one duplicate."""
+    shutil.copytree(MEDIA_DIR, tmp_path / 'memes')
+    (tmp_path / 'memes' / 'old').mkdir()
+    shutil.copy(MEDIA_DIR / 'frog.png', tmp_path / 'memes' / 'old' / 'frog-copy.png')
+    (tmp_path / 'memes' / 'notes.txt').write_text('not a meme')
+    return tmp_path / 'memes'
+
+def test_iter_media_files(archive):
+    """Test that only media files are found, in a stable order."""
+    names = [pathlib.Path(path).name for path in iter_media_files(str(archive))]
+    assert names == ['cat.gif', 'clip.mp4', 'dog.png', 'frog.png', 'frog-copy.png']
+
+@pytest.mark.asyncio
+async def test_import_directory_skips_known_hashes(archive):
+    """Test that duplicates are skipped and originals stay untouched."""
+    original_clip = (archive / 'clip.mp4').read_bytes()
+    writer = DryRunWriter()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        summary = await import_directory(str(archive), writer, workers=2, executor=executor)
+
+        assert summary['files'] == 5
+        assert summary['imported'] == 4
+        assert summary['skipped_known'] == 1
+        assert summary['files_per_sec'] > 0
+        assert (archive / 'clip.mp4').read_bytes() == original_clip
+        assert all(row[0].startswith('file://') for row in writer.rows)
+
+        # A second run finds every hash already stored
+        summary = await import_directory(str(archive), writer, workers=2, executor=executor)
+        assert summary['imported'] == 0
+        assert summary['skipped_known'] == 5
+
+class StoredMemesWriter(DryRunWriter):
+    """A dry-run writer holding a meme stored before content hashes were recorded."""
+    def __init__(self, stored: bytes):
+        super().__init__()
+        self.stored = stored
+        self.rows.append(('https://cdn.discordapp.com/frog.png', '1', None, 'image', len(stored),
+                          {'content_hash': None}))
+
+    async def backfill_content_hashes(self) -> int:
+        self.rows[0][5]['content_hash'] = hashlib.sha256(self.stored).hexdigest()
+        return 1
+
+@pytest.mark.asyncio
+async def test_import_directory_skips_memes_stored_without_hash(archive):
+    """Test that memes stored before hashing are hashed first and not imported again."""
+    writer = StoredMemesWriter((MEDIA_DIR / 'frog.png').read_bytes())
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        summary = await import_directory(str(archive), writer, workers=2, executor=executor)
+
+    # frog.png and its copy are the stored meme
+    assert summary['imported'] == 3
+    assert summary['skipped_known'] == 2
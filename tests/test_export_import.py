@@ -0,0 +1,39 @@
+import pytest
+import io
+import json
+import pathlib
+from ingest.export_import import ExportFormatError, iter_export_messages, iter_export_pages
+
+EXPORT_PATH = pathlib.Path(__file__).parent.parent / 'discord_messages.json'
+
+def test_iter_export_messages_across_chunk_boundaries():
+    """Test that elements split between reads are decoded correctly."""
+    messages = [{'id': str(i), 'content': 'x' * i, 'embeds': [{'a': [1, 2]}]} for i in range(20)]
+    text = json.dumps(messages, indent=2)
+
+    parsed = list(iter_export_messages(io.StringIO(text), read_size=7))
+
+    assert parsed == messages
+
+def test_iter_export_messages_empty_and_invalid():
+    """Test empty exports and non-array documents."""
+    assert list(iter_export_messages(io.StringIO(' [ ] '))) == []
+
+    with pytest.raises(ExportFormatError):
+        list(iter_export_messages(io.StringIO('{"messages": []}')))
+
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_export_messages(io.StringIO('[{"id": "1"}, {"id": '), read_size=4))
+
+@pytest.mark.asyncio
+async def test_iter_export_pages_matches_full_load():
+    """Test that streaming the shipped export yields every message in pages."""
+    with open(EXPORT_PATH, 'r', encoding='utf-8') as f:
+        expected_ids = [message['id'] for message in json.load(f)]
+
+    ids = []
+    async for page in iter_export_pages(str(EXPORT_PATH), page_size=500):
+        assert len(page) <= 500
+        ids.extend(message['id'] for message in page)
+
+    assert ids == expected_ids
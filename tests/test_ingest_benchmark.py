@@ -0,0 +1,70 @@
+import re
+import pytest
+from benchmarks.fake_discord import FakeDiscordConfig
+from benchmarks.ingest_benchmark import BENCHMARK_TABLES, CountingPool, MemoryCheckpoints, run_benchmark
+from services.schema_service import SCHEMA_STATEMENTS
+from unittest.mock import AsyncMock, MagicMock
+
+@pytest.mark.asyncio
+async def test_dry_run_benchmark_against_fake_discord():
+    """Test a full dry run: paging, 429 retries, downloads and checkpoints."""
+    config = FakeDiscordConfig(messages_per_channel=250, media_per_message=0.5,
+                               file_size=10000, rate_limit_every=2, retry_after=0.01)
+
+    results = await run_benchmark(config, dry_run=True, cpu_workers=1)
+
+    assert results['messages'] == 250
+    assert results['media'] == 125
+    assert results['rows_written'] == 125
+    assert results['rate_limited'] > 0
+    assert results['mb_per_sec'] > 0
+
+@pytest.mark.asyncio
+async def test_memory_checkpoints_track_range():
+    """Test that dry-run checkpoints widen like the database ones."""
+    checkpoints = MemoryCheckpoints()
+    await checkpoints.record_page('1', 10, 20)
+    await checkpoints.record_page('1', 5, 15)
+    await checkpoints.mark_backfill_complete('1')
+
+    assert await checkpoints.get_checkpoint('1') == {
+        'newest_message_id': 20,
+        'oldest_message_id': 5,
+        'backfill_complete': True
+    }
+
+@pytest.mark.asyncio
+async def test_counting_pool_counts_round_trips():
+    """Test that queries and transactions are counted per round trip."""
+    conn = AsyncMock()
+    conn.transaction = MagicMock()
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = conn
+    pool.acquire.return_value.__aexit__.return_value = None
+
+    counting = CountingPool(pool)
+    async with counting.acquire() as wrapped:
+        await wrapped.fetch('SELECT 1')
+        await wrapped.execute('SELECT 1')
+        wrapped.transaction()
+
+    assert counting.round_trips == 4
+
+TABLE_REFERENCE = re.compile(
+    r'\b(?:CREATE TABLE IF NOT EXISTS|ALTER TABLE|UPDATE|FROM|JOIN|ON)\s+([\w.]+)(?=\s*(?:\(|USING|SET|GROUP|WHERE|\n|$))'
+)
+
+def test_benchmark_schema_has_every_table_ensure_schema_touches():
+    """Test that the throwaway schema never falls through to tables in public."""
+    created = set(BENCHMARK_TABLES)
+    created.update(re.findall(r'CREATE TABLE IF NOT EXISTS (\w+)', ' '.join(SCHEMA_STATEMENTS)))
+
+    referenced = set()
+    for statement in SCHEMA_STATEMENTS:
+        referenced.update(
+            name for name in TABLE_REFERENCE.findall(statement)
+            if '.' not in name and not name.startswith('pg_')
+        )
+
+    assert {'memes', 'users', 'tags', 'meme_tags', 'jobs'} <= referenced
+    assert referenced <= created
@@ -0,0 +1,108 @@
+import pytest
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from ingest.pipeline import (
+    DryRunWriter, IngestPipeline, fixture_downloader, load_fixture_pages, sync_channel
+)
+
+FIXTURE_DIR = str(pathlib.Path(__file__).parent / 'fixtures' / 'ingest')
+
+class RecordingCheckpoints:
+    """Collects the page ranges the pipeline commits."""
+    def __init__(self):
+        self.pages = []
+
+    async def record_page(self, channel_id, oldest_id, newest_id):
+        self.pages.append((channel_id, oldest_id, newest_id))
+
+@pytest.mark.asyncio
+async def test_pipeline_runs_against_fixtures():
+    """Test a full offline run of the pipeline."""
+    writer = DryRunWriter()
+    checkpoints = RecordingCheckpoints()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pipeline = IngestPipeline(
+            writer,
+            fixture_downloader(FIXTURE_DIR),
+            checkpoints=checkpoints,
+            cpu_workers=2,
+            executor=executor
+        )
+        complete = await pipeline.run('fixture', load_fixture_pages(FIXTURE_DIR, page_size=3))
+
+    assert complete is True
+    # missing.png is not in the fixture media and is stored without it for the repair worker
+    urls = sorted(row[0].split('?')[0].rsplit('/', 1)[-1] for row in writer.rows)
+    assert urls == ['cat.gif', 'clip.mp4', 'dog.png', 'dog.png', 'frog.png', 'missing.png']
+    placeholders = [row for row in writer.rows if row[4] is None]
+    assert [row[0].rsplit('/', 1)[-1] for row in placeholders] == ['missing.png']
+    assert all(row[5]['content_hash'] for row in writer.rows if row[4] is not None)
+
+    # Every page is committed, in fetch order
+    assert len(checkpoints.pages) == 3
+    newest_ids = [page[2] for page in checkpoints.pages]
+    assert newest_ids == sorted(newest_ids, reverse=True)
+
+@pytest.mark.asyncio
+async def test_pipeline_reports_stage_stats():
+    """Test that every stage reports throughput and queue depth."""
+    writer = DryRunWriter()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pipeline = IngestPipeline(writer, fixture_downloader(FIXTURE_DIR),
+                                  cpu_workers=1, executor=executor)
+        await pipeline.run('fixture', load_fixture_pages(FIXTURE_DIR))
+
+    report = {stage['stage']: stage for stage in pipeline.report()}
+    assert set(report) == {'fetch', 'extract', 'download', 'cpu', 'write', 'commit'}
+    assert report['download']['errors'] == 1
+    assert report['write']['items'] == 6
+    assert 'queue_depth' in report['cpu']
+
+class FakeChannel:
+    """Discord client returning one page for forward reads of a channel."""
+    def __init__(self, messages):
+        self.messages = messages
+        self.calls = []
+
+    def iter_message_pages(self, channel_id, before=None, after=None):
+        self.calls.append({'before': before, 'after': after})
+
+        async def pages():
+            if after is not None and self.messages:
+                yield self.messages
+        return pages()
+
+class StoredCheckpoints(RecordingCheckpoints):
+    def __init__(self, checkpoint):
+        super().__init__()
+        self.checkpoint = checkpoint
+
+    async def get_checkpoint(self, channel_id):
+        return self.checkpoint
+
+@pytest.mark.asyncio
+async def test_channel_empty_at_backfill_is_read_forward_from_start():
+    """Test that a channel with a complete backfill but no newest id is not skipped."""
+    messages = [{
+        'id': '1100000000000002000',
+        'timestamp': '2024-03-05T12:00:00.000000+00:00',
+        'author': {'id': '20000000000000000'},
+        'attachments': [{'url': 'https://cdn.discordapp.com/attachments/1/frog.png'}],
+        'embeds': []
+    }]
+    client = FakeChannel(messages)
+    checkpoints = StoredCheckpoints({
+        'newest_message_id': None, 'oldest_message_id': None, 'backfill_complete': True
+    })
+    writer = DryRunWriter()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pipeline = IngestPipeline(writer, fixture_downloader(FIXTURE_DIR), checkpoints=checkpoints,
+                                  cpu_workers=1, executor=executor)
+        await sync_channel('empty', client, pipeline, checkpoints)
+
+    assert client.calls == [{'before': None, 'after': 0}]
+    assert [row[0] for row in writer.rows] == ['https://cdn.discordapp.com/attachments/1/frog.png']
+    assert checkpoints.pages == [('empty', 1100000000000002000, 1100000000000002000)]
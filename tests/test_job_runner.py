@@ -0,0 +1,172 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from services.job_runner import JobRunner
+from services.job_service import JobService
+
+class FakeJobs:
+    """In-memory stand-in for JobService."""
+    def __init__(self, jobs):
+        self.queued = list(jobs)
+        self.done = []
+        self.failures = []
+        self.released = []
+
+    async def enqueue_unless_pending(self, job_type, payload=None, priority=0):
+        if any(j['job_type'] == job_type for j in self.queued):
+            return None
+        job = make_job(100 + len(self.done) + len(self.queued), job_type)
+        job['payload'] = payload or {}
+        self.queued.append(job)
+        return job['id']
+
+    async def claim(self, job_type, worker_id, limit=1):
+        claimed = [j for j in self.queued if j['job_type'] == job_type][:limit]
+        for job in claimed:
+            self.queued.remove(job)
+            job['attempts'] += 1
+        return claimed
+
+    async def complete(self, job_id):
+        self.done.append(job_id)
+
+    async def fail(self, job_id, error, retry_in):
+        self.failures.append((job_id, error, retry_in))
+
+    async def release(self, job_id):
+        self.released.append(job_id)
+
+    async def requeue_stale(self, timeout):
+        return 0
+
+    async def purge_finished(self, older_than):
+        return 0
+
+def make_job(job_id, job_type='work', attempts=0):
+    return {'id': job_id, 'job_type': job_type, 'payload': {'n': job_id}, 'attempts': attempts, 'max_attempts': 5}
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+@pytest.mark.asyncio
+async def test_runner_respects_per_type_concurrency():
+    """Test that no more than the limit of one job type runs at once."""
+    jobs = FakeJobs([make_job(i) for i in range(1, 7)])
+    runner = JobRunner(jobs, poll_interval=0.05)
+    peak = 0
+
+    async def handler(payload):
+        nonlocal peak
+        peak = max(peak, runner.running['work'])
+        await asyncio.sleep(0.02)
+
+    runner.register('work', handler, concurrency=2)
+    await runner.start()
+    try:
+        await wait_for(lambda: len(jobs.done) == 6)
+    finally:
+        await runner.stop()
+
+    assert peak == 2
+    assert runner.get_status()['work'] == {'running': 0, 'concurrency': 2, 'completed': 6, 'failed': 0}
+
+@pytest.mark.asyncio
+async def test_failed_jobs_back_off_and_interrupted_jobs_are_released():
+    """Test retry delays for failures and release of jobs running at shutdown."""
+    jobs = FakeJobs([make_job(1, 'flaky', attempts=2), make_job(2, 'slow')])
+    runner = JobRunner(jobs, poll_interval=0.05, base_delay=10, max_delay=3600)
+    started = asyncio.Event()
+
+    async def flaky(payload):
+        raise RuntimeError('boom')
+
+    async def slow(payload):
+        started.set()
+        await asyncio.sleep(10)
+
+    runner.register('flaky', flaky)
+    runner.register('slow', slow)
+    await runner.start()
+    await wait_for(lambda: jobs.failures and started.is_set())
+    await runner.stop(timeout=0.05)
+
+    # Third attempt: 10 * 2 ** 2 seconds
+    assert jobs.failures == [(1, 'boom', 40)]
+    assert jobs.released == [2]
+    assert jobs.done == []
+
+@pytest.mark.asyncio
+async def test_scheduled_jobs_are_enqueued_and_stop_returns_while_idle():
+    """Test periodic enqueueing, and that stop() does not wait for a parked poller."""
+    jobs = FakeJobs([])
+    runner = JobRunner(jobs, poll_interval=30)
+    payloads = []
+
+    async def handler(payload):
+        payloads.append(payload)
+
+    runner.register('rebuild', handler)
+    runner.schedule('rebuild', 3600, {'full': True})
+    await runner.start()
+    try:
+        await wait_for(lambda: payloads)
+    finally:
+        started = asyncio.get_running_loop().time()
+        await runner.stop()
+
+    assert asyncio.get_running_loop().time() - started < 1
+    assert payloads == [{'full': True}]
+    assert len(jobs.done) == 1
+
+@pytest.mark.asyncio
+async def test_claim_skips_locked_rows_and_decodes_payload():
+    """Test the claim statement and payload decoding."""
+    conn = AsyncMock()
+    conn.fetch.return_value = [
+        {'id': 1, 'job_type': 'work', 'payload': '{"user_id": 7}', 'attempts': 1, 'max_attempts': 5}
+    ]
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = conn
+
+    claimed = await JobService(pool).claim('work', 'host:1', 3)
+
+    assert claimed[0]['payload'] == {'user_id': 7}
+    query = conn.fetch.call_args.args[0]
+    assert 'FOR UPDATE SKIP LOCKED' in query
+    assert 'ORDER BY priority DESC' in query
+    assert conn.fetch.call_args.args[1:] == ('work', 'host:1', 3)
+
+@pytest.mark.asyncio
+async def test_thumbnail_job_marks_undecodable_media(monkeypatch):
+    """Test that media without a thumbnail is marked failed instead of being decoded every run."""
+    from concurrent.futures import ThreadPoolExecutor
+    from services import job_handlers
+
+    monkeypatch.setattr(job_handlers, 'thumbnails_available', lambda: True)
+    monkeypatch.setattr(job_handlers, 'ocr_available', lambda: False)
+    monkeypatch.setattr(job_handlers, 'make_thumbnail',
+                        lambda f: b'thumb' if f.read().startswith(b'GIF') else None)
+
+    conn = AsyncMock()
+    conn.fetch.return_value = [{'id': 1}, {'id': 2}]
+    conn.fetchval.side_effect = [b'GIF89a', b'broken']
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = conn
+
+    runner = JobRunner(FakeJobs([]))
+    runner._executor = ThreadPoolExecutor(max_workers=1)
+    job_handlers.register_default_jobs(runner, pool)
+    await runner.handlers['thumbnails'][0]({})
+    await runner.stop()
+
+    assert 'NOT thumbnail_failed' in conn.fetch.call_args.args[0]
+    updates = [call.args for call in conn.execute.call_args_list]
+    assert updates == [
+        ('UPDATE memes SET thumbnail = $2 WHERE id = $1', 1, b'thumb'),
+        ('UPDATE memes SET thumbnail_failed = TRUE WHERE id = $1', 2)
+    ]
+    # The runner's process pool is shut down with it
+    assert runner._executor is None
@@ -0,0 +1,81 @@
+import pathlib
+import struct
+import pytest
+from ingest.media_processing import detect_content_type, faststart_file, probe_dimensions, process_media
+
+MEDIA_DIR = pathlib.Path(__file__).parent / 'fixtures' / 'ingest' / 'media'
+
+def read_fixture(name):
+    return (MEDIA_DIR / name).read_bytes()
+
+@pytest.fixture
+def clip(tmp_path):
+    """A copy of the fixture MP4, which has its moov box after mdat."""
+    path = tmp_path / 'clip.mp4'
+    path.write_bytes(read_fixture('clip.mp4'))
+    return path
+
+def top_level_boxes(data):
+    """Return the top-level MP4 box types in file order."""
+    boxes = []
+    pos = 0
+    while pos + 8 <= len(data):
+        size, box_type = struct.unpack('>I4s', data[pos:pos + 8])
+        boxes.append(box_type)
+        pos += size
+    return boxes
+
+def test_detect_content_type():
+    """Test content type detection from magic bytes."""
+    assert detect_content_type(read_fixture('frog.png')) == 'image/png'
+    assert detect_content_type(read_fixture('cat.gif')) == 'image/gif'
+    assert detect_content_type(read_fixture('clip.mp4')) == 'video/mp4'
+    assert detect_content_type(b'not media') == 'application/octet-stream'
+
+def test_probe_dimensions():
+    """Test reading image sizes from headers."""
+    assert tuple(probe_dimensions(read_fixture('frog.png'), 'image/png')) == (4, 3)
+    assert tuple(probe_dimensions(read_fixture('cat.gif'), 'image/gif')) == (3, 2)
+    assert probe_dimensions(b'', 'image/jpeg') == (None, None)
+
+def test_faststart_moves_moov_and_keeps_offsets(clip, tmp_path):
+    """Test that moov is moved before mdat and chunk offsets still hit the payload."""
+    data = clip.read_bytes()
+    assert top_level_boxes(data) == [b'ftyp', b'mdat', b'moov']
+    target = tmp_path / 'out.mp4'
+
+    assert faststart_file(str(clip), str(target)) is True
+
+    rewritten = target.read_bytes()
+    assert len(rewritten) == len(data)
+    assert top_level_boxes(rewritten) == [b'ftyp', b'moov', b'mdat']
+    stco = rewritten.index(b'stco')
+    offset = struct.unpack('>I', rewritten[stco + 12:stco + 16])[0]
+    assert rewritten[offset:offset + 13] == b'MEDIA-PAYLOAD'
+
+def test_faststart_leaves_other_files_alone(clip, tmp_path):
+    """Test that nothing is written for non-MP4 and already faststart files."""
+    target = tmp_path / 'out.mp4'
+    assert faststart_file(str(MEDIA_DIR / 'frog.png'), str(target)) is False
+    assert not target.exists()
+
+    assert faststart_file(str(clip), str(target)) is True
+    assert faststart_file(str(target), str(tmp_path / 'again.mp4')) is False
+    assert not (tmp_path / 'again.mp4').exists()
+
+def test_process_media():
+    """Test the combined CPU stage result."""
+    info = process_media('image', str(MEDIA_DIR / 'frog.png'))
+
+    assert info['content_type'] == 'image/png'
+    assert len(info['content_hash']) == 64
+    assert info['file_size'] == len(read_fixture('frog.png'))
+    assert (info['width'], info['height']) == (4, 3)
+
+def test_process_media_rewrites_mp4_in_place(clip):
+    """Test that MP4 files are made faststart on disk and re-hashed."""
+    info = process_media('video', str(clip), content_hash='stale')
+
+    assert top_level_boxes(clip.read_bytes()) == [b'ftyp', b'moov', b'mdat']
+    assert info['content_hash'] != 'stale'
+    assert info['file_size'] == len(read_fixture('clip.mp4'))
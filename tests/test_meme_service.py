@@ -0,0 +1,52 @@
+import pytest
+from services import user_context
+from unittest.mock import AsyncMock, MagicMock, patch
+from services.meme_service import MAX_HYDRATE_IDS, MemeService
+
+def make_service(conn):
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = conn
+    return MemeService(pool)
+
+@pytest.mark.asyncio
+async def test_hydrate_memes_uses_fixed_number_of_queries():
+    """Test that many memes are hydrated with two queries, in request order."""
+    conn = AsyncMock()
+    conn.fetch.side_effect = [
+        [
+            {'id': 3, 'media_type': 'video', 'like_count': 0, 'liked': False},
+            {'id': 1, 'media_type': 'image', 'like_count': 4, 'liked': True},
+        ],
+        [{'meme_id': 1, 'id': 10, 'name': 'cats', 'color': '#fff'}],
+    ]
+    service = make_service(conn)
+
+    # The id was resolved by an earlier request
+    user_context._user_ids.set('test_user', 5)
+    with patch('services.meme_service.session', {'username': 'test_user', 'user_id': 5}):
+        result = await service.hydrate_memes(['1', '2', '3', '1'])
+
+    assert conn.fetch.await_count == 2
+    assert conn.fetch.call_args_list[0].args[1:] == ([1, 2, 3], 5)
+    assert result['missing'] == [2]
+    assert result['memes'] == [
+        {'id': 1, 'media_type': 'image', 'media_url': '/media/1', 'liked': True, 'like_count': 4,
+         'tags': [{'id': 10, 'name': 'cats', 'color': '#fff'}]},
+        {'id': 3, 'media_type': 'video', 'media_url': '/media/3', 'liked': False, 'like_count': 0, 'tags': []},
+    ]
+
+@pytest.mark.asyncio
+async def test_hydrate_memes_anonymous_and_validation():
+    """Test anonymous requests skip the tag query, and bad input is rejected."""
+    conn = AsyncMock()
+    conn.fetch.return_value = [{'id': 1, 'media_type': 'image', 'like_count': 2, 'liked': False}]
+    service = make_service(conn)
+
+    with patch('services.meme_service.session', {'user_id': 'anonymous-uuid'}):
+        result = await service.hydrate_memes([1])
+        assert (await service.hydrate_memes([]))['status'] == 'error'
+        assert (await service.hydrate_memes(['abc']))['status'] == 'error'
+        assert (await service.hydrate_memes(range(MAX_HYDRATE_IDS + 1)))['status'] == 'error'
+
+    assert conn.fetch.await_count == 1
+    assert result['memes'][0]['tags'] == []
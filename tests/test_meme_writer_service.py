@@ -0,0 +1,132 @@
+import pytest
+from datetime import datetime
+from services.meme_writer_service import MemeWriterService
+from unittest.mock import AsyncMock, MagicMock
+
+def make_pool(existing_urls=()):
+    """Create a mock pool that reports the given urls as already stored."""
+    mock_conn = MagicMock()
+    mock_conn.fetch = AsyncMock(return_value=[{'url': url} for url in existing_urls])
+    mock_conn.copy_records_to_table = AsyncMock()
+    mock_conn.execute = AsyncMock()
+
+    mock_pool = MagicMock()
+    mock_pool.acquire.return_value.__aenter__.return_value = mock_conn
+    return mock_pool, mock_conn
+
+@pytest.mark.asyncio
+async def test_filter_new_urls_single_query():
+    """Test that existence is checked for the whole list at once."""
+    pool, conn = make_pool(existing_urls=['https://cdn.discordapp.com/a.png'])
+    writer = MemeWriterService(pool)
+
+    new_urls = await writer.filter_new_urls([
+        'https://cdn.discordapp.com/a.png',
+        'https://cdn.discordapp.com/b.png',
+        'https://cdn.discordapp.com/b.png'
+    ])
+
+    assert new_urls == ['https://cdn.discordapp.com/b.png']
+    assert conn.fetch.await_count == 1
+    assert 'ANY($1)' in conn.fetch.call_args[0][0]
+
+@pytest.mark.asyncio
+async def test_add_flushes_when_batch_full():
+    """Test that rows are copied once the batch size is reached."""
+    pool, conn = make_pool()
+    writer = MemeWriterService(pool, batch_size=2, flush_interval=60)
+
+    await writer.add('https://cdn.discordapp.com/a.png', '1', datetime(2024, 1, 1), 'image', b'a')
+    assert conn.copy_records_to_table.await_count == 0
+
+    await writer.add('https://cdn.discordapp.com/b.png', '1', datetime(2024, 1, 1), 'image', b'b')
+    assert conn.copy_records_to_table.await_count == 1
+    assert len(conn.copy_records_to_table.call_args.kwargs['records']) == 2
+    assert writer.rows_written == 2
+
+@pytest.mark.asyncio
+async def test_flush_skips_rows_stored_meanwhile():
+    """Test that rows inserted by someone else are not copied again."""
+    pool, conn = make_pool(existing_urls=['https://cdn.discordapp.com/a.png'])
+    writer = MemeWriterService(pool, batch_size=10, flush_interval=60)
+
+    await writer.add('https://cdn.discordapp.com/a.png', '1', datetime(2024, 1, 1), 'image', b'a')
+    await writer.add('https://cdn.discordapp.com/b.png', '1', datetime(2024, 1, 1), 'image', b'b')
+    inserted = await writer.flush()
+
+    assert inserted == 1
+    records = conn.copy_records_to_table.call_args.kwargs['records']
+    assert [record[0] for record in records] == ['https://cdn.discordapp.com/b.png']
+
+@pytest.mark.asyncio
+async def test_binary_copy_streams_spooled_files(tmp_path):
+    """Test that spooled files are streamed into a valid binary COPY payload."""
+    import struct
+    from ingest.spool import spool_chunks
+    from services.meme_writer_service import COPY_HEADER, COPY_TRAILER
+
+    async def chunks():
+        yield b'spooled-bytes'
+
+    spooled = await spool_chunks(chunks(), spool_dir=str(tmp_path))
+    writer = MemeWriterService(MagicMock())
+    column_types = {
+        'url': 'text', 'author_id': 'text', 'timestamp': 'timestamp',
+        'media_type': 'text', 'file_data': 'bytea', 'content_hash': 'text',
+        'file_size': 'int8', 'width': 'int4', 'height': 'int4', 'thumbnail': 'bytea'
+    }
+    record = ('u', 'a', datetime(2000, 1, 1, 0, 0, 1), 'image', spooled,
+              'h', 13, None, None, None)
+
+    payload = b''.join([part async for part in writer._binary_copy_stream([record], column_types)])
+
+    assert payload.startswith(COPY_HEADER)
+    assert payload.endswith(COPY_TRAILER)
+    pos = len(COPY_HEADER)
+    assert struct.unpack('>h', payload[pos:pos + 2])[0] == 10
+    pos += 2
+    fields = []
+    for _ in range(10):
+        length = struct.unpack('>i', payload[pos:pos + 4])[0]
+        pos += 4
+        if length == -1:
+            fields.append(None)
+        else:
+            fields.append(payload[pos:pos + length])
+            pos += length
+    assert fields[0] == b'u'
+    assert struct.unpack('>q', fields[2])[0] == 1000000
+    assert fields[4] == b'spooled-bytes'
+    assert struct.unpack('>q', fields[6])[0] == 13
+    assert fields[7:] == [None, None, None]
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_rows_pending():
+    """Test that a failed COPY raises and leaves the batch for the next flush."""
+    pool, conn = make_pool()
+    conn.copy_records_to_table.side_effect = [ConnectionError('connection lost'), None]
+    writer = MemeWriterService(pool, batch_size=10, flush_interval=60)
+
+    await writer.add('https://cdn.discordapp.com/a.png', '1', datetime(2024, 1, 1), 'image', b'a')
+    with pytest.raises(ConnectionError):
+        await writer.flush()
+
+    assert [record[0] for record in writer.pending] == ['https://cdn.discordapp.com/a.png']
+    assert await writer.filter_new_urls(['https://cdn.discordapp.com/a.png']) == []
+    assert await writer.flush() == 1
+    assert writer.pending == []
+    # Flushes of concurrent runs are serialized
+    assert 'pg_advisory_xact_lock' in conn.execute.call_args.args[0]
+
+@pytest.mark.asyncio
+async def test_backfill_content_hashes_runs_in_batches():
+    """Test that rows without a hash are hashed batch by batch until none are left."""
+    pool, conn = make_pool()
+    conn.execute.side_effect = ['UPDATE 2', 'UPDATE 2', 'UPDATE 1']
+    writer = MemeWriterService(pool)
+
+    assert await writer.backfill_content_hashes(batch_size=2) == 5
+    assert conn.execute.await_count == 3
+    query = conn.execute.call_args.args[0]
+    assert "encode(sha256(file_data), 'hex')" in query and 'content_hash IS NULL' in query
+    assert conn.execute.call_args.args[1] == 2
@@ -0,0 +1,66 @@
+import hashlib
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock
+from ingest.ocr import OcrJob
+from services.ocr_service import OcrService
+
+class FakeOcr:
+    """In-memory stand-in for OcrService."""
+    def __init__(self, memes):
+        self.memes = memes
+        self.stored = []
+
+    async def get_pending(self, after_id=0, limit=32):
+        return [m for m in self.memes if m['id'] > after_id][:limit]
+
+    async def store_results(self, results):
+        self.stored.extend(results)
+        return len(results)
+
+def fake_extract(data, lang):
+    if data == b'broken':
+        raise RuntimeError('worker died')
+    text = '' if data == b'blank' else f'{lang}: {data.decode()}'
+    return {'text': text, 'content_hash': hashlib.sha256(data).hexdigest()}
+
+@pytest.mark.asyncio
+async def test_ocr_job_reads_and_stores_in_batches():
+    """Test one pass with text, blank and failing images."""
+    ocr = FakeOcr([
+        {'id': i, 'media_type': 'image', 'file_data': data}
+        for i, data in enumerate([b'hello', b'blank', b'broken', b'world', b'again'], start=1)
+    ])
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        job = OcrJob(ocr, extract=fake_extract, lang='deu', workers=2, batch_size=2, executor=executor)
+        summary = await job.run_once()
+
+    assert summary['pages'] == 4
+    assert summary['with_text'] == 3
+    assert summary['failed'] == 1
+    assert summary['pages_per_sec'] > 0
+
+    stored = {r['id']: r for r in ocr.stored}
+    assert sorted(stored) == [1, 2, 4, 5]
+    assert stored[1]['text'] == 'deu: hello'
+    assert stored[2]['text'] == ''
+    assert stored[4]['content_hash'] == hashlib.sha256(b'world').hexdigest()
+
+@pytest.mark.asyncio
+async def test_store_results_uses_one_statement():
+    """Test that a batch of results is written with a single unnest update."""
+    conn = AsyncMock()
+    conn.execute.return_value = 'UPDATE 2'
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = conn
+
+    updated = await OcrService(pool).store_results([
+        {'id': 1, 'text': 'hello', 'content_hash': 'a'},
+        {'id': 2, 'text': '', 'content_hash': 'b'}
+    ])
+
+    assert updated == 2
+    assert conn.execute.await_count == 1
+    assert conn.execute.call_args.args[1:] == ([1, 2], ['hello', ''], ['a', 'b'])
+    assert await OcrService(pool).store_results([]) == 0
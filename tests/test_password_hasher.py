@@ -0,0 +1,57 @@
+import asyncio
+import time
+import bcrypt
+import pytest
+from unittest.mock import patch
+from benchmarks.login_storm import run_storm
+from services.password_hasher import HasherBusyError, PasswordHasher
+from services.user_service import UserService
+
+@pytest.mark.asyncio
+async def test_hash_and_check_run_in_executor():
+    """Test that hashes made by the hasher verify and wrong passwords fail."""
+    hasher = PasswordHasher(workers=1, queue_limit=1)
+    try:
+        stored = bcrypt.hashpw(b'secret', bcrypt.gensalt(4)).decode()
+        assert await hasher.check('secret', stored) is True
+        assert await hasher.check('wrong', stored) is False
+        assert bcrypt.checkpw(b'new', (await hasher.hash('new')).encode())
+        assert hasher.pending == 0
+    finally:
+        hasher.shutdown()
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_instead_of_waiting():
+    """Test that work beyond workers + queue limit is turned away."""
+    hasher = PasswordHasher(workers=1, queue_limit=1)
+    try:
+        running = [asyncio.create_task(hasher._run(time.sleep, 0.2)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(HasherBusyError):
+            await hasher.check('secret', 'hash')
+        assert hasher.rejected == 1
+        await asyncio.gather(*running)
+    finally:
+        hasher.shutdown()
+
+@pytest.mark.asyncio
+async def test_busy_hasher_fails_registration_politely():
+    """Test that registration reports a busy hasher as a retryable error."""
+    class BusyHasher:
+        async def hash(self, password):
+            raise HasherBusyError()
+
+    with patch('services.user_service.session', {}):
+        success, error = await UserService(None, hasher=BusyHasher()).register_user('alice', 'pw')
+    assert success is False
+    assert 'try again' in error
+
+@pytest.mark.asyncio
+async def test_login_storm_benchmark_runs():
+    """Test a tiny login storm against the in-memory app."""
+    results = await run_storm('executor', logins=4, concurrency=2, rounds=4,
+                              probe_interval=0.005, baseline_seconds=0.05)
+    assert results['logins_per_sec'] > 0
+    assert results['rejected'] == 0 and results['failed'] == 0
+    assert results['feed_idle']['count'] > 0
@@ -0,0 +1,115 @@
+import asyncpg
+import pytest
+from unittest.mock import AsyncMock
+from services import queries
+from services.queries import QUERIES, TAG_SORT_ORDERS, prepare_statements, warm_up
+
+class FakeStatement:
+    def __init__(self, query):
+        self.query = query
+        self.calls = []
+        self.invalid = False
+
+    async def fetchrow(self, *args):
+        if self.invalid:
+            raise asyncpg.InvalidCachedStatementError('cached statement plan is invalid')
+        self.calls.append(args)
+        return {'id': 7}
+
+    async def fetch(self, *args):
+        self.calls.append(args)
+        return []
+
+    def get_statusmsg(self):
+        return 'UPDATE 1'
+
+class FakeConnection:
+    """A connection that records prepared statements and plain queries."""
+    def __init__(self):
+        self.prepared = {}
+        self.fetchrow = AsyncMock(return_value={'id': 8})
+
+    async def prepare(self, query):
+        self.prepared[query] = FakeStatement(query)
+        return self.prepared[query]
+
+class FakeAcquire:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        self.conn = self.pool.idle.pop()
+        return self.conn
+
+    async def __aexit__(self, *exc_info):
+        self.pool.idle.append(self.conn)
+
+class FakePool:
+    def __init__(self, size):
+        self.idle = [FakeConnection() for _ in range(size)]
+        self.connections = list(self.idle)
+
+    def get_idle_size(self):
+        return len(self.idle)
+
+    def acquire(self):
+        return FakeAcquire(self)
+
+@pytest.mark.asyncio
+async def test_prepared_statements_are_used_by_name():
+    """Test that a prepared connection runs the statement, others the query text."""
+    conn, plain = FakeConnection(), FakeConnection()
+    await prepare_statements(conn)
+
+    assert set(conn.prepared) == set(QUERIES.values())
+    assert await queries.fetchrow(conn, 'user_id', 'alice') == {'id': 7}
+    assert conn.prepared[QUERIES['user_id']].calls == [('alice',)]
+    assert await queries.execute(conn, 'update_bio', 'hi', 'alice') == 'UPDATE 1'
+
+    assert await queries.fetchrow(plain, 'user_id', 'alice') == {'id': 8}
+    plain.fetchrow.assert_awaited_once_with(QUERIES['user_id'], 'alice')
+
+@pytest.mark.asyncio
+async def test_invalidated_statement_falls_back_to_query_text():
+    """Test that a statement invalidated by a schema change is dropped."""
+    conn = FakeConnection()
+    await prepare_statements(conn)
+    conn.prepared[QUERIES['user_id']].invalid = True
+
+    assert await queries.fetchrow(conn, 'user_id', 'alice') == {'id': 8}
+    assert queries._statement(conn, 'user_id') is None
+
+@pytest.mark.asyncio
+async def test_warm_up_prepares_every_idle_connection():
+    """Test that warm-up holds the idle connections at once instead of reusing one."""
+    pool = FakePool(3)
+
+    await warm_up(pool)
+
+    assert all(set(conn.prepared) == set(QUERIES.values()) for conn in pool.connections)
+    assert pool.get_idle_size() == 3
+
+@pytest.mark.asyncio
+async def test_statements_needing_missing_extensions_are_skipped(capsys):
+    """Test that the pg_trgm search is left unprepared, quietly, without the extension."""
+    conn = FakeConnection()
+    prepare = conn.prepare
+
+    async def prepare_without_trgm(query):
+        if 'similarity(' in query:
+            raise asyncpg.UndefinedFunctionError('function similarity(text, text) does not exist')
+        return await prepare(query)
+
+    conn.prepare = prepare_without_trgm
+    await prepare_statements(conn)
+
+    assert queries._statement(conn, 'search_users_fuzzy') is None
+    assert queries._statement(conn, 'search_users_prefix') is not None
+    assert capsys.readouterr().out == ''
+
+def test_names_built_by_callers_are_registered():
+    """Test the statement names services derive from their arguments."""
+    for sort in TAG_SORT_ORDERS:
+        assert f'user_tags_{sort}' in QUERIES
+    for action in ('add', 'remove'):
+        assert f'bulk_{action}_meme_tags' in QUERIES
@@ -0,0 +1,141 @@
+import pytest
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock
+from ingest.discord_client import MediaDownloadError
+from ingest.repair import RepairWorker, retry_delay
+from ingest.spool import iter_file_chunks, spool_chunks
+from services.repair_service import RepairService
+
+MEDIA_DIR = pathlib.Path(__file__).parent / 'fixtures' / 'ingest' / 'media'
+
+class FakeRepairs:
+    """In-memory stand-in for RepairService."""
+    def __init__(self, memes):
+        self.memes = memes
+        self.stored = {}
+        self.failures = {}
+
+    async def get_due(self, after_id=0, limit=100):
+        return [m for m in self.memes if m['id'] > after_id][:limit]
+
+    async def store_media(self, meme_id, file_data, info):
+        self.stored[meme_id] = (file_data.read(), info)
+        return True
+
+    async def record_failure(self, meme_id, error, retry_in):
+        self.failures[meme_id] = (error, retry_in)
+
+def test_retry_delay_backs_off_exponentially():
+    """Test that delays double per failure up to the cap."""
+    assert retry_delay(0, base_delay=10) == 10
+    assert retry_delay(3, base_delay=10) == 80
+    assert retry_delay(20, base_delay=10, max_delay=3600) == 3600
+
+@pytest.mark.asyncio
+async def test_repair_worker_stores_and_records_failures():
+    """Test one pass over due memes with a working and a dead url."""
+    repairs = FakeRepairs([
+        {'id': i, 'url': f"https://cdn.discordapp.com/{name}", 'media_type': 'image', 'download_failures': 2}
+        for i, name in enumerate(['frog.png', 'gone.png', 'dog.png'], start=1)
+    ])
+
+    async def fetch(url):
+        path = MEDIA_DIR / url.rsplit('/', 1)[-1]
+        if not path.exists():
+            raise MediaDownloadError('Status 404')
+        return await spool_chunks(iter_file_chunks(str(path)))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        worker = RepairWorker(repairs, fetch, concurrency=2, batch_size=2, base_delay=10, executor=executor)
+        results = await worker.run_once()
+
+    assert results == {'repaired': 2, 'skipped': 0, 'failed': 1}
+    assert repairs.stored[1][0] == (MEDIA_DIR / 'frog.png').read_bytes()
+    assert repairs.stored[3][1]['width'] == 8
+    assert repairs.failures == {2: ('Status 404', 40)}
+
+@pytest.mark.asyncio
+async def test_repair_service_skips_given_up_rows():
+    """Test that due memes are filtered by the failure limit."""
+    conn = AsyncMock()
+    conn.fetch.return_value = [{'id': 4, 'url': 'u', 'media_type': 'image', 'download_failures': 1}]
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = conn
+
+    repairs = RepairService(pool, max_failures=3)
+    due = await repairs.get_due(after_id=2, limit=10)
+
+    assert due == [{'id': 4, 'url': 'u', 'media_type': 'image', 'download_failures': 1}]
+    query, *params = conn.fetch.call_args.args
+    assert 'file_data IS NULL' in query
+    assert params == [2, 3, 10]
+
+@pytest.mark.asyncio
+async def test_unexpected_errors_count_as_failed_attempts():
+    """Test that errors outside the download path still push the retry out."""
+    repairs = FakeRepairs([
+        {'id': 1, 'url': 'https://cdn.discordapp.com/frog.png', 'media_type': 'image', 'download_failures': 0}
+    ])
+
+    async def store_media(meme_id, file_data, info):
+        raise RuntimeError('connection was closed in the middle of operation')
+    repairs.store_media = store_media
+
+    async def fetch(url):
+        return await spool_chunks(iter_file_chunks(str(MEDIA_DIR / 'frog.png')))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        worker = RepairWorker(repairs, fetch, concurrency=1, base_delay=10, executor=executor)
+        results = await worker.run_once()
+
+    assert results == {'repaired': 0, 'skipped': 0, 'failed': 1}
+    assert repairs.failures == {1: ('connection was closed in the middle of operation', 10)}
+
+@pytest.mark.asyncio
+async def test_store_media_streams_spooled_files():
+    """Test that spooled media is copied from disk instead of bound as one parameter."""
+    conn = AsyncMock()
+    conn.transaction = MagicMock()
+    conn.execute.return_value = 'UPDATE 1'
+    copied = []
+
+    async def copy_to_table(table, source, columns, format):
+        async for chunk in source:
+            copied.append(chunk)
+    conn.copy_to_table = copy_to_table
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = conn
+    spooled = await spool_chunks(iter_file_chunks(str(MEDIA_DIR / 'frog.png')))
+    info = {'content_hash': spooled.sha256, 'file_size': spooled.size, 'width': 4, 'height': 3, 'thumbnail': None}
+
+    try:
+        assert await RepairService(pool).store_media(1, spooled, info) is True
+    finally:
+        spooled.cleanup()
+
+    assert (MEDIA_DIR / 'frog.png').read_bytes() in b''.join(copied)
+    update = conn.execute.call_args.args
+    assert 'FROM repair_upload' in update[0]
+    assert len(update) == 7
+
+@pytest.mark.asyncio
+async def test_rows_filled_meanwhile_are_skipped():
+    """Test that a row another repair filled (or that was deleted) is not counted as repaired."""
+    repairs = FakeRepairs([
+        {'id': 1, 'url': 'https://cdn.discordapp.com/frog.png', 'media_type': 'image', 'download_failures': 0}
+    ])
+
+    async def store_media(meme_id, file_data, info):
+        return False
+    repairs.store_media = store_media
+
+    async def fetch(url):
+        return await spool_chunks(iter_file_chunks(str(MEDIA_DIR / 'frog.png')))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        worker = RepairWorker(repairs, fetch, concurrency=1, base_delay=10, executor=executor)
+        results = await worker.run_once()
+
+    assert results == {'repaired': 0, 'skipped': 1, 'failed': 0}
+    assert repairs.failures == {}
@@ -0,0 +1,50 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from services.search_service import SearchService, build_tsquery, escape_like
+
+def make_pool(has_trigram=True, users=None, memes=None):
+    conn = AsyncMock()
+    conn.fetchval.return_value = has_trigram
+    conn.fetch.side_effect = [users or [], memes or []]
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = conn
+    return pool, conn
+
+def test_query_helpers():
+    assert build_tsquery('Funny  ca') == 'funny & ca:*'
+    assert build_tsquery("it's_a & !") == 'it & s & a:*'
+    assert build_tsquery('!!') is None
+    assert escape_like('50%_off\\') == '50\\%\\_off\\\\'
+
+@pytest.mark.asyncio
+async def test_search_uses_trigram_index_and_pages():
+    """Test that long queries use trigram matching and the extra row sets has_more."""
+    users = [{'username': f'cat{i}'} for i in range(3)]
+    pool, conn = make_pool(users=users, memes=[{'id': 5, 'media_type': 'image'}])
+
+    result = await SearchService(pool).search('cat', page=2, per_page=2)
+
+    assert result['status'] == 'success'
+    assert [u['username'] for u in result['users']] == ['cat0', 'cat1']
+    assert result['memes'] == [{'id': 5, 'media_type': 'image'}]
+    assert result['has_more'] is True
+
+    user_call, meme_call = conn.fetch.call_args_list
+    assert 'similarity' in user_call.args[0]
+    assert user_call.args[1:] == ('%cat%', 'cat', 3, 2)
+    assert meme_call.args[1:] == ('cat:*', 3, 2)
+
+@pytest.mark.asyncio
+async def test_short_queries_use_prefix_index():
+    """Test the prefix fallback for short queries and empty searches."""
+    pool, conn = make_pool()
+    service = SearchService(pool)
+
+    result = await service.search('Ab')
+    assert result['has_more'] is False
+    user_call = conn.fetch.call_args_list[0]
+    assert 'lower(username) LIKE $1' in user_call.args[0]
+    assert user_call.args[1:3] == ('ab%', 'ab')
+
+    assert (await service.search('   '))['users'] == []
+    assert (await service.search('cat', page='x'))['status'] == 'error'
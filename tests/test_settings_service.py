@@ -0,0 +1,80 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from services import settings_service
+from services.settings_service import SettingsService, navbar_settings_from, parse_ui_settings
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    settings_service._settings_cache.clear()
+    yield
+    settings_service._settings_cache.clear()
+
+def make_pool(ui_settings):
+    conn = AsyncMock()
+    conn.fetchrow.return_value = {'ui_settings': ui_settings}
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = conn
+    return pool, conn
+
+def test_navbar_settings_normalized():
+    """Test legacy key spellings, nesting and invalid positions."""
+    assert parse_ui_settings('not json') == {}
+    assert parse_ui_settings(None) == {}
+    assert navbar_settings_from({}) == {'pc': 'left', 'mobile': 'bottom'}
+    assert navbar_settings_from({'navbar': {'PC': 'top', 'Mobile': 'left'}}) == {'pc': 'top', 'mobile': 'left'}
+    assert navbar_settings_from({'navbar': {'navbar': {'pc': 'right'}}}) == {'pc': 'right', 'mobile': 'bottom'}
+    assert navbar_settings_from({'navbar': {'pc': 'sideways'}}) == {'pc': 'left', 'mobile': 'bottom'}
+
+@pytest.mark.asyncio
+async def test_settings_cached_per_user():
+    """Test that repeated page loads reuse the cached settings."""
+    pool, conn = make_pool(json.dumps({'navbar': {'pc': 'top', 'mobile': 'top'}}))
+    service = SettingsService(pool)
+
+    assert await service.get_navbar_settings('alice') == {'pc': 'top', 'mobile': 'top'}
+    assert await service.get_navbar_settings('alice') == {'pc': 'top', 'mobile': 'top'}
+    assert conn.fetchrow.await_count == 1
+
+    # Anonymous visitors get the defaults without a query
+    assert await service.get_navbar_settings(None) == {'pc': 'left', 'mobile': 'bottom'}
+    assert conn.fetchrow.await_count == 1
+
+@pytest.mark.asyncio
+async def test_update_invalidates_cache():
+    """Test that saving navbar settings keeps other ui settings and drops the cached copy."""
+    pool, conn = make_pool(json.dumps({'theme': 'dark'}))
+    service = SettingsService(pool)
+    await service.get_ui_settings('alice')
+
+    await service.update_navbar_settings('alice', {'pc': 'right', 'mobile': 'bottom'})
+
+    stored = json.loads(conn.execute.call_args.args[1])
+    assert stored == {'theme': 'dark', 'navbar': {'pc': 'right', 'mobile': 'bottom'}}
+    assert 'alice' not in settings_service._settings_cache
+
+@pytest.mark.asyncio
+async def test_callers_cannot_modify_cached_settings():
+    """Test that changing a returned dict leaves the cached settings alone."""
+    pool, conn = make_pool(json.dumps({'navbar': {'pc': 'top', 'mobile': 'top'}}))
+    service = SettingsService(pool)
+
+    settings = await service.get_ui_settings('alice')
+    settings['navbar']['pc'] = 'right'
+    settings['theme'] = 'dark'
+
+    assert await service.get_ui_settings('alice') == {'navbar': {'pc': 'top', 'mobile': 'top'}}
+    assert conn.fetchrow.await_count == 1
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded(monkeypatch):
+    """Test that the least recently used users are dropped once the cache is full."""
+    monkeypatch.setattr(settings_service._settings_cache, 'maxsize', 2)
+    pool, conn = make_pool(json.dumps({'theme': 'dark'}))
+    service = SettingsService(pool)
+
+    for username in ('alice', 'bob', 'carol'):
+        await service.get_ui_settings(username)
+
+    assert len(settings_service._settings_cache) == 2
+    assert 'alice' not in settings_service._settings_cache
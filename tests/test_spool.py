@@ -0,0 +1,28 @@
+import pytest
+import hashlib
+import os
+from ingest.spool import FileTooLargeError, spool_chunks
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+@pytest.mark.asyncio
+async def test_spool_chunks_hashes_while_writing(tmp_path):
+    """Test that chunks are written to disk and hashed incrementally."""
+    spooled = await spool_chunks(chunks(b'abc', b'def'), spool_dir=str(tmp_path))
+
+    assert spooled.size == 6
+    assert spooled.sha256 == hashlib.sha256(b'abcdef').hexdigest()
+    assert spooled.read() == b'abcdef'
+
+    spooled.cleanup()
+    assert not os.path.exists(spooled.path)
+
+@pytest.mark.asyncio
+async def test_spool_chunks_enforces_max_size(tmp_path):
+    """Test that oversized downloads are aborted and the partial file removed."""
+    with pytest.raises(FileTooLargeError):
+        await spool_chunks(chunks(b'a' * 10, b'b' * 10), max_size=15, spool_dir=str(tmp_path))
+
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,63 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from services.tag_index import TagIndexCache, TagPrefixIndex
+
+NOW = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+def make_tag(tag_id, name, hours_ago=None):
+    return {
+        'id': tag_id,
+        'name': name,
+        'color': '#94a3b8',
+        'created_at': NOW - timedelta(days=30),
+        'last_used': NOW - timedelta(hours=hours_ago) if hours_ago is not None else None
+    }
+
+def test_suggest_matches_prefix_ranked_by_recent_use():
+    """Test case-insensitive prefix matches ordered by last use."""
+    index = TagPrefixIndex([
+        make_tag(1, 'Cats', hours_ago=5),
+        make_tag(2, 'cartoon', hours_ago=1),
+        make_tag(3, 'dogs', hours_ago=0),
+        make_tag(4, 'catgirl'),
+        make_tag(5, 'ca'),
+    ])
+
+    ids = [tag['id'] for tag in index.suggest('CA')]
+    assert ids[:2] == [2, 1] and sorted(ids[2:]) == [4, 5]
+    assert [tag['id'] for tag in index.suggest('cat', limit=1)] == [1]
+    assert index.suggest('x') == []
+    assert [tag['id'] for tag in index.suggest('')][:1] == [3]
+
+def test_index_stays_in_sync():
+    """Test add, rename, remove and touch."""
+    index = TagPrefixIndex([make_tag(1, 'cats', hours_ago=5), make_tag(2, 'cars', hours_ago=3)])
+
+    index.add(make_tag(3, 'cattle'))
+    index.add(make_tag(1, 'kittens', hours_ago=5))
+    index.remove(2)
+    index.remove(99)
+    index.touch([3], when=NOW)
+
+    assert [tag['id'] for tag in index.suggest('ca')] == [3]
+    assert [tag['id'] for tag in index.suggest('kit')] == [1]
+    assert index.keys == sorted(index.keys) and len(index.keys) == 2
+
+def test_suggest_scales_to_thousands_of_tags():
+    """Test a large index returns only the matching slice."""
+    index = TagPrefixIndex([make_tag(i, f"tag{i:05d}", hours_ago=i % 100) for i in range(5000)])
+
+    suggestions = index.suggest('tag012', limit=5)
+    assert len(suggestions) == 5
+    assert all(tag['name'].startswith('tag012') for tag in suggestions)
+
+def test_cache_evicts_least_recently_used_user():
+    """Test the per-user cache size limit."""
+    cache = TagIndexCache(max_users=2)
+    cache.build(1, [])
+    cache.build(2, [])
+    cache.get(1)
+    cache.build(3, [])
+
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None
@@ -2,7 +2,8 @@ import pytest
 import asyncio
 import asyncpg
 from services.tag_service import TagService
-from unittest.mock import AsyncMock, Mock, patch
+from services import user_context
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
 @pytest.mark.asyncio
 async def test_tag_service_initialization(db_pool):
@@ -48,3 +49,183 @@ async def test_create_tag(db_pool):
         
         # Check that we got a dict
         assert isinstance(result, dict)
+
+def make_pool(conn):
+    """Mock pool handing out a single connection."""
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = conn
+    conn.transaction = MagicMock()
+    conn.transaction.return_value.__aenter__ = AsyncMock()
+    conn.transaction.return_value.__aexit__ = AsyncMock(return_value=None)
+    return pool
+
+@pytest.mark.asyncio
+async def test_bulk_update_meme_tags():
+    """Test that bulk tagging runs one statement and reports per meme."""
+    conn = AsyncMock()
+    conn.fetch.return_value = [
+        {'meme_id': 1, 'tag_id': 10, 'meme_exists': True, 'tag_owned': True, 'changed': True},
+        {'meme_id': 1, 'tag_id': 11, 'meme_exists': True, 'tag_owned': False, 'changed': False},
+        {'meme_id': 2, 'tag_id': 10, 'meme_exists': True, 'tag_owned': True, 'changed': False},
+        {'meme_id': 2, 'tag_id': 11, 'meme_exists': True, 'tag_owned': False, 'changed': False},
+        {'meme_id': 3, 'tag_id': 10, 'meme_exists': False, 'tag_owned': True, 'changed': False},
+        {'meme_id': 3, 'tag_id': 11, 'meme_exists': False, 'tag_owned': False, 'changed': False},
+    ]
+    tag_service = TagService(make_pool(conn))
+
+    # The id was resolved by an earlier request
+    user_context._user_ids.set('test_user', 5)
+    with patch('services.tag_service.session', {'username': 'test_user', 'user_id': 5}):
+        result = await tag_service.bulk_update_meme_tags([1, 2, 3, 1], ['10', 11], 'add')
+
+    assert conn.fetch.await_count == 1
+    query, *params = conn.fetch.call_args.args
+    assert 'unnest' in query and 'INSERT INTO meme_tags' in query
+    assert params == [5, [1, 2, 3], [10, 11]]
+
+    assert result['status'] == 'success'
+    assert result['changed'] == 1
+    assert result['invalid_tag_ids'] == [11]
+    assert result['results'] == [
+        {'meme_id': 1, 'status': 'success', 'changed': [10], 'unchanged': []},
+        {'meme_id': 2, 'status': 'success', 'changed': [], 'unchanged': [10]},
+        {'meme_id': 3, 'status': 'error', 'message': 'Meme not found'},
+    ]
+
+@pytest.mark.asyncio
+async def test_bulk_update_meme_tags_validation():
+    """Test bulk tagging input validation."""
+    conn = AsyncMock()
+    conn.fetch.return_value = []
+    tag_service = TagService(make_pool(conn))
+
+    with patch('services.tag_service.session', {}):
+        result = await tag_service.bulk_update_meme_tags([1], [1])
+        assert result['message'] == 'Not logged in'
+
+    # The id was resolved by an earlier request
+    user_context._user_ids.set('test_user', 5)
+    with patch('services.tag_service.session', {'username': 'test_user', 'user_id': 5}):
+        assert (await tag_service.bulk_update_meme_tags([1], [1], 'toggle'))['status'] == 'error'
+        assert (await tag_service.bulk_update_meme_tags([], [1]))['status'] == 'error'
+        assert (await tag_service.bulk_update_meme_tags(['x'], [1]))['status'] == 'error'
+        result = await tag_service.bulk_update_meme_tags([1], [2], 'remove')
+
+    assert 'DELETE FROM meme_tags' in conn.fetch.call_args.args[0]
+    assert result['results'] == [{'meme_id': 1, 'status': 'success', 'changed': [], 'unchanged': []}]
+
+@pytest.mark.asyncio
+async def test_get_liked_memes_by_tags_paginates_with_keyset():
+    """Test tag-filtered liked memes with cursor and first-page counts."""
+    conn = AsyncMock()
+    conn.fetch.side_effect = [
+        [{'id': 9, 'media_type': 'image'}, {'id': 7, 'media_type': 'video'}, {'id': 4, 'media_type': 'gif'}],
+        [{'meme_id': 9, 'id': 10, 'name': 'cats', 'color': '#fff'}],
+        [{'tag_id': 10, 'count': 3}, {'tag_id': 11, 'count': 1}],
+    ]
+    conn.fetchval.return_value = 3
+    tag_service = TagService(make_pool(conn))
+
+    # The id was resolved by an earlier request
+    user_context._user_ids.set('test_user', 5)
+    with patch('services.tag_service.session', {'username': 'test_user', 'user_id': 5}):
+        result = await tag_service.get_liked_memes_by_tags(['10', '11'], mode='all', limit=2)
+
+    query, *params = conn.fetch.call_args_list[0].args
+    # All tags: driven by the rarest tag's index entries, newest first
+    assert 'jsonb_array_elements_text' in query and 'ORDER BY t.usage_count' in query
+    assert 'ORDER BY mt.meme_id DESC' in query and 'GROUP BY' not in query
+    assert params == [5, [10, 11], 2, None, 3]
+
+    assert [meme['id'] for meme in result['memes']] == [9, 7]
+    assert result['memes'][0]['tags'] == [{'id': 10, 'name': 'cats', 'color': '#fff'}]
+    assert result['memes'][1]['tags'] == []
+    assert result['hasMore'] is True
+    assert result['next_cursor'] == 7
+    assert result['counts'] == {'total': 3, 'tags': {10: 3, 11: 1}}
+
+@pytest.mark.asyncio
+async def test_get_liked_memes_by_tags_later_page_skips_counts():
+    """Test that later pages pass the cursor, match any tag and skip counting."""
+    conn = AsyncMock()
+    conn.fetch.side_effect = [[{'id': 4, 'media_type': 'gif'}], []]
+    tag_service = TagService(make_pool(conn))
+
+    # The id was resolved by an earlier request
+    user_context._user_ids.set('test_user', 5)
+    with patch('services.tag_service.session', {'username': 'test_user', 'user_id': 5}):
+        result = await tag_service.get_liked_memes_by_tags([10, 11], mode='any', before='7', limit=2)
+        invalid = await tag_service.get_liked_memes_by_tags([10], mode='both')
+
+    # Any tag: one limited index walk per tag
+    query = conn.fetch.call_args_list[0].args[0]
+    assert 'CROSS JOIN LATERAL' in query and 'GROUP BY' not in query
+    assert conn.fetch.call_args_list[0].args[1:] == (5, [10, 11], 7, 3)
+    assert result['hasMore'] is False and result['next_cursor'] is None
+    assert 'counts' not in result
+    conn.fetchval.assert_not_called()
+    assert invalid['status'] == 'error'
+
+@pytest.mark.asyncio
+async def test_suggest_tags_builds_index_once():
+    """Test that suggestions load the user's tags once and follow create/delete."""
+    from services.tag_index import tag_indexes
+    tag_indexes.invalidate(42)
+
+    conn = AsyncMock()
+    conn.fetch.return_value = [
+        {'id': 1, 'name': 'cats', 'color': '#111', 'created_at': None, 'last_used': None},
+        {'id': 2, 'name': 'dogs', 'color': '#222', 'created_at': None, 'last_used': None},
+    ]
+    conn.fetchrow.return_value = {'id': 3, 'name': 'catnip', 'color': '#333', 'created_at': None, 'last_used': None, 'usage_count': 0}
+    conn.execute.return_value = 'DELETE 1'
+    tag_service = TagService(make_pool(conn))
+
+    # The id was resolved by an earlier request
+    user_context._user_ids.set('test_user', 42)
+    with patch('services.tag_service.session', {'username': 'test_user', 'user_id': 42}):
+        first = await tag_service.suggest_tags('ca')
+        await tag_service.create_tag('catnip')
+        await tag_service.delete_tag(1)
+        second = await tag_service.suggest_tags('CA')
+
+    assert first['tags'] == [{'id': 1, 'name': 'cats', 'color': '#111'}]
+    assert second['tags'] == [{'id': 3, 'name': 'catnip', 'color': '#333'}]
+    assert conn.fetch.await_count == 1
+    tag_indexes.invalidate(42)
+
+@pytest.mark.asyncio
+async def test_tag_usage_counts_follow_writes():
+    """Test that every meme_tags write also adjusts tags.usage_count."""
+    conn = AsyncMock()
+    conn.fetchrow.return_value = {'id': 1}
+    conn.fetch.return_value = []
+    conn.execute.return_value = 'UPDATE 1'
+    tag_service = TagService(make_pool(conn))
+
+    # The id was resolved by an earlier request
+    user_context._user_ids.set('test_user', 5)
+    with patch('services.tag_service.session', {'username': 'test_user', 'user_id': 5}):
+        await tag_service.add_tags_to_meme(1, [10])
+        add_query = conn.execute.call_args.args[0]
+        removed = await tag_service.remove_tag_from_meme(1, 10)
+        remove_query = conn.execute.call_args.args[0]
+        conn.execute.return_value = 'UPDATE 0'
+        missing = await tag_service.remove_tag_from_meme(1, 10)
+        await tag_service.bulk_update_meme_tags([1], [10], 'remove')
+        bulk_query = conn.fetch.call_args.args[0]
+        by_usage = await tag_service.get_user_tags('test_user', sort='usage')
+        invalid_sort = await tag_service.get_user_tags('test_user', sort='size')
+
+    assert 'usage_count = usage_count + 1' in add_query and 'RETURNING tag_id' in add_query
+    assert 'usage_count - 1' in remove_query
+    # Another user's tag id neither lands on the meme nor changes that user's count
+    assert 'FROM tags WHERE id = $3 AND user_id = $1' in add_query
+    assert add_query.count('tags.user_id = $1') == 1
+    assert 'tags.user_id = $1' in remove_query and 'tags.user_id = $1' in bulk_query
+    assert removed['status'] == 'success'
+    assert missing['message'] == 'Tag not found on meme'
+    assert 'usage_count - per_tag.count' in bulk_query
+    assert 'ORDER BY usage_count DESC' in conn.fetch.call_args.args[0]
+    assert by_usage['status'] == 'success'
+    assert invalid_sort['status'] == 'error'
@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import AsyncMock
+from quart import Quart
+from services import user_context
+from services.ttl_cache import TTLCache
+from services.user_context import get_current_user_id, invalidate_user
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    user_context._user_ids.clear()
+    yield
+    user_context._user_ids.clear()
+
+def make_conn(user_id=7):
+    conn = AsyncMock()
+    conn.fetchrow.return_value = {'id': user_id} if user_id else None
+    return conn
+
+@pytest.mark.asyncio
+async def test_session_id_must_still_exist():
+    """Test that the id stored at login is checked against the users table."""
+    conn = make_conn(3)
+    assert await get_current_user_id(conn, {'username': 'alice', 'user_id': 3}) == 3
+
+    # The account was deleted and the name registered again by someone else
+    invalidate_user('alice')
+    conn.fetchrow.return_value = {'id': 9}
+    assert await get_current_user_id(conn, {'username': 'alice', 'user_id': 3}) is None
+
+    invalidate_user('alice')
+    conn.fetchrow.return_value = None
+    assert await get_current_user_id(conn, {'username': 'alice', 'user_id': 3}) is None
+
+def test_cache_is_bounded():
+    """Test that the least recently used usernames are dropped first."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert len(cache) == 2
+
+@pytest.mark.asyncio
+async def test_lookup_is_cached_across_calls():
+    """Test that anonymous uuid ids fall back to one cached lookup."""
+    conn = make_conn()
+    session = {'username': 'alice', 'user_id': 'a7c4-uuid'}
+
+    assert await get_current_user_id(conn, session) == 7
+    assert await get_current_user_id(conn, session) == 7
+    assert conn.fetchrow.await_count == 1
+
+    invalidate_user('alice')
+    assert await get_current_user_id(conn, session) == 7
+    assert conn.fetchrow.await_count == 2
+
+@pytest.mark.asyncio
+async def test_resolved_once_per_request_and_not_logged_in():
+    """Test the per-request memo and anonymous sessions."""
+    app = Quart(__name__)
+    conn = make_conn(None)
+
+    async with app.test_request_context('/'):
+        assert await get_current_user_id(conn, {'username': 'ghost'}) is None
+        assert await get_current_user_id(conn, {'username': 'ghost'}) is None
+        assert conn.fetchrow.await_count == 1
+
+    assert await get_current_user_id(conn, {}) is None
@@ -4,7 +4,7 @@ import asyncpg
 import os
 from dotenv import load_dotenv
 from services.user_service import UserService
-from unittest.mock import AsyncMock, Mock, patch
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 import bcrypt
 
 # Load environment variables
@@ -354,3 +354,63 @@ async def test_update_user_bio():
         
     except Exception as e:
         pytest.skip(f"Database connection failed: {str(e)}")
+
+@pytest.mark.asyncio
+async def test_get_liked_memes_page_uses_position_cursor():
+    """Test that liked memes are paged by position and deleted memes are skipped."""
+    mock_pool = MagicMock()
+    mock_conn = AsyncMock()
+    mock_pool.acquire.return_value.__aenter__.return_value = mock_conn
+    mock_conn.fetchval.return_value = 1
+    mock_conn.fetch.return_value = [
+        {'position': 9, 'id': 42, 'media_type': 'image'},
+        {'position': 8, 'id': None, 'media_type': None},
+        {'position': 7, 'id': 40, 'media_type': 'video'},
+    ]
+
+    user_service = UserService(mock_pool)
+    result = await user_service.get_liked_memes_page('alice', before='10', limit=3)
+
+    assert result['status'] == 'success'
+    assert [m['id'] for m in result['memes']] == [42, 40]
+    assert result['next_cursor'] == 7
+    assert mock_conn.fetch.call_args.args[1:] == ('alice', 10, 3)
+    # Positions are looked up by index, the like history is not expanded and sorted
+    query = mock_conn.fetch.call_args.args[0]
+    assert 'generate_series' in query and 'ORDINALITY' not in query
+
+    # A short page is the last one
+    mock_conn.fetch.return_value = mock_conn.fetch.return_value[:1]
+    result = await user_service.get_liked_memes_page('alice', before='10', limit=3)
+    assert result['next_cursor'] is None
+
+    assert (await user_service.get_liked_memes_page('alice', before='abc'))['status'] == 'error'
+    mock_conn.fetchval.return_value = None
+    assert (await user_service.get_liked_memes_page('ghost'))['message'] == 'User not found'
+
+@pytest.mark.asyncio
+async def test_get_users_page_uses_keyset_cursor():
+    """Test that the users directory pages by (created_at, id) with cached like counts."""
+    from datetime import datetime
+    mock_pool = MagicMock()
+    mock_conn = AsyncMock()
+    mock_pool.acquire.return_value.__aenter__.return_value = mock_conn
+    mock_conn.fetch.return_value = [
+        {'id': 9, 'username': 'alice', 'created_at': datetime(2024, 5, 2, 12, 0), 'like_count': 3},
+        {'id': 4, 'username': 'bob', 'created_at': datetime(2024, 5, 1, 8, 30), 'like_count': 0},
+    ]
+
+    user_service = UserService(mock_pool)
+    first = await user_service.get_users_page(limit=2)
+
+    assert first['users'][0] == {'username': 'alice', 'joined': 'May 2024', 'like_count': 3}
+    assert first['next_cursor'] == '2024-05-01T08:30:00|4'
+    assert mock_conn.fetch.call_args.args[1:] == (2,)
+
+    await user_service.get_users_page(before=first['next_cursor'], limit=2)
+    assert '(created_at, id) < ($1, $2)' in mock_conn.fetch.call_args.args[0]
+    assert mock_conn.fetch.call_args.args[1:] == (datetime(2024, 5, 1, 8, 30), 4, 2)
+
+    mock_conn.fetch.return_value = mock_conn.fetch.return_value[:1]
+    assert (await user_service.get_users_page(limit=2))['next_cursor'] is None
+    assert (await user_service.get_users_page(before='yesterday|x'))['status'] == 'error'